@@ -1,4 +1,5 @@
 import os
+import structured_logging
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy.orm import DeclarativeBase
@@ -8,6 +9,8 @@ class Base(DeclarativeBase):
 
 db = SQLAlchemy(model_class=Base)
 app = Flask(__name__)
+structured_logging.configure()
+structured_logging.init_app(app)
 
 # Configuration
 app.secret_key = os.environ.get("SESSION_SECRET", "pokemon-secret-key")
@@ -23,4 +26,10 @@ db.init_app(app)
 
 with app.app_context():
     import models
+    import migrate
     db.create_all()
+    # create_all() skips existing tables, so add any new columns and indexes to them
+    migrate.ensure_schema()
+
+    import metrics
+    metrics.init_app(app, db.engine)
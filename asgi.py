@@ -0,0 +1,202 @@
+"""ASGI entry point that serves the app's async views on an event loop:
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5000 --workers 2
+
+Under gunicorn (see gunicorn.conf.py) Flask runs an async view such as
+/api/command/async in a loop of its own, holding a worker thread until it
+returns. Here those views run as tasks on the server's event loop, so one
+worker keeps many commands in flight while their PokeAPI lookups are
+awaited. Every other route is run as WSGI on a pool of WEB_THREADS threads,
+as a gthread worker would, streaming its response (/api/stream included)
+until the client goes away. The app warms up during lifespan startup,
+before the server accepts its first request.
+"""
+import asyncio
+import inspect
+import io
+import logging
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from flask import Flask, request
+from werkzeug.exceptions import HTTPException
+
+import warmup
+from main import app as flask_app
+
+logger = logging.getLogger(__name__)
+
+
+class ClientDisconnected(Exception):
+    """The client went away while a WSGI response was still being sent"""
+
+
+def wsgi_environ(scope: Dict, body: bytes) -> Dict:
+    """The WSGI environ for an ASGI HTTP scope and its complete body"""
+    root_path = scope.get('root_path', '')
+    path = scope['path'][len(root_path):] if scope['path'].startswith(root_path) else scope['path']
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': root_path.encode('utf8').decode('latin1'),
+        'PATH_INFO': path.encode('utf8').decode('latin1'),
+        'QUERY_STRING': scope['query_string'].decode('latin1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope['http_version']}",
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'] = scope['client'][0]
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin1').upper().replace('-', '_')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = f"HTTP_{name}"
+        value = value.decode('latin1')
+        environ[name] = f"{environ[name]},{value}" if name in environ else value
+    return environ
+
+
+def response_start(status: int, headers: List) -> Dict:
+    return {
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(name.lower().encode('latin1'), value.encode('latin1')) for name, value in headers],
+    }
+
+
+class AsyncFlask:
+    """ASGI app running a Flask app's coroutine views natively and the rest as WSGI in threads"""
+
+    def __init__(self, app: Flask, threads: int):
+        self.app = app
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='wsgi')
+        self.async_endpoints = {
+            endpoint for endpoint, view in app.view_functions.items() if inspect.iscoroutinefunction(view)
+        }
+        self.urls = app.url_map.bind('localhost')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+        body = await self.read_body(receive)
+        if body is None:
+            return
+        if self.is_async(scope):
+            await self.serve(scope, body, send)
+        else:
+            await self.serve_wsgi(scope, body, receive, send)
+
+    async def lifespan(self, receive, send) -> None:
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    await asyncio.to_thread(warmup.warm_up)
+                except Exception as e:
+                    logger.exception("Warm-up failed: %s", e)
+                    await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                    return
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    @staticmethod
+    async def read_body(receive) -> Optional[bytes]:
+        """The whole request body, or None if the client went away first"""
+        body = bytearray()
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return None
+            body += message.get('body', b'')
+            if not message.get('more_body'):
+                return bytes(body)
+
+    def is_async(self, scope) -> bool:
+        try:
+            endpoint, _ = self.urls.match(scope['path'], scope['method'])
+        except HTTPException:
+            # 404s, 405s and redirects are Flask's to answer
+            return False
+        return endpoint in self.async_endpoints
+
+    async def serve(self, scope, body: bytes, send) -> None:
+        """Flask's full_dispatch_request(), awaiting the view on this loop"""
+        app = self.app
+        with app.request_context(wsgi_environ(scope, body)):
+            try:
+                try:
+                    rv = app.preprocess_request()
+                    if rv is None:
+                        rv = await app.view_functions[request.url_rule.endpoint](**request.view_args)
+                except Exception as e:
+                    rv = app.handle_user_exception(e)
+                response = app.finalize_request(rv)
+            except Exception as e:
+                response = app.handle_exception(e)
+            await send(response_start(response.status_code, response.headers.items()))
+            await send({'type': 'http.response.body', 'body': response.get_data()})
+            response.close()
+
+    async def serve_wsgi(self, scope, body: bytes, receive, send) -> None:
+        loop = asyncio.get_running_loop()
+        disconnected = asyncio.Event()
+
+        async def watch():
+            while (await receive())['type'] != 'http.disconnect':
+                pass
+            disconnected.set()
+
+        def send_from_thread(message: Dict) -> None:
+            # A stream notices at its next write, as it would under gunicorn
+            if disconnected.is_set():
+                raise ClientDisconnected()
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        def run() -> None:
+            start = []
+
+            def start_response(status: str, headers: List, exc_info=None):
+                start[:] = [response_start(int(status.split(' ', 1)[0]), headers)]
+                return write
+
+            def write(chunk: bytes) -> None:
+                if start:
+                    send_from_thread(start.pop())
+                if chunk:
+                    send_from_thread({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+
+            result = self.app(wsgi_environ(scope, body), start_response)
+            try:
+                for chunk in result:
+                    write(chunk)
+                write(b'')
+                send_from_thread({'type': 'http.response.body', 'body': b''})
+            finally:
+                if hasattr(result, 'close'):
+                    result.close()
+
+        watcher = loop.create_task(watch())
+        try:
+            await loop.run_in_executor(self.executor, run)
+        except ClientDisconnected:
+            pass
+        finally:
+            watcher.cancel()
+
+
+app = AsyncFlask(flask_app, threads=int(os.environ.get('WEB_THREADS', 8)))
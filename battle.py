@@ -0,0 +1,102 @@
+from typing import Dict, List, Optional, Tuple
+
+from dataset import TYPE_IDS, TYPE_NAMES
+
+# Positions in a combatant's fixed-order stat tuple
+HP, ATTACK, DEFENSE, SP_ATTACK, SP_DEFENSE, SPEED = range(6)
+
+
+class Move:
+    """A move resolved once at battle start"""
+
+    __slots__ = ('id', 'key', 'name', 'type_id', 'power', 'accuracy', 'pp')
+
+    def __init__(self, id: int, key: str, name: str, type_id: Optional[int],
+                 power: Optional[int], accuracy: Optional[int], pp: Optional[int]):
+        self.id = id
+        self.key = key
+        self.name = name
+        self.type_id = type_id
+        self.power = power
+        self.accuracy = accuracy
+        self.pp = pp
+
+    @classmethod
+    def from_data(cls, key: str, data: Dict) -> 'Move':
+        """Build from a GameLogic.get_move_data record"""
+        return cls(data.get('id', 0), key, data['name'], TYPE_IDS.get(data['type']),
+                   data.get('power'), data.get('accuracy'), data.get('pp'))
+
+    @property
+    def type_name(self) -> str:
+        return TYPE_NAMES[self.type_id] if self.type_id is not None else 'unknown'
+
+    def to_compact(self) -> list:
+        return [self.id, self.key, self.name, self.type_id, self.power, self.accuracy, self.pp]
+
+    @classmethod
+    def from_compact(cls, data: list) -> 'Move':
+        return cls(*data)
+
+
+# Used by the wild Pokémon when its chosen move couldn't be resolved
+STRUGGLE = Move(0, 'struggle', 'Struggle', TYPE_IDS['normal'], 50, 100, None)
+
+
+class Combatant:
+    """One side of a battle with integer IDs and a fixed-order stat tuple"""
+
+    __slots__ = ('species_id', 'name', 'level', 'type_ids', 'stats', 'current_hp', 'max_hp',
+                 'move_keys', 'moves')
+
+    def __init__(self, species_id: int, name: str, level: int, type_ids: Tuple[int, ...],
+                 stats: Tuple[int, ...], current_hp: int, max_hp: int,
+                 move_keys: Tuple[str, ...], moves: Tuple[Optional[Move], ...]):
+        self.species_id = species_id
+        self.name = name
+        self.level = level
+        self.type_ids = type_ids
+        self.stats = stats
+        self.current_hp = current_hp
+        self.max_hp = max_hp
+        # PokeAPI move names, with the resolved Move (or None if lookup failed) at the same index
+        self.move_keys = move_keys
+        self.moves = moves
+
+    @property
+    def type_names(self) -> List[str]:
+        return [TYPE_NAMES[t] for t in self.type_ids]
+
+    def to_compact(self) -> list:
+        return [self.species_id, self.name, self.level, list(self.type_ids), list(self.stats),
+                self.current_hp, self.max_hp, list(self.move_keys),
+                [m.to_compact() if m else None for m in self.moves]]
+
+    @classmethod
+    def from_compact(cls, data: list) -> 'Combatant':
+        species_id, name, level, type_ids, stats, current_hp, max_hp, move_keys, moves = data
+        return cls(species_id, name, level, tuple(type_ids), tuple(stats), current_hp, max_hp,
+                   tuple(move_keys), tuple(Move.from_compact(m) if m else None for m in moves))
+
+
+class Battle:
+    """In-progress battle between the trainer's Pokémon and a wild one.
+
+    to_compact() is the positional form used for storage; responses show it
+    through projections.battle_summary().
+    """
+
+    __slots__ = ('wild', 'trainer', 'turn')
+
+    def __init__(self, wild: Combatant, trainer: Combatant, turn: str = 'player'):
+        self.wild = wild
+        self.trainer = trainer
+        self.turn = turn
+
+    def to_compact(self) -> list:
+        return [self.turn, self.wild.to_compact(), self.trainer.to_compact()]
+
+    @classmethod
+    def from_compact(cls, data: list) -> 'Battle':
+        turn, wild, trainer = data
+        return cls(Combatant.from_compact(wild), Combatant.from_compact(trainer), turn)
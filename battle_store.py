@@ -0,0 +1,183 @@
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Dict, Optional
+
+from app import db
+from battle import Battle
+from models import ActiveBattle, utc_now
+
+logger = logging.getLogger(__name__)
+
+
+class BattleStore(ABC):
+    """Server-side storage for in-progress battles.
+
+    The session only carries the opaque battle ID returned by create(). A
+    trainer has at most one active battle, starting a new one replaces it.
+    """
+
+    def __init__(self, idle_ttl: float = 1800, max_battles: int = 10000):
+        self.idle_ttl = idle_ttl
+        self.max_battles = max_battles
+
+    @staticmethod
+    def new_battle_id() -> str:
+        return secrets.token_urlsafe(16)
+
+    @abstractmethod
+    def create(self, trainer_id: int, state: Battle) -> str:
+        """Store a new battle for trainer_id, replacing any existing one"""
+
+    @abstractmethod
+    def get(self, battle_id: Optional[str], trainer_id: int) -> Optional[Battle]:
+        """Load a battle if it exists, belongs to trainer_id and hasn't idled out"""
+
+    @abstractmethod
+    def save(self, battle_id: str, state: Battle) -> None:
+        """Persist an updated battle state"""
+
+    @abstractmethod
+    def delete(self, battle_id: Optional[str]) -> None:
+        """End a battle"""
+
+
+class MemoryBattleStore(BattleStore):
+    """Per-process LRU store, only suitable for a single worker"""
+
+    def __init__(self, idle_ttl: float = 1800, max_battles: int = 10000):
+        super().__init__(idle_ttl, max_battles)
+        # battle_id -> (trainer_id, state, last_used)
+        self._battles: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._by_trainer: Dict[int, str] = {}
+        self._lock = threading.Lock()
+
+    def _drop(self, battle_id: str) -> None:
+        trainer_id = self._battles.pop(battle_id)[0]
+        if self._by_trainer.get(trainer_id) == battle_id:
+            del self._by_trainer[trainer_id]
+
+    def create(self, trainer_id: int, state: Battle) -> str:
+        battle_id = self.new_battle_id()
+        now = time.monotonic()
+        with self._lock:
+            previous = self._by_trainer.get(trainer_id)
+            if previous:
+                self._drop(previous)
+            self._battles[battle_id] = (trainer_id, state, now)
+            self._by_trainer[trainer_id] = battle_id
+            # Entries are kept in last-used order, so the oldest are at the front
+            while self._battles:
+                oldest_id, (_, _, last_used) = next(iter(self._battles.items()))
+                if len(self._battles) <= self.max_battles and now - last_used < self.idle_ttl:
+                    break
+                self._drop(oldest_id)
+        return battle_id
+
+    def get(self, battle_id: Optional[str], trainer_id: int) -> Optional[Battle]:
+        if not battle_id:
+            return None
+        with self._lock:
+            entry = self._battles.get(battle_id)
+            if entry is None or entry[0] != trainer_id:
+                return None
+            if time.monotonic() - entry[2] >= self.idle_ttl:
+                self._drop(battle_id)
+                return None
+            self._battles[battle_id] = (trainer_id, entry[1], time.monotonic())
+            self._battles.move_to_end(battle_id)
+            return entry[1]
+
+    def save(self, battle_id: str, state: Battle) -> None:
+        with self._lock:
+            entry = self._battles.get(battle_id)
+            if entry is not None:
+                self._battles[battle_id] = (entry[0], state, time.monotonic())
+                self._battles.move_to_end(battle_id)
+
+    def delete(self, battle_id: Optional[str]) -> None:
+        with self._lock:
+            if battle_id in self._battles:
+                self._drop(battle_id)
+
+
+class DatabaseBattleStore(BattleStore):
+    """Store battles in the ActiveBattle table so every worker sees them.
+
+    Idle and surplus battles are swept at most once per sweep_interval
+    seconds per worker rather than on every create().
+    """
+
+    def __init__(self, idle_ttl: float = 1800, max_battles: int = 10000, sweep_interval: float = 60):
+        super().__init__(idle_ttl, max_battles)
+        self.sweep_interval = sweep_interval
+        self._next_sweep = time.monotonic() + sweep_interval
+
+    def create(self, trainer_id: int, state: Battle) -> str:
+        battle_id = self.new_battle_id()
+        ActiveBattle.query.filter_by(trainer_id=trainer_id).delete(synchronize_session=False)
+        db.session.add(ActiveBattle(
+            id=battle_id, trainer_id=trainer_id, state=json.dumps(state.to_compact()), updated_at=utc_now()))
+        db.session.commit()
+        if time.monotonic() >= self._next_sweep:
+            self._next_sweep = time.monotonic() + self.sweep_interval
+            self.sweep()
+        return battle_id
+
+    def sweep(self) -> int:
+        """Delete idle battles, then the least recently used beyond max_battles; how many went"""
+        cutoff = utc_now() - timedelta(seconds=self.idle_ttl)
+        deleted = ActiveBattle.query.filter(ActiveBattle.updated_at < cutoff).delete(synchronize_session=False)
+        overflow = ActiveBattle.query.count() - self.max_battles
+        if overflow > 0:
+            oldest = db.session.query(ActiveBattle.id).order_by(ActiveBattle.updated_at).limit(overflow)
+            deleted += ActiveBattle.query.filter(ActiveBattle.id.in_(oldest.scalar_subquery())).delete(
+                synchronize_session=False)
+        db.session.commit()
+        if deleted:
+            logger.info("Swept %d idle or surplus battles", deleted)
+        return deleted
+
+    def get(self, battle_id: Optional[str], trainer_id: int) -> Optional[Battle]:
+        if not battle_id:
+            return None
+        battle = db.session.get(ActiveBattle, battle_id)
+        if battle is None or battle.trainer_id != trainer_id:
+            return None
+        if battle.updated_at < utc_now() - timedelta(seconds=self.idle_ttl):
+            self.delete(battle_id)
+            return None
+        return Battle.from_compact(json.loads(battle.state))
+
+    def save(self, battle_id: str, state: Battle) -> None:
+        ActiveBattle.query.filter_by(id=battle_id).update(
+            {'state': json.dumps(state.to_compact()), 'updated_at': utc_now()})
+        db.session.commit()
+
+    def delete(self, battle_id: Optional[str]) -> None:
+        if battle_id:
+            ActiveBattle.query.filter_by(id=battle_id).delete()
+            db.session.commit()
+
+
+def store_from_env() -> BattleStore:
+    """Pick the backend named by BATTLE_STORE ('database' or 'memory')"""
+    backend = os.environ.get('BATTLE_STORE', 'database')
+    options = {
+        'idle_ttl': float(os.environ.get('BATTLE_IDLE_TTL', 1800)),
+        'max_battles': int(os.environ.get('BATTLE_MAX_ACTIVE', 10000)),
+    }
+    if backend == 'memory':
+        return MemoryBattleStore(**options)
+    if backend != 'database':
+        logger.warning("Unknown BATTLE_STORE %r, using the database store", backend)
+    return DatabaseBattleStore(sweep_interval=float(os.environ.get('BATTLE_SWEEP_INTERVAL', 60)), **options)
+
+
+battle_store = store_from_env()
@@ -0,0 +1,222 @@
+"""Benchmark the /api/start-game and /api/command pipeline.
+
+Starts the Flask app in-process against a local PokeAPI stand-in (see
+bench/stub_pokeapi.py), drives every command many times and records latency
+percentiles, upstream calls, DB queries and response bytes per command.
+
+    python -m bench.run --dataset instance/pokedata.bin --iterations 200 --latency 0.05
+    python -m bench.run --fixtures bench/fixtures --out results.json --compare previous.json
+
+The database, response cache and battle store are all fresh per run.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+
+class CommandStats:
+    """Samples collected for one command"""
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.upstream_calls: List[int] = []
+        self.db_queries: List[int] = []
+        self.db_time: List[float] = []
+        self.response_bytes: List[int] = []
+        self.errors = 0
+
+    def summary(self) -> Dict:
+        latencies = sorted(self.latencies)
+        n = len(latencies)
+
+        def pct(q: float) -> float:
+            return latencies[min(n - 1, int(q / 100 * n))] * 1000
+
+        def mean(values) -> float:
+            return sum(values) / len(values) if values else 0.0
+
+        return {
+            'count': n,
+            'errors': self.errors,
+            'latency_ms': {
+                'p50': pct(50), 'p90': pct(90), 'p99': pct(99),
+                'mean': mean(latencies) * 1000, 'max': latencies[-1] * 1000,
+            },
+            'upstream_calls': mean(self.upstream_calls),
+            'db_queries': mean(self.db_queries),
+            'db_time_ms': mean(self.db_time) * 1000,
+            'response_bytes': mean(self.response_bytes),
+        }
+
+
+class Benchmark:
+    def __init__(self, client, stub, engine):
+        from sqlalchemy import event
+
+        self.client = client
+        self.stub = stub
+        self.stats: Dict[str, CommandStats] = defaultdict(CommandStats)
+        self._queries = 0
+        self._query_time = 0.0
+        self._query_started = 0.0
+
+        @event.listens_for(engine, 'before_cursor_execute')
+        def before(*args):
+            self._query_started = time.perf_counter()
+
+        @event.listens_for(engine, 'after_cursor_execute')
+        def after(*args):
+            self._queries += 1
+            self._query_time += time.perf_counter() - self._query_started
+
+    def request(self, name: str, url: str, payload: Dict) -> Dict:
+        upstream_before = self.stub.total_calls
+        queries_before, query_time_before = self._queries, self._query_time
+
+        started = time.perf_counter()
+        response = self.client.post(url, json=payload)
+        elapsed = time.perf_counter() - started
+
+        stats = self.stats[name]
+        stats.latencies.append(elapsed)
+        stats.upstream_calls.append(self.stub.total_calls - upstream_before)
+        stats.db_queries.append(self._queries - queries_before)
+        stats.db_time.append(self._query_time - query_time_before)
+        stats.response_bytes.append(len(response.data))
+        data = response.get_json(silent=True) or {}
+        if data.get('status') != 'success':
+            stats.errors += 1
+        return data
+
+    def command(self, command: str) -> Dict:
+        return self.request(command.split()[0], '/api/command', {'command': command})
+
+    def play_session(self, trainer_name: str, max_turns: int) -> None:
+        """One trainer's session exercising every command"""
+        starter = random.choice(['bulbasaur', 'charmander', 'squirtle'])
+        self.request('/start-game', '/api/start-game', {'trainer_name': trainer_name, 'starter_choice': starter})
+        self.command('/hunt')
+        self.command('/evyield')
+        battle = self.command('/battle')
+        if battle.get('status') == 'success':
+            for _ in range(max_turns):
+                result = self.command('/move 1')
+                if result.get('status') != 'success' or result.get('battle_ended'):
+                    break
+                if 'CATCH AVAILABLE' in result.get('message', ''):
+                    if self.command('/catch').get('status') == 'success':
+                        break
+        self.command('/mypokemon')
+        self.command('/mystats')
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: Dict, previous: Dict) -> str:
+    """Human-readable per-command p50/p99 and upstream-call deltas"""
+    lines = [f"{'command':<12} {'p50 ms':>16} {'p99 ms':>16} {'upstream':>14}"]
+    for name, stats in current['commands'].items():
+        old = previous.get('commands', {}).get(name)
+        if not old:
+            continue
+
+        def delta(new: float, before: float) -> str:
+            return f"{new:7.2f} ({(new - before) / before:+.0%})" if before else f"{new:7.2f}"
+
+        lines.append(f"{name:<12} {delta(stats['latency_ms']['p50'], old['latency_ms']['p50']):>16} "
+                     f"{delta(stats['latency_ms']['p99'], old['latency_ms']['p99']):>16} "
+                     f"{delta(stats['upstream_calls'], old['upstream_calls']):>14}")
+    return '\n'.join(lines)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the command pipeline against a PokeAPI stand-in")
+    parser.add_argument('--fixtures', default=os.path.join(os.path.dirname(__file__), 'fixtures'))
+    parser.add_argument('--dataset', help="bundled dataset served for anything missing from the fixtures")
+    parser.add_argument('--iterations', type=int, default=100, help="trainer sessions to play")
+    parser.add_argument('--max-turns', type=int, default=30, help="/move commands per battle at most")
+    parser.add_argument('--latency', type=float, default=0.0, help="simulated upstream latency in seconds")
+    parser.add_argument('--jitter', type=float, default=0.0, help="extra random upstream delay in seconds")
+    parser.add_argument('--no-cache', action='store_true', help="disable the PokeAPI response cache")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', help="write JSON results to this file instead of stdout")
+    parser.add_argument('--compare', help="previous JSON results to compare against")
+    args = parser.parse_args(argv)
+
+    # Configuration is read at import time, so it has to be in place before
+    # anything from the app (including the dataset module) is imported. The
+    # app must talk to the stub rather than read a bundled dataset itself.
+    os.environ['POKEAPI_DATASET'] = ''
+    os.environ.pop('POKEAPI_OFFLINE', None)
+    from dataset import Dataset
+    from bench.stub_pokeapi import StubPokeAPI
+
+    stub = StubPokeAPI(args.fixtures, Dataset(args.dataset) if args.dataset else None,
+                       args.latency, args.jitter).start()
+    workdir = tempfile.mkdtemp(prefix='pterminal-bench-')
+    os.environ.update({
+        'DATABASE_URL': f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        'POKEAPI_BASE_URL': stub.base_url,
+        'POKEAPI_CACHE_PATH': '' if args.no_cache else os.path.join(workdir, 'cache.db'),
+    })
+    if args.no_cache:
+        os.environ['POKEAPI_CACHE_SIZE'] = '0'
+
+    import logging
+    import main as app_module
+    import warmup
+    from app import db
+    logging.disable(logging.WARNING)
+    # Warm up before the clock starts rather than in the first session
+    warmup.warm_up()
+
+    random.seed(args.seed)
+    with app_module.app.app_context():
+        engine = db.engine
+    bench = Benchmark(app_module.app.test_client(), stub, engine)
+
+    started = time.perf_counter()
+    for i in range(args.iterations):
+        bench.play_session(f"bench-{i}", args.max_turns)
+    elapsed = time.perf_counter() - started
+    stub.stop()
+
+    results = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'config': vars(args),
+            'elapsed_seconds': elapsed,
+            'upstream_calls_by_kind': dict(stub.calls),
+        },
+        'commands': {name: stats.summary() for name, stats in sorted(bench.stats.items())},
+    }
+
+    output = json.dumps(results, indent=2)
+    if args.out:
+        with open(args.out, 'w') as f:
+            f.write(output)
+    else:
+        print(output)
+    if args.compare:
+        with open(args.compare) as f:
+            print(compare(results, json.load(f)), file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
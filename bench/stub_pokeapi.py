@@ -0,0 +1,176 @@
+"""Local stand-in for PokeAPI that serves recorded fixtures.
+
+Fixtures live in ``<dir>/<kind>/<key>.json`` (e.g. ``pokemon/25.json``,
+``move/tackle.json``). Record them once from the real API:
+
+    python -m bench.stub_pokeapi record --out bench/fixtures --max-id 649
+
+then serve them with simulated upstream latency:
+
+    python -m bench.stub_pokeapi serve --fixtures bench/fixtures --latency 0.08
+
+Species missing from the fixtures are served from the bundled dataset when
+one is given with --dataset, so the stub also works without recording.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+import requests
+
+from dataset import Dataset
+
+
+class StubPokeAPI:
+    """Threaded HTTP server answering /api/v2/<kind>/<key> from fixtures"""
+
+    def __init__(self, fixtures_dir: Optional[str] = None, dataset: Optional[Dataset] = None,
+                 latency: float = 0.0, jitter: float = 0.0, host: str = '127.0.0.1', port: int = 0):
+        self.fixtures_dir = fixtures_dir
+        self.dataset = dataset
+        self.latency = latency
+        self.jitter = jitter
+        self.calls: Counter = Counter()
+        self._lock = threading.Lock()
+        self._fixtures: Dict[str, bytes] = {}
+        self._load_fixtures()
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                stub.handle(self)
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/api/v2"
+
+    @property
+    def total_calls(self) -> int:
+        with self._lock:
+            return sum(self.calls.values())
+
+    def _load_fixtures(self) -> None:
+        if not self.fixtures_dir or not os.path.isdir(self.fixtures_dir):
+            return
+        for kind in os.listdir(self.fixtures_dir):
+            kind_dir = os.path.join(self.fixtures_dir, kind)
+            for filename in os.listdir(kind_dir):
+                with open(os.path.join(kind_dir, filename), 'rb') as f:
+                    body = f.read()
+                key = filename[:-len('.json')]
+                self._fixtures[f"{kind}/{key}"] = body
+                # Species are also requested by name
+                if kind == 'pokemon':
+                    self._fixtures[f"{kind}/{json.loads(body)['name']}"] = body
+
+    def lookup(self, kind: str, key: str) -> Optional[bytes]:
+        body = self._fixtures.get(f"{kind}/{key}")
+        if body is None and self.dataset is not None:
+            data = self.dataset.pokemon(key) if kind == 'pokemon' else self.dataset.move(key) if kind == 'move' else None
+            body = json.dumps(data).encode() if data else None
+        return body
+
+    def handle(self, request: BaseHTTPRequestHandler) -> None:
+        parts = request.path.split('?')[0].strip('/').split('/')
+        kind, key = (parts[-2], parts[-1]) if len(parts) >= 2 else ('', '')
+        with self._lock:
+            self.calls[kind] += 1
+
+        delay = self.latency + random.uniform(0, self.jitter)
+        if delay:
+            time.sleep(delay)
+
+        body = self.lookup(kind, key.lower())
+        if body is None:
+            request.send_response(404)
+            request.send_header('Content-Length', '0')
+            request.end_headers()
+            return
+        request.send_response(200)
+        request.send_header('Content-Type', 'application/json')
+        request.send_header('Content-Length', str(len(body)))
+        request.end_headers()
+        request.wfile.write(body)
+
+    def start(self) -> 'StubPokeAPI':
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def record(source: str, out_dir: str, max_id: int, workers: int = 8) -> None:
+    """Download species 1..max_id and the moves they reference into out_dir"""
+    session = requests.Session()
+
+    def fetch(kind: str, key) -> Optional[dict]:
+        response = session.get(f"{source.rstrip('/')}/{kind}/{key}", timeout=30)
+        if response.status_code != 200:
+            return None
+        os.makedirs(os.path.join(out_dir, kind), exist_ok=True)
+        with open(os.path.join(out_dir, kind, f"{key}.json"), 'w', encoding='utf-8') as f:
+            f.write(response.text)
+        return response.json()
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        species = [s for s in pool.map(lambda i: fetch('pokemon', i), range(1, max_id + 1)) if s]
+        moves = {'tackle'}
+        for s in species:
+            moves.update(m['move']['name'] for m in s['moves'][:4])
+        list(pool.map(lambda name: fetch('move', name), sorted(moves)))
+    print(f"Recorded {len(species)} species and {len(moves)} moves into {out_dir}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Local PokeAPI stand-in for benchmarks")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    serve = commands.add_parser('serve', help="serve fixtures over HTTP")
+    serve.add_argument('--fixtures', default=os.path.join(os.path.dirname(__file__), 'fixtures'))
+    serve.add_argument('--dataset', help="bundled dataset used for anything missing from the fixtures")
+    serve.add_argument('--latency', type=float, default=0.0, help="seconds added to every response")
+    serve.add_argument('--jitter', type=float, default=0.0, help="extra random delay of up to this many seconds")
+    serve.add_argument('--port', type=int, default=8000)
+
+    rec = commands.add_parser('record', help="record fixtures from a PokeAPI-compatible server")
+    rec.add_argument('--source', default='https://pokeapi.co/api/v2')
+    rec.add_argument('--out', default=os.path.join(os.path.dirname(__file__), 'fixtures'))
+    rec.add_argument('--max-id', type=int, default=649)
+
+    args = parser.parse_args(argv)
+    if args.command == 'record':
+        record(args.source, args.out, args.max_id)
+        return 0
+
+    stub = StubPokeAPI(args.fixtures, Dataset(args.dataset) if args.dataset else None,
+                       args.latency, args.jitter, port=args.port)
+    print(f"Serving PokeAPI stand-in on {stub.base_url}")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,73 @@
+"""Run one coroutine implementation from both synchronous and asyncio code.
+
+The PokeAPI cache's single-flight leases and the upstream client's retries
+are written once, as coroutines that only wait through an IO object:
+
+    async def fetch(io):
+        await io.sleep(0.1)
+        return await io.call(blocking_function)
+
+Under BLOCKING nothing ever suspends, so run() drives the coroutine to
+completion in the calling thread with plain time.sleep() and direct calls.
+Under ASYNCIO the same coroutine is awaited on an event loop, sleeping with
+asyncio and moving blocking calls to the loop's default executor.
+"""
+import asyncio
+import time
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Coroutine, TypeVar
+
+T = TypeVar('T')
+
+
+class Blocking:
+    """Waits by blocking the calling thread; coroutines using it never suspend"""
+
+    @staticmethod
+    async def sleep(seconds: float) -> None:
+        time.sleep(seconds)
+
+    @staticmethod
+    async def call(function: Callable[..., T], *args) -> T:
+        return function(*args)
+
+    @staticmethod
+    async def wait(future: 'Future[T]') -> T:
+        return future.result()
+
+
+class AsyncIO:
+    """Waits without blocking the running event loop"""
+
+    @staticmethod
+    async def sleep(seconds: float) -> None:
+        await asyncio.sleep(seconds)
+
+    @staticmethod
+    async def call(function: Callable[..., T], *args) -> T:
+        return await asyncio.get_running_loop().run_in_executor(None, function, *args)
+
+    @staticmethod
+    async def wait(future: 'Future[T]') -> T:
+        return await asyncio.wrap_future(future)
+
+
+BLOCKING = Blocking()
+ASYNCIO = AsyncIO()
+
+
+def run(coroutine: Coroutine[Any, Any, T]) -> T:
+    """Run a coroutine that waits only through BLOCKING and return its result"""
+    try:
+        coroutine.send(None)
+    except StopIteration as done:
+        return done.value
+    coroutine.close()
+    raise RuntimeError("a coroutine run under BLOCKING suspended")
+
+
+def awaitable(function: Callable[..., T]) -> Callable[..., Awaitable[T]]:
+    """Wrap a plain function for a coroutine that awaits its result"""
+    async def call(*args) -> T:
+        return function(*args)
+    return call
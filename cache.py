@@ -0,0 +1,377 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import blocking
+from blocking import ASYNCIO, BLOCKING
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'pokeapi_cache.db')
+
+# Memory-tier marker for a key whose last load failed
+NEGATIVE = object()
+
+
+class PokeAPICache:
+    """Two-tier cache for PokeAPI responses.
+
+    Tier one is a bounded in-process LRU, tier two is a SQLite file that
+    survives restarts and is shared by every worker on the host. Values must
+    be JSON-serializable and should be treated as read-only by callers since
+    the same object is handed out on every hit.
+
+    get_or_load() coalesces concurrent misses: threads in one process wait on
+    a shared future, and processes take a lease row in the SQLite file so only
+    the holder calls the loader while the others poll for its result. A load
+    that fails or finds nothing is cached as a negative entry for negative_ttl
+    seconds, kept apart from the stored value so stale reads still work.
+    """
+
+    def __init__(self, path: Optional[str] = DEFAULT_CACHE_PATH, max_entries: int = 256,
+                 ttl: float = 7 * 24 * 3600, negative_ttl: float = 30, lease_ttl: float = 30,
+                 poll_interval: float = 0.05):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.lease_ttl = lease_ttl
+        self.poll_interval = poll_interval
+        self._memory: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._flights: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.negative_hits = 0
+        self.coalesced = 0
+        if self.path:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            conn = self._connect()
+            # WAL lets every worker read while one writes; the mode is stored in the file
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS entries ("
+                    "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+                )
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS negative_entries (key TEXT PRIMARY KEY, expires_at REAL NOT NULL)"
+                )
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS leases ("
+                    "key TEXT PRIMARY KEY, owner INTEGER NOT NULL, expires_at REAL NOT NULL)"
+                )
+
+    @classmethod
+    def from_env(cls) -> 'PokeAPICache':
+        """Build a cache configured from POKEAPI_CACHE_* environment variables"""
+        path = os.environ.get('POKEAPI_CACHE_PATH', DEFAULT_CACHE_PATH)
+        return cls(
+            path=path or None,
+            max_entries=int(os.environ.get('POKEAPI_CACHE_SIZE', 256)),
+            ttl=float(os.environ.get('POKEAPI_CACHE_TTL', 7 * 24 * 3600)),
+            negative_ttl=float(os.environ.get('POKEAPI_CACHE_NEGATIVE_TTL', 30)),
+            lease_ttl=float(os.environ.get('POKEAPI_CACHE_LEASE_TTL', 30)),
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        # sqlite3 connections can't be shared between threads, keep one per thread
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _remember(self, key: str, value: Any, expires_at: float) -> None:
+        with self._lock:
+            self._memory[key] = (expires_at, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for key, or None on a miss, negative or expired entry"""
+        return self._lookup(key)[1]
+
+    def _lookup(self, key: str, count: bool = True) -> Tuple[bool, Optional[Any]]:
+        """(found, value); found with a None value is a negative entry"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and entry[0] > now:
+                self._memory.move_to_end(key)
+                if entry[1] is NEGATIVE:
+                    self.negative_hits += count
+                    return True, None
+                self.hits += count
+                return True, entry[1]
+
+        if self.path:
+            row = self._read_disk(key)
+            if row and row[1] > now:
+                value = json.loads(row[0])
+                self._remember(key, value, row[1])
+                with self._lock:
+                    self.hits += count
+                    self.disk_hits += count
+                return True, value
+            expires_at = self._read_negative(key)
+            if expires_at and expires_at > now:
+                self._remember(key, NEGATIVE, expires_at)
+                with self._lock:
+                    self.negative_hits += count
+                return True, None
+
+        with self._lock:
+            self.misses += count
+        return False, None
+
+    def get_or_load(self, key: str, loader: Callable[[], Optional[Any]]) -> Optional[Any]:
+        """Return the cached value, calling loader on a miss at most once across threads and workers.
+
+        Callers that find a load for key in flight wait for its result, or
+        its exception. A None result or an exception is cached as a negative
+        entry, so callers get None until it expires.
+        """
+        return blocking.run(self.load(key, blocking.awaitable(loader), BLOCKING))
+
+    async def get_or_load_async(self, key: str, loader: Callable[[], Awaitable[Optional[Any]]]) -> Optional[Any]:
+        """get_or_load() for coroutine loaders; waiting never blocks the event loop"""
+        return await self.load(key, loader, ASYNCIO)
+
+    async def load(self, key: str, loader: Callable[[], Awaitable[Optional[Any]]], io) -> Optional[Any]:
+        """get_or_load() with every wait going through io (see blocking.py)"""
+        found, value = self._lookup(key)
+        if found:
+            return value
+        flight, leader = self._join_flight(key)
+        if not leader:
+            return await io.wait(flight)
+        try:
+            # The lease writes can wait on SQLite's lock, so under ASYNCIO
+            # they run off the event loop
+            while not await io.call(self._acquire_lease, key):
+                await io.sleep(self.poll_interval)
+                found, value = self._lookup(key, count=False)
+                if found:
+                    return self._land(key, flight, value)
+            try:
+                # Another worker may have stored it between our miss and the lease
+                found, value = self._lookup(key, count=False)
+                if not found:
+                    try:
+                        value = await loader()
+                    except Exception:
+                        self.set_negative(key)
+                        raise
+                    self._save_result(key, value)
+            finally:
+                await io.call(self._release_lease, key)
+            return self._land(key, flight, value)
+        except BaseException as e:
+            self._land(key, flight, error=e)
+            raise
+
+    def _join_flight(self, key: str) -> Tuple[Future, bool]:
+        """The in-process load of key, and whether this caller has to run it"""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                self.coalesced += 1
+                return flight, False
+            flight = self._flights[key] = Future()
+            return flight, True
+
+    def _land(self, key: str, flight: Future, value: Optional[Any] = None,
+              error: Optional[BaseException] = None) -> Optional[Any]:
+        """Hand a load's outcome to the callers waiting on it"""
+        with self._lock:
+            self._flights.pop(key, None)
+        if error is not None:
+            flight.set_exception(error)
+        else:
+            flight.set_result(value)
+        return value
+
+    def _save_result(self, key: str, value: Optional[Any]) -> None:
+        if value is None:
+            self.set_negative(key)
+        else:
+            self.set(key, value)
+
+    def _acquire_lease(self, key: str) -> bool:
+        """Take the cross-process lease on loading key, unless another worker holds a live one"""
+        if not self.path:
+            return True
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                cursor = conn.execute(
+                    "INSERT INTO leases (key, owner, expires_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT (key) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+                    "WHERE leases.expires_at <= ?",
+                    (key, os.getpid(), now + self.lease_ttl, now),
+                )
+                return cursor.rowcount == 1
+        except sqlite3.Error as e:
+            # Without the lease table this worker just loads for itself
+            logger.warning("PokeAPI cache lease failed: %s", e)
+            return True
+
+    def _release_lease(self, key: str) -> None:
+        if not self.path:
+            return
+        try:
+            with self._connect() as conn:
+                conn.execute("DELETE FROM leases WHERE key = ? AND owner = ?", (key, os.getpid()))
+        except sqlite3.Error as e:
+            logger.warning("PokeAPI cache lease release failed: %s", e)
+
+    def preload(self) -> int:
+        """Fill the memory tier with the newest unexpired disk entries, returning how many were loaded"""
+        if not self.path:
+            return 0
+        try:
+            rows = self._connect().execute(
+                "SELECT key, value, expires_at FROM entries WHERE expires_at > ? ORDER BY expires_at DESC LIMIT ?",
+                (time.time(), self.max_entries),
+            ).fetchall()
+        except sqlite3.Error as e:
+            logger.warning("PokeAPI disk cache preload failed: %s", e)
+            return 0
+        for key, value, expires_at in reversed(rows):
+            self._remember(key, json.loads(value), expires_at)
+        return len(rows)
+
+    def close(self) -> None:
+        """Close this thread's disk connection; a process must not fork with one open"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def get_stale(self, key: str) -> Optional[Any]:
+        """Return the cached value for key even if it has expired.
+
+        Expired entries are kept until they are overwritten or invalidated so
+        that they can be served while upstream is down.
+        """
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and entry[1] is not NEGATIVE:
+                self.stale_hits += 1
+                return entry[1]
+        row = self._read_disk(key) if self.path else None
+        if row:
+            with self._lock:
+                self.stale_hits += 1
+            return json.loads(row[0])
+        return None
+
+    def _read_disk(self, key: str) -> Optional[tuple]:
+        try:
+            return self._connect().execute(
+                "SELECT value, expires_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning("PokeAPI disk cache read failed: %s", e)
+            return None
+
+    def _read_negative(self, key: str) -> Optional[float]:
+        try:
+            row = self._connect().execute(
+                "SELECT expires_at FROM negative_entries WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning("PokeAPI disk cache read failed: %s", e)
+            return None
+        return row[0] if row else None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Store value under key in both tiers"""
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        self._remember(key, value, expires_at)
+        if self.path:
+            try:
+                with self._connect() as conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO entries (key, value, expires_at) VALUES (?, ?, ?)",
+                        (key, json.dumps(value, separators=(',', ':')), expires_at),
+                    )
+                    conn.execute("DELETE FROM negative_entries WHERE key = ?", (key,))
+            except sqlite3.Error as e:
+                logger.warning("PokeAPI disk cache write failed: %s", e)
+
+    def set_negative(self, key: str, ttl: Optional[float] = None) -> None:
+        """Remember that key couldn't be loaded, without touching any stored value"""
+        expires_at = time.time() + (self.negative_ttl if ttl is None else ttl)
+        self._remember(key, NEGATIVE, expires_at)
+        if self.path:
+            try:
+                with self._connect() as conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO negative_entries (key, expires_at) VALUES (?, ?)",
+                        (key, expires_at),
+                    )
+            except sqlite3.Error as e:
+                logger.warning("PokeAPI disk cache write failed: %s", e)
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        """Drop one key, or every entry when key is None"""
+        with self._lock:
+            if key is None:
+                self._memory.clear()
+            else:
+                self._memory.pop(key, None)
+        if self.path:
+            with self._connect() as conn:
+                if key is None:
+                    conn.execute("DELETE FROM entries")
+                    conn.execute("DELETE FROM negative_entries")
+                else:
+                    conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                    conn.execute("DELETE FROM negative_entries WHERE key = ?", (key,))
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters for this process"""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'stale_hits': self.stale_hits,
+            'negative_hits': self.negative_hits,
+            'coalesced': self.coalesced,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+            'memory_entries': len(self._memory),
+        }
+
+
+pokeapi_cache = PokeAPICache.from_env()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inspect or clear the PokeAPI response cache")
+    parser.add_argument('--clear', action='store_true', help="drop every cached entry")
+    parser.add_argument('--invalidate', metavar='KEY', help="drop a single entry, e.g. move/tackle")
+    args = parser.parse_args()
+
+    if args.clear:
+        pokeapi_cache.invalidate()
+    elif args.invalidate:
+        pokeapi_cache.invalidate(args.invalidate)
+    if pokeapi_cache.path:
+        count = pokeapi_cache._connect().execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        print(f"{pokeapi_cache.path}: {count} entries")
@@ -0,0 +1,177 @@
+"""Table-driven dispatch for terminal commands.
+
+Handlers are registered by command name and return a response dict. What a
+command needs before it can run is declared, not checked in the handler:
+
+    @registry.command('/catch', requires={'battle': "No active battle!"})
+    def catch(ctx):
+        ...  # ctx.battle is the loaded battle
+
+Each name in requires is a loader registered with @registry.requirement; a
+falsy result short-circuits the command with the declared error message.
+Middleware wraps every dispatch as middleware(ctx, call_next) -> dict, the
+first registered being the outermost.
+
+A command can also declare a prefetch coroutine that awaits the upstream
+data its handler is about to look up. dispatch_async() runs it before the
+usual synchronous dispatch, so the handler finds that data in the request
+memo and the PokeAPI cache instead of blocking on upstream calls. The
+handler itself then runs in a thread, keeping the event loop free for
+other commands' prefetches.
+"""
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from flask import session
+
+from app import db
+from metrics import label_for, metrics
+
+logger = logging.getLogger(__name__)
+
+MAX_COMMAND_LENGTH = 200
+
+Handler = Callable[['CommandContext'], Dict]
+Middleware = Callable[['CommandContext', Handler], Dict]
+Prefetch = Callable[['CommandContext'], Awaitable[None]]
+
+
+def error(message: str) -> Dict:
+    return {'status': 'error', 'message': message}
+
+
+class Command:
+    __slots__ = ('name', 'handler', 'requires', 'session', 'prefetch')
+
+    def __init__(self, name: str, handler: Handler, requires: Dict[str, str], session: bool,
+                 prefetch: Optional[Prefetch] = None):
+        self.name = name
+        self.handler = handler
+        self.requires = requires
+        self.session = session
+        self.prefetch = prefetch
+
+
+class CommandContext:
+    """One command being dispatched; requirement loaders add their results as attributes"""
+
+    def __init__(self, text: str, command: Optional[Command]):
+        words = text.lower().split()
+        self.text = text
+        self.name = words[0] if words else ''
+        self.args = words[1:]
+        self.command = command
+        self.trainer_id = session.get('trainer_id')
+
+
+class CommandRegistry:
+    def __init__(self):
+        self._commands: Dict[str, Command] = {}
+        # Commands matched by prefix, e.g. /move1 as well as /move 1
+        self._prefixed: List[Tuple[str, Command]] = []
+        self._requirements: Dict[str, Callable[[CommandContext], object]] = {}
+        self._middleware: List[Middleware] = []
+
+    def command(self, name: str, prefix: bool = False, requires: Optional[Dict[str, str]] = None,
+                session: bool = True, prefetch: Optional[Prefetch] = None):
+        """Register the decorated function as the handler for name"""
+        def decorator(handler: Handler) -> Handler:
+            command = Command(name, handler, requires or {}, session, prefetch)
+            self._commands[name] = command
+            if prefix:
+                self._prefixed.append((name, command))
+            return handler
+        return decorator
+
+    def requirement(self, name: str):
+        """Register the decorated function as the loader for requirement name"""
+        def decorator(loader: Callable[[CommandContext], object]):
+            self._requirements[name] = loader
+            return loader
+        return decorator
+
+    def load(self, requirement: str, ctx: CommandContext) -> object:
+        return self._requirements[requirement](ctx)
+
+    def use(self, middleware: Middleware) -> Middleware:
+        self._middleware.append(middleware)
+        return middleware
+
+    def resolve(self, name: str) -> Optional[Command]:
+        command = self._commands.get(name)
+        if command is None:
+            command = next((c for prefix, c in self._prefixed if name.startswith(prefix)), None)
+        return command
+
+    def context(self, text: str) -> CommandContext:
+        words = text.lower().split()
+        return CommandContext(text, self.resolve(words[0] if words else ''))
+
+    def dispatch(self, text: str) -> Dict:
+        """Run one command for the current session and return its response"""
+        return self.run(self.context(text))
+
+    async def dispatch_async(self, text: str) -> Dict:
+        """dispatch() with the command's upstream data awaited beforehand"""
+        ctx = self.context(text)
+        command = ctx.command
+        if command is not None and command.prefetch is not None and ctx.trainer_id is not None:
+            try:
+                await command.prefetch(ctx)
+            except Exception as e:
+                # The handler fetches whatever is still missing itself
+                logger.warning("Prefetch for %s failed: %s", ctx.name, e)
+        # The request context goes with it, and nothing else uses it meanwhile
+        return await asyncio.to_thread(self.run, ctx)
+
+    def run(self, ctx: CommandContext) -> Dict:
+        """Pass ctx through the middleware to its handler"""
+        def handle(ctx: CommandContext) -> Dict:
+            if ctx.command is None:
+                return error('Unknown command')
+            return ctx.command.handler(ctx)
+
+        call = handle
+        for middleware in reversed(self._middleware):
+            call = (lambda m, call_next: lambda ctx: m(ctx, call_next))(middleware, call)
+        return call(ctx)
+
+
+def validate(ctx: CommandContext, call_next: Handler) -> Dict:
+    """Check the session and declared requirements before the handler runs"""
+    if len(ctx.text) > MAX_COMMAND_LENGTH:
+        return error('Command too long')
+    command = ctx.command
+    if (command is None or command.session) and ctx.trainer_id is None:
+        logger.debug("No active session found")
+        return error('No active session')
+    if command is not None:
+        for name, message in command.requires.items():
+            value = registry.load(name, ctx)
+            if not value:
+                logger.debug("Command %s is missing requirement %s", ctx.name, name)
+                return error(message)
+            setattr(ctx, name, value)
+    return call_next(ctx)
+
+
+def timed(ctx: CommandContext, call_next: Handler) -> Dict:
+    """Log and count each command's outcome, and turn handler crashes into an error response"""
+    started = time.perf_counter()
+    try:
+        response = call_next(ctx)
+    except Exception as e:
+        logger.exception("Command %s failed: %s", ctx.name, e)
+        db.session.rollback()
+        response = error('Command failed')
+    metrics.inc('pterminal_command_results_total', command=label_for(ctx.text), status=response.get('status'))
+    logger.debug("Command %s args=%s -> %s in %.1f ms", ctx.name, ctx.args, response.get('status'),
+                 (time.perf_counter() - started) * 1000)
+    return response
+
+
+registry = CommandRegistry()
+registry.use(timed)
+registry.use(validate)
@@ -0,0 +1,72 @@
+"""Per-trainer aggregate counters shown by /mystats.
+
+The counters live on the Trainer row and are bumped with in-database
+increments inside the same transaction as the write they describe, so
+/mystats is a single primary-key lookup. reconcile() recomputes the derived
+counters from the pokemon and pokedex tables to repair any drift:
+
+    python counters.py
+"""
+import logging
+from typing import Optional
+
+from sqlalchemy import case, func
+
+from app import db
+from models import Pokedex, Pokemon, Trainer
+
+logger = logging.getLogger(__name__)
+
+# Counters that can be recomputed from other tables. Battle results are only
+# ever recorded here, so they have no source to be reconciled against.
+DERIVED_COUNTERS = ('pokemon_owned', 'species_seen', 'species_caught')
+
+
+def increment(trainer_id: int, **deltas: int) -> None:
+    """Add to counters in the current transaction, e.g. increment(1, battles_won=1)"""
+    values = {getattr(Trainer, name): getattr(Trainer, name) + delta for name, delta in deltas.items() if delta}
+    if values:
+        db.session.query(Trainer).filter(Trainer.id == trainer_id).update(values, synchronize_session=False)
+
+
+def reconcile(trainer_id: Optional[int] = None) -> int:
+    """Recompute the derived counters, returning how many trainers were corrected"""
+    owned = db.session.query(Pokemon.trainer_id, func.count(Pokemon.id))
+    pokedex = db.session.query(Pokedex.trainer_id,
+                               func.sum(case((Pokedex.seen, 1), else_=0)).label('seen'),
+                               func.sum(case((Pokedex.caught, 1), else_=0)).label('caught'))
+    trainers = Trainer.query
+    if trainer_id is not None:
+        owned = owned.filter(Pokemon.trainer_id == trainer_id)
+        pokedex = pokedex.filter(Pokedex.trainer_id == trainer_id)
+        trainers = trainers.filter(Trainer.id == trainer_id)
+    owned = dict(owned.group_by(Pokemon.trainer_id).all())
+    pokedex = {row.trainer_id: (row.seen or 0, row.caught or 0) for row in pokedex.group_by(Pokedex.trainer_id)}
+
+    corrected = 0
+    for trainer in trainers:
+        seen, caught = pokedex.get(trainer.id, (0, 0))
+        expected = {'pokemon_owned': owned.get(trainer.id, 0), 'species_seen': seen, 'species_caught': caught}
+        drift = {name: value for name, value in expected.items() if getattr(trainer, name) != value}
+        if drift:
+            logger.info("Reconciling counters for trainer %s: %s", trainer.id, drift)
+            for name, value in drift.items():
+                setattr(trainer, name, value)
+            corrected += 1
+    # A catch committed while this runs can be overwritten; the next run corrects it
+    db.session.commit()
+    return corrected
+
+
+if __name__ == '__main__':
+    import argparse
+
+    from app import app
+
+    parser = argparse.ArgumentParser(description="Recompute trainer aggregate counters")
+    parser.add_argument('--trainer', type=int, help="only reconcile this trainer ID")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    with app.app_context():
+        print(f"Corrected counters for {reconcile(args.trainer)} trainers")
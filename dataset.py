@@ -0,0 +1,197 @@
+import json
+import mmap
+import os
+import struct
+import sys
+from typing import Dict, Iterable, List, Optional, Union
+
+# Canonical type order, a type's ID is its index in this tuple
+TYPE_NAMES = (
+    'normal', 'fire', 'water', 'electric', 'grass', 'ice', 'fighting', 'poison', 'ground',
+    'flying', 'psychic', 'bug', 'rock', 'ghost', 'dragon', 'dark', 'steel', 'fairy',
+)
+TYPE_IDS = {name: i for i, name in enumerate(TYPE_NAMES)}
+NO_TYPE = 0xFF
+
+# Stat order used by PokeAPI and by every fixed-order stat array in the game
+STAT_NAMES = ('hp', 'attack', 'defense', 'special-attack', 'special-defense', 'speed')
+
+MAX_SPECIES_ID = 649
+
+MAGIC = b'PTDS'
+VERSION = 1
+# magic, version, species count, move count, name index length
+HEADER = struct.Struct('<4sHHHI')
+# type 1, type 2, six base stats, six effort values, four move slots
+SPECIES_RECORD = struct.Struct('<BB6H6B4H')
+# PokeAPI move id, type, power, accuracy, pp
+MOVE_RECORD = struct.Struct('<HBHBB')
+NO_MOVE = 0xFFFF
+NO_VALUE_16 = 0xFFFF
+NO_VALUE_8 = 0xFF
+
+DEFAULT_DATASET_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'pokedata.bin')
+
+
+class Dataset:
+    """Read-only view over a bundled species/move dataset file.
+
+    The file is a small JSON name index followed by fixed-width species and
+    move records, so it is memory-mapped rather than parsed: a lookup is an
+    offset calculation plus one struct unpack, and every process that maps the
+    file shares the same page-cache pages.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, species_count, move_count, index_len = HEADER.unpack_from(self._buf, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} pterminal dataset")
+
+        index = json.loads(self._buf[HEADER.size:HEADER.size + index_len])
+        self.species_names: List[str] = index['species']
+        self.move_names: List[str] = index['moves']
+        self.species_count = species_count
+        self.move_count = move_count
+        self._species_ids = {name: i + 1 for i, name in enumerate(self.species_names)}
+        self._move_indexes = {name: i for i, name in enumerate(self.move_names)}
+        self._species_offset = HEADER.size + index_len
+        self._move_offset = self._species_offset + species_count * SPECIES_RECORD.size
+        self._move_ids = {}
+        for i in range(move_count):
+            self._move_ids[MOVE_RECORD.unpack_from(self._buf, self._move_offset + i * MOVE_RECORD.size)[0]] = i
+        # Unpacked records, filled by preload()
+        self._species: Optional[tuple] = None
+        self._moves: Optional[tuple] = None
+
+    def preload(self) -> int:
+        """Unpack every record up front so lookups are tuple indexing, returning their size in bytes.
+
+        Meant for the pre-fork warm-up: the tuples are never modified, so
+        forked workers keep sharing them copy-on-write.
+        """
+        self._species = tuple(
+            SPECIES_RECORD.unpack_from(self._buf, self._species_offset + i * SPECIES_RECORD.size)
+            for i in range(self.species_count)
+        )
+        self._moves = tuple(
+            MOVE_RECORD.unpack_from(self._buf, self._move_offset + i * MOVE_RECORD.size)
+            for i in range(self.move_count)
+        )
+        return sum(sys.getsizeof(record) for record in self._species + self._moves)
+
+    def species_record(self, species_id: int) -> Optional[tuple]:
+        """Raw fixed-width record for a species ID"""
+        if not 1 <= species_id <= self.species_count:
+            return None
+        if self._species is not None:
+            return self._species[species_id - 1]
+        return SPECIES_RECORD.unpack_from(self._buf, self._species_offset + (species_id - 1) * SPECIES_RECORD.size)
+
+    def move_index(self, move: Union[int, str]) -> Optional[int]:
+        """Dataset-local index of a move given its name or PokeAPI ID"""
+        if isinstance(move, int) or (isinstance(move, str) and move.isdigit()):
+            return self._move_ids.get(int(move))
+        return self._move_indexes.get(move.lower())
+
+    def move_record(self, index: int) -> tuple:
+        """Raw fixed-width record for a dataset-local move index"""
+        if self._moves is not None:
+            return self._moves[index]
+        return MOVE_RECORD.unpack_from(self._buf, self._move_offset + index * MOVE_RECORD.size)
+
+    def species_id(self, pokemon: Union[int, str]) -> Optional[int]:
+        """Resolve a species name or ID string to an integer ID"""
+        if isinstance(pokemon, int) or (isinstance(pokemon, str) and pokemon.isdigit()):
+            return int(pokemon)
+        return self._species_ids.get(pokemon.lower())
+
+    def pokemon(self, pokemon: Union[int, str]) -> Optional[Dict]:
+        """Species data in the (trimmed) shape of PokeAPI's /pokemon endpoint"""
+        species_id = self.species_id(pokemon)
+        record = self.species_record(species_id) if species_id else None
+        if record is None:
+            return None
+
+        types = [TYPE_NAMES[t] for t in record[0:2] if t != NO_TYPE]
+        base_stats, efforts, move_slots = record[2:8], record[8:14], record[14:18]
+        return {
+            'id': species_id,
+            'name': self.species_names[species_id - 1],
+            'types': [{'slot': i + 1, 'type': {'name': t}} for i, t in enumerate(types)],
+            'stats': [
+                {'stat': {'name': name}, 'base_stat': base, 'effort': effort}
+                for name, base, effort in zip(STAT_NAMES, base_stats, efforts)
+            ],
+            'moves': [{'move': {'name': self.move_names[m]}} for m in move_slots if m != NO_MOVE],
+        }
+
+    def move(self, move: Union[int, str]) -> Optional[Dict]:
+        """Move data in the (trimmed) shape of PokeAPI's /move endpoint"""
+        index = self.move_index(move)
+        if index is None:
+            return None
+
+        move_id, type_id, power, accuracy, pp = self.move_record(index)
+        return {
+            'id': move_id,
+            'name': self.move_names[index],
+            'type': {'name': TYPE_NAMES[type_id]},
+            'power': None if power == NO_VALUE_16 else power,
+            'accuracy': None if accuracy == NO_VALUE_8 else accuracy,
+            'pp': None if pp == NO_VALUE_8 else pp,
+        }
+
+
+def write_dataset(path: str, species: Iterable[Dict], moves: Iterable[Dict]) -> None:
+    """Write trimmed species and move dicts out as a dataset file.
+
+    species must be ordered by ID starting at 1, each with 'name', 'types',
+    'base_stats', 'efforts' and 'moves' (move names). moves need 'id', 'name',
+    'type', 'power', 'accuracy' and 'pp'.
+    """
+    species = list(species)
+    moves = sorted(moves, key=lambda m: m['id'])
+    move_indexes = {m['name']: i for i, m in enumerate(moves)}
+
+    index = json.dumps({
+        'species': [s['name'] for s in species],
+        'moves': [m['name'] for m in moves],
+    }, separators=(',', ':')).encode()
+
+    def optional(value, missing):
+        return missing if value is None else value
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(species), len(moves), len(index)))
+        f.write(index)
+        for s in species:
+            type_ids = [TYPE_IDS[t] for t in s['types'][:2]] + [NO_TYPE] * (2 - len(s['types'][:2]))
+            move_slots = [move_indexes[m] for m in s['moves'][:4] if m in move_indexes]
+            move_slots += [NO_MOVE] * (4 - len(move_slots))
+            f.write(SPECIES_RECORD.pack(*type_ids, *s['base_stats'], *s['efforts'], *move_slots))
+        for m in moves:
+            f.write(MOVE_RECORD.pack(
+                m['id'],
+                TYPE_IDS[m['type']],
+                optional(m['power'], NO_VALUE_16),
+                optional(m['accuracy'], NO_VALUE_8),
+                optional(m['pp'], NO_VALUE_8),
+            ))
+    os.replace(tmp_path, path)
+
+
+def load_from_env() -> Optional[Dataset]:
+    """Open the dataset named by POKEAPI_DATASET, or the default path if present"""
+    path = os.environ.get('POKEAPI_DATASET', DEFAULT_DATASET_PATH)
+    if not path or not os.path.exists(path):
+        return None
+    return Dataset(path)
+
+
+OFFLINE = os.environ.get('POKEAPI_OFFLINE', '').lower() in ('1', 'true', 'yes')
+bundled_dataset = load_from_env()
@@ -0,0 +1,214 @@
+"""Weighted encounter tables compiled into O(1) alias-method samplers.
+
+Tables are read from the JSON file named by ENCOUNTER_TABLES, for example:
+
+    {
+        "default": "wild",
+        "tables": {
+            "wild": {
+                "groups": [
+                    {"name": "kanto", "first": 1, "last": 151, "weight": 0.4},
+                    {"name": "johto", "first": 152, "last": 251, "weight": 0.6}
+                ],
+                "species": {"25": 0.05}
+            }
+        }
+    }
+
+A group's weight is split evenly across its species, and entries under
+"species" replace the weight of individual species. Without a file, a single
+"wild" table built from rules.GENERATION_WEIGHTS is used. The file is
+re-read when it changes, so operators can edit tables without restarting
+workers. A file naming a species the game can't serve (outside
+1..MAX_SPECIES_ID, or offline beyond the bundled dataset) or a negative
+weight is rejected as a whole, and the tables already loaded stay in use.
+"""
+import json
+import logging
+import math
+import os
+import random
+import threading
+import time
+from typing import Dict, List, Optional, Sequence
+
+import rules
+from dataset import MAX_SPECIES_ID, OFFLINE, bundled_dataset
+
+try:
+    import numpy as np
+except ImportError:  # batch draws fall back to plain Python
+    np = None
+
+logger = logging.getLogger(__name__)
+
+
+class AliasSampler:
+    """Vose's alias method: O(n) to build, O(1) per draw"""
+
+    def __init__(self, values: Sequence[int], weights: Sequence[float]):
+        total = float(sum(weights))
+        if not values or total <= 0:
+            raise ValueError("an encounter table needs at least one positive weight")
+        n = len(values)
+        self.values = list(values)
+        self.probability = [0.0] * n
+        self.alias = [0] * n
+
+        scaled = [w * n / total for w in weights]
+        small = [i for i, p in enumerate(scaled) if p < 1]
+        large = [i for i, p in enumerate(scaled) if p >= 1]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self.probability[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] -= 1 - scaled[less]
+            (small if scaled[more] < 1 else large).append(more)
+        for i in small + large:
+            self.probability[i] = 1.0
+
+        if np is not None:
+            self._values_array = np.array(self.values)
+            self._probability_array = np.array(self.probability)
+            self._alias_array = np.array(self.alias)
+
+    def sample(self, rng=random) -> int:
+        """Draw one value using a random.Random-compatible rng"""
+        column = int(rng.random() * len(self.values))
+        return self.values[column if rng.random() < self.probability[column] else self.alias[column]]
+
+    def sample_many(self, n: int, rng=random) -> List[int]:
+        """Draw n values; a NumPy Generator rng returns an array and draws them all at once"""
+        if np is not None and isinstance(rng, np.random.Generator):
+            columns = rng.integers(0, len(self.values), n)
+            keep = rng.random(n) < self._probability_array[columns]
+            return self._values_array[np.where(keep, columns, self._alias_array[columns])]
+        return [self.sample(rng) for _ in range(n)]
+
+
+def max_species_id() -> int:
+    """Highest species ID the game can serve; offline, only what the bundled dataset holds"""
+    if not OFFLINE or bundled_dataset is None:
+        return MAX_SPECIES_ID
+    return min(MAX_SPECIES_ID, bundled_dataset.species_count)
+
+
+class EncounterTable:
+    """Per-species encounter weights for one area"""
+
+    def __init__(self, name: str, weights: Dict[int, float], max_species: Optional[int] = None):
+        max_species = max_species or max_species_id()
+        unknown = sorted(s for s in weights if not 1 <= s <= max_species)
+        if unknown:
+            raise ValueError(f"table {name!r} has species IDs outside 1..{max_species}: {unknown[:10]}")
+        bad = sorted(s for s, w in weights.items() if not math.isfinite(w) or w < 0)
+        if bad:
+            raise ValueError(f"table {name!r} has negative or non-finite weights for species {bad[:10]}")
+        self.name = name
+        self.weights = weights
+        species = sorted(s for s, w in weights.items() if w > 0)
+        self.sampler = AliasSampler(species, [weights[s] for s in species])
+
+    @classmethod
+    def from_config(cls, name: str, config: Dict, max_species: Optional[int] = None) -> 'EncounterTable':
+        """Build a table from its JSON config, raising ValueError if it is invalid"""
+        weights: Dict[int, float] = {}
+        for group in config.get('groups', []):
+            first, last = int(group['first']), int(group['last'])
+            if first > last:
+                raise ValueError(f"table {name!r} has a group from {first} to {last}")
+            for species_id in range(first, last + 1):
+                weights[species_id] = float(group['weight']) / (last - first + 1)
+        for species_id, weight in config.get('species', {}).items():
+            weights[int(species_id)] = float(weight)
+        return cls(name, weights, max_species)
+
+    @classmethod
+    def from_rules(cls) -> 'EncounterTable':
+        return cls.from_config('wild', {'groups': [
+            {'first': first, 'last': last, 'weight': weight}
+            for first, last, weight in rules.GENERATION_WEIGHTS
+        ]}, MAX_SPECIES_ID)
+
+    def sample(self, rng=random) -> int:
+        return self.sampler.sample(rng)
+
+    def sample_many(self, n: int, rng=random):
+        return self.sampler.sample_many(n, rng)
+
+
+class EncounterTables:
+    """Named encounter tables with reload-on-change from a JSON file"""
+
+    def __init__(self, path: Optional[str] = None, check_interval: float = 1.0):
+        self.path = path
+        self.check_interval = check_interval
+        # (tables by name, default table name), replaced as a unit on reload
+        self._state = ({'wild': EncounterTable.from_rules()}, 'wild')
+        self._mtime: Optional[float] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        if path:
+            self.reload()
+
+    def reload(self) -> bool:
+        """Re-read the tables file, keeping the current tables if it is invalid"""
+        try:
+            mtime = os.path.getmtime(self.path)
+            with open(self.path, encoding='utf-8') as f:
+                config = json.load(f)
+            tables = {name: EncounterTable.from_config(name, table)
+                      for name, table in config['tables'].items()}
+            default = config.get('default', next(iter(tables)))
+            if default not in tables:
+                raise ValueError(f"default table {default!r} is not defined")
+        except (OSError, ValueError, KeyError, TypeError, StopIteration) as e:
+            logger.error("Failed to load encounter tables from %s: %s", self.path, e)
+            return False
+
+        # A single assignment so readers never see new tables with an old default
+        self._state = (tables, default)
+        self._mtime = mtime
+        logger.info("Loaded %d encounter tables from %s", len(tables), self.path)
+        return True
+
+    def _maybe_reload(self) -> None:
+        now = time.monotonic()
+        if not self.path or now - self._checked_at < self.check_interval:
+            return
+        with self._lock:
+            if now - self._checked_at < self.check_interval:
+                return
+            self._checked_at = now
+            try:
+                mtime = os.path.getmtime(self.path)
+            except OSError:
+                return
+            if mtime != self._mtime:
+                # Remember the attempt so a broken file is reported once, not on every check
+                self._mtime = mtime
+                self.reload()
+
+    @property
+    def tables(self) -> Dict[str, EncounterTable]:
+        return self._state[0]
+
+    @property
+    def default(self) -> str:
+        return self._state[1]
+
+    def get(self, name: Optional[str] = None) -> EncounterTable:
+        self._maybe_reload()
+        tables, default = self._state
+        return tables[name or default]
+
+    def sample(self, table: Optional[str] = None, rng=random) -> int:
+        """Draw one species ID from a table (the default table if none is named)"""
+        return self.get(table).sample(rng)
+
+    def sample_many(self, n: int, table: Optional[str] = None, rng=random):
+        """Draw n species IDs from a table in one call"""
+        return self.get(table).sample_many(n, rng)
+
+
+encounter_tables = EncounterTables(os.environ.get('ENCOUNTER_TABLES') or None)
@@ -1,61 +1,148 @@
+import asyncio
 import random
-import requests
-import json
 import logging
-from models import Pokemon, Pokedex
-from typing import Dict, List, Optional, Tuple
+import time
+from concurrent.futures import ThreadPoolExecutor
+from flask import g, has_request_context
+from sqlalchemy import and_, func, or_
+from app import db
+from models import STAT_KEYS, Pokemon, Pokedex
+from battle import ATTACK, DEFENSE, HP, STRUGGLE, Battle, Combatant, Move
+from cache import pokeapi_cache
+import rules
+from stats import NO_EVS, NO_IVS, calculate_stats, calculate_stats_bulk
+from encounters import encounter_tables
+from metrics import metrics
+from structured_logging import summarize
+from dataset import OFFLINE, STAT_NAMES, TYPE_IDS, bundled_dataset
+from type_chart import TYPE_CHART, type_effectiveness
+from upstream import UpstreamUnavailable, async_upstream_client, upstream_client
+import blocking
+from blocking import ASYNCIO, BLOCKING
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Shared pool for resolving several upstream resources concurrently, sized to
+# match the upstream connection pool so fetches never wait on a connection
+fetch_pool = ThreadPoolExecutor(max_workers=upstream_client.pool_size, thread_name_prefix='pokeapi-fetch')
+
+# The PokeAPI client each way of waiting goes through
+UPSTREAM_GET_JSON = {
+    BLOCKING: blocking.awaitable(upstream_client.get_json),
+    ASYNCIO: async_upstream_client.get_json,
+}
+
+# The cache keeps its own per-process counters; export them at snapshot time
+metrics.add_collector(lambda: {
+    ('pterminal_cache_lookups_total', (('result', result),)): pokeapi_cache.stats()[result]
+    for result in ('hits', 'disk_hits', 'misses', 'stale_hits', 'negative_hits', 'coalesced')
+})
+
+
+def request_memo(key: Hashable, loader: Callable[[], Any]) -> Any:
+    """Resolve key at most once per request, remembering misses too.
+
+    Outside a request (including fetch_pool threads, which have no request
+    context) the loader is simply called.
+    """
+    return blocking.run(request_memo_async(key, blocking.awaitable(loader)))
+
+
+async def request_memo_async(key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+    """request_memo() for coroutine loaders; shares the same per-request memo"""
+    if not has_request_context():
+        return await loader()
+    memo = g.setdefault('pokeapi_memo', {})
+    if key not in memo:
+        memo[key] = await loader()
+    return memo[key]
+
 
 class GameLogic:
-    TYPE_CHART = {
-        'normal': {'ghost': 0, 'rock': 0.5, 'steel': 0.5},
-        'fire': {'fire': 0.5, 'water': 0.5, 'grass': 2, 'ice': 2, 'bug': 2, 'rock': 0.5, 'dragon': 0.5, 'steel': 2},
-        'water': {'fire': 2, 'water': 0.5, 'grass': 0.5, 'ground': 2, 'rock': 2, 'dragon': 0.5},
-        'electric': {'water': 2, 'electric': 0.5, 'grass': 0.5, 'ground': 0, 'flying': 2, 'dragon': 0.5},
-        'grass': {'fire': 0.5, 'water': 2, 'grass': 0.5, 'poison': 0.5, 'ground': 2, 'flying': 0.5, 'bug': 0.5, 'rock': 2, 'dragon': 0.5, 'steel': 0.5},
-        'ice': {'fire': 0.5, 'water': 0.5, 'grass': 2, 'ice': 0.5, 'ground': 2, 'flying': 2, 'dragon': 2, 'steel': 0.5},
-        'fighting': {'normal': 2, 'ice': 2, 'poison': 0.5, 'flying': 0.5, 'psychic': 0.5, 'bug': 0.5, 'rock': 2, 'ghost': 0, 'dark': 2, 'steel': 2, 'fairy': 0.5},
-        'poison': {'grass': 2, 'poison': 0.5, 'ground': 0.5, 'rock': 0.5, 'ghost': 0.5, 'steel': 0, 'fairy': 2},
-        'ground': {'fire': 2, 'electric': 2, 'grass': 0.5, 'poison': 2, 'flying': 0, 'bug': 0.5, 'rock': 2, 'steel': 2},
-        'flying': {'electric': 0.5, 'grass': 2, 'fighting': 2, 'bug': 2, 'rock': 0.5, 'steel': 0.5},
-        'psychic': {'fighting': 2, 'poison': 2, 'psychic': 0.5, 'dark': 0, 'steel': 0.5},
-        'bug': {'fire': 0.5, 'grass': 2, 'fighting': 0.5, 'poison': 0.5, 'flying': 0.5, 'psychic': 2, 'ghost': 0.5, 'dark': 2, 'steel': 0.5, 'fairy': 0.5},
-        'rock': {'fire': 2, 'ice': 2, 'fighting': 0.5, 'ground': 0.5, 'flying': 2, 'bug': 2, 'steel': 0.5},
-        'ghost': {'normal': 0, 'psychic': 2, 'ghost': 2, 'dark': 0.5},
-        'dragon': {'dragon': 2, 'steel': 0.5, 'fairy': 0},
-        'dark': {'fighting': 0.5, 'psychic': 2, 'ghost': 2, 'dark': 0.5, 'fairy': 0.5},
-        'steel': {'fire': 0.5, 'water': 0.5, 'electric': 0.5, 'ice': 2, 'rock': 2, 'steel': 0.5, 'fairy': 2},
-        'fairy': {'fire': 0.5, 'fighting': 2, 'poison': 0.5, 'dragon': 2, 'dark': 2, 'steel': 0.5}
-    }
+    """Game rules and data lookups.
+
+    Each lookup that can reach PokeAPI is written once as a coroutine taking
+    an io (see blocking.py): the plain method runs it under BLOCKING with the
+    pooled requests client, and its *_async twin awaits it under ASYNCIO with
+    the httpx client.
+    """
+    TYPE_CHART = TYPE_CHART
+
+    @staticmethod
+    def fetch_api(path: str) -> Optional[Any]:
+        """Fetch a PokeAPI resource, serving it from the cache when possible"""
+        return blocking.run(GameLogic._fetch_api(path, BLOCKING))
+
+    @staticmethod
+    async def fetch_api_async(path: str) -> Optional[Any]:
+        """fetch_api() for coroutines: upstream I/O is awaited instead of holding a thread"""
+        return await GameLogic._fetch_api(path, ASYNCIO)
+
+    @staticmethod
+    async def _fetch_api(path: str, io) -> Optional[Any]:
+        async def load():
+            if OFFLINE:
+                return pokeapi_cache.get(path)
+            try:
+                data = await pokeapi_cache.load(path, lambda: GameLogic._fetch_upstream(path, io), io)
+            except UpstreamUnavailable as e:
+                logger.warning("Serving %s from stale cache: %s", path, e)
+                return pokeapi_cache.get_stale(path)
+            # None is a failure cached as a negative entry; an expired copy beats nothing
+            return data if data is not None else pokeapi_cache.get_stale(path)
+        return await request_memo_async(('api', path), load)
+
+    @staticmethod
+    async def _fetch_upstream(path: str, io) -> Optional[Any]:
+        endpoint = path.split('/')[0]
+        started = time.perf_counter()
+        try:
+            data = await UPSTREAM_GET_JSON[io](path)
+        except UpstreamUnavailable:
+            metrics.inc('pterminal_upstream_requests_total', endpoint=endpoint, result='unavailable')
+            raise
+        metrics.observe('pterminal_upstream_request_duration_seconds', time.perf_counter() - started,
+                        endpoint=endpoint)
+        metrics.inc('pterminal_upstream_requests_total', endpoint=endpoint,
+                    result='ok' if data is not None else 'not_found')
+        return data
 
     @staticmethod
     def get_pokemon_data(pokemon_id):
-        """Fetch Pokémon data from PokeAPI"""
-        response = requests.get(f"https://pokeapi.co/api/v2/pokemon/{pokemon_id}")
-        return response.json() if response.status_code == 200 else None
+        """Fetch Pokémon data from the bundled dataset or PokeAPI"""
+        return blocking.run(GameLogic._get_pokemon_data(pokemon_id, BLOCKING))
+
+    @staticmethod
+    async def get_pokemon_data_async(pokemon_id):
+        """get_pokemon_data() for coroutines"""
+        return await GameLogic._get_pokemon_data(pokemon_id, ASYNCIO)
+
+    @staticmethod
+    async def _get_pokemon_data(pokemon_id, io):
+        async def load():
+            if bundled_dataset is not None:
+                data = bundled_dataset.pokemon(pokemon_id)
+                if data is not None:
+                    return data
+            return await GameLogic._fetch_api(f"pokemon/{pokemon_id}", io)
+        return await request_memo_async(('pokemon', str(pokemon_id).lower()), load)
+
+    @staticmethod
+    def get_pokemon_data_many(pokemon_ids: List[int]) -> Dict[int, Optional[Dict]]:
+        """Resolve several species concurrently, each distinct ID only once"""
+        unique = list(dict.fromkeys(pokemon_ids))
+        return dict(zip(unique, fetch_pool.map(GameLogic.get_pokemon_data, unique)))
 
     @staticmethod
     def get_pokemon_species_data(pokemon_id):
         """Fetch Pokémon species data from PokeAPI"""
-        response = requests.get(f"https://pokeapi.co/api/v2/pokemon-species/{pokemon_id}")
-        return response.json() if response.status_code == 200 else None
+        return GameLogic.fetch_api(f"pokemon-species/{pokemon_id}")
 
     @staticmethod
     def generate_random_pokemon():
-        """Generate random Pokémon with rarity weights"""
-        rarity_weights = [
-            (list(range(1, 152)), 0.4),    # Gen 1: 40%
-            (list(range(152, 252)), 0.3),   # Gen 2: 30%
-            (list(range(252, 387)), 0.15),  # Gen 3: 15%
-            (list(range(387, 494)), 0.1),   # Gen 4: 10%
-            (list(range(494, 650)), 0.05),  # Gen 5: 5%
-        ]
-
-        chosen_range = random.choices(
-            [range_tuple[0] for range_tuple in rarity_weights],
-            [range_tuple[1] for range_tuple in rarity_weights]
-        )[0]
-
-        return random.choice(chosen_range)
+        """Generate random Pokémon from the default encounter table"""
+        return encounter_tables.sample()
 
     @staticmethod
     def get_pokemon_ascii_art(pokemon_name: str) -> str:
@@ -70,9 +157,10 @@ class GameLogic:
         """
 
     @staticmethod
-    def get_pokemon_ev_yields(pokemon_id: int) -> Dict[str, int]:
-        """Get EV yields for a Pokémon"""
-        pokemon_data = GameLogic.get_pokemon_data(pokemon_id)
+    def get_pokemon_ev_yields(pokemon_id: int, pokemon_data: Optional[Dict] = None) -> Dict[str, int]:
+        """Get EV yields for a Pokémon, from pokemon_data when the caller already has it"""
+        if pokemon_data is None:
+            pokemon_data = GameLogic.get_pokemon_data(pokemon_id)
         if not pokemon_data:
             return {}
 
@@ -98,36 +186,12 @@ class GameLogic:
         return '\n'.join(lines)
 
     @staticmethod
-    def calculate_type_effectiveness(move_type: str, defender_types: List[str]) -> float:
-        """Calculate type effectiveness multiplier"""
-        multiplier = 1.0
-        for def_type in defender_types:
-            if def_type in GameLogic.TYPE_CHART.get(move_type, {}):
-                multiplier *= GameLogic.TYPE_CHART[move_type][def_type]
-        return multiplier
-
-    @staticmethod
-    def calculate_damage(move: Dict, attacker: Dict, defender: Dict) -> Tuple[int, float]:
-        """Calculate battle damage"""
-        # Basic damage formula
-        level = attacker.get('level', 50)
-        power = move.get('power', 0)
-        
-        # Handle status moves (no power)
-        if power is None:
-            power = 0
-            
-        attack = attacker.get('stats', {}).get('attack', 50)
-        defense = defender.get('stats', {}).get('defense', 50)
-
-        # Calculate type effectiveness
-        effectiveness = GameLogic.calculate_type_effectiveness(
-            move['type'],
-            defender['types']  # The types are already just strings in the battle state
-        )
-
-        # Basic Pokémon damage formula
-        damage = ((2 * level / 5 + 2) * power * attack / defense / 50 + 2) * effectiveness
+    def calculate_battle_damage(move: Move, attacker: Combatant, defender: Combatant) -> Tuple[int, float]:
+        """Calculate battle damage between two combatants"""
+        effectiveness = type_effectiveness(move.type_id, defender.type_ids)
+        damage = rules.base_damage(
+            attacker.level, move.power or 0, attacker.stats[ATTACK], defender.stats[DEFENSE]
+        ) * effectiveness
         return int(damage), effectiveness
 
     @staticmethod
@@ -142,87 +206,168 @@ class GameLogic:
         try:
             trainer_pokemon = Pokemon.query.filter_by(trainer_id=trainer_id).first()
             if not trainer_pokemon:
-                logging.error("No trainer pokemon found")
+                logger.error("No trainer pokemon found")
                 return None
 
             trainer_pokemon_data = GameLogic.get_pokemon_data(trainer_pokemon.pokemon_id)
-            if not trainer_pokemon_data:
-                logging.error("Failed to fetch trainer pokemon data")
-                return None
+            trainer_moves, wild_moves = GameLogic.battle_move_keys(trainer_pokemon, wild_pokemon)
+            # Every move either side can use, resolved once for the whole battle
+            move_data = GameLogic.get_moves_data(trainer_moves + wild_moves)
+            return GameLogic.build_battle(trainer_pokemon, trainer_pokemon_data, trainer_moves,
+                                          wild_pokemon, wild_moves, move_data)
 
-            # Get Pokemon types
-            wild_types = [t['type']['name'] for t in wild_pokemon['types']]
-            trainer_types = [t['type']['name'] for t in trainer_pokemon_data['types']]
-
-            # Get base stats
-            wild_stats = {stat['stat']['name']: stat['base_stat'] for stat in wild_pokemon['stats']}
-            trainer_stats = {stat['stat']['name']: stat['base_stat'] for stat in trainer_pokemon_data['stats']}
-
-            # Get trainer Pokemon moves
-            trainer_moves = json.loads(trainer_pokemon.moves)
-            if not trainer_moves:
-                trainer_moves = ['tackle']  # Fallback move
-
-            # Get wild Pokemon moves (first 4 or all if less than 4)
-            wild_moves = [move['move']['name'] for move in wild_pokemon['moves'][:4]]
-            if not wild_moves:
-                wild_moves = ['tackle']
-
-            # Determine wild Pokemon level using weighted RNG
-            # 80% chance for level 1-20, 20% chance for level 20-75
-            wild_level = random.randint(1, 20) if random.random() < 0.8 else random.randint(20, 75)
-            
-            # Calculate scaled HP based on level
-            # Basic formula: (Base HP * 2 * Level / 100) + Level + 10
-            base_hp = wild_stats['hp']
-            scaled_hp = int((base_hp * 2 * wild_level / 100) + wild_level + 10)
-            
-            # Create battle state
-            battle_state = {
-                'wild_pokemon': {
-                    'name': wild_pokemon['name'],
-                    'types': wild_types,
-                    'current_hp': scaled_hp,
-                    'max_hp': scaled_hp,
-                    'stats': wild_stats,
-                    'moves': wild_moves,
-                    'level': wild_level
-                },
-                'trainer_pokemon': {
-                    'name': trainer_pokemon_data['name'],
-                    'types': trainer_types,
-                    'current_hp': trainer_stats['hp'],
-                    'max_hp': trainer_stats['hp'],
-                    'stats': trainer_stats,
-                    'moves': trainer_moves,
-                    'level': trainer_pokemon.level
-                },
-                'turn': 'player'
-            }
+        except Exception as e:
+            logger.exception("Error initializing battle: %s", e)
+            return None
+
+    @staticmethod
+    async def prefetch_battle_async(trainer_id: int, wild_pokemon_id: int) -> None:
+        """Resolve the species and moves initialize_battle() will look up, concurrently"""
+        # A pool checkout can block, and a connection held across the awaits
+        # below would starve the event loop's other commands of connections
+        trainer_pokemon = await asyncio.to_thread(GameLogic.first_pokemon_released, trainer_id)
+        wild_pokemon = await GameLogic.get_pokemon_data_async(wild_pokemon_id)
+        if not trainer_pokemon or not wild_pokemon:
+            return
+
+        trainer_moves, wild_moves = GameLogic.battle_move_keys(trainer_pokemon, wild_pokemon)
+        await asyncio.gather(
+            GameLogic.get_pokemon_data_async(trainer_pokemon.pokemon_id),
+            GameLogic.get_moves_data_async(trainer_moves + wild_moves),
+        )
 
-            logging.debug(f"Battle state initialized: {battle_state}")
-            return battle_state
+    @staticmethod
+    def first_pokemon_released(trainer_id: int) -> Optional[Pokemon]:
+        """The trainer's first Pokémon, detached, with the session's connection returned to the pool"""
+        try:
+            return Pokemon.query.filter_by(trainer_id=trainer_id).first()
+        finally:
+            db.session.close()
 
-        except Exception as e:
-            logging.error(f"Error initializing battle: {e}")
+    @staticmethod
+    def battle_move_keys(trainer_pokemon: Pokemon, wild_pokemon: Dict) -> Tuple[List[str], List[str]]:
+        """Move names for the trainer's and the wild Pokémon's side"""
+        # Get trainer Pokemon moves
+        trainer_moves = trainer_pokemon.get_moves()
+        if not trainer_moves:
+            trainer_moves = ['tackle']  # Fallback move
+
+        # Get wild Pokemon moves (first 4 or all if less than 4)
+        wild_moves = [move['move']['name'] for move in wild_pokemon['moves'][:4]]
+        if not wild_moves:
+            wild_moves = ['tackle']
+        return trainer_moves, wild_moves
+
+    @staticmethod
+    def build_battle(trainer_pokemon: Pokemon, trainer_pokemon_data: Optional[Dict], trainer_moves: List[str],
+                     wild_pokemon: Dict, wild_moves: List[str],
+                     move_data: Dict[str, Optional[Dict]]) -> Optional[Battle]:
+        """Assemble a battle from already-resolved species and move data"""
+        if not trainer_pokemon_data:
+            logger.error("Failed to fetch trainer pokemon data")
             return None
 
+        wild_level = GameLogic.roll_wild_level()
+        # Wild Pokémon have no IVs, EVs or nature, so their HP is rules.scaled_hp()
+        wild_stats = calculate_stats(GameLogic.base_stats(wild_pokemon), NO_IVS, NO_EVS, wild_level)
+        wild = GameLogic.build_combatant(wild_pokemon, wild_level, wild_moves, move_data, wild_stats)
+
+        trainer = GameLogic.build_combatant(
+            trainer_pokemon_data, trainer_pokemon.level, trainer_moves, move_data,
+            GameLogic.pokemon_stats(trainer_pokemon, trainer_pokemon_data)
+        )
+        trainer.species_id = trainer_pokemon.pokemon_id
+        battle_state = Battle(wild, trainer)
+
+        logger.debug("Battle state initialized: %s", summarize(battle_state))
+        return battle_state
+
+    @staticmethod
+    def roll_wild_level() -> int:
+        """Determine wild Pokemon level using weighted RNG"""
+        if random.random() < rules.WILD_LOW_LEVEL_CHANCE:
+            return random.randint(*rules.WILD_LOW_LEVELS)
+        return random.randint(*rules.WILD_HIGH_LEVELS)
+
+    @staticmethod
+    def base_stats(pokemon_data: Dict) -> Tuple[int, ...]:
+        """A species' base stats in STAT_NAMES order"""
+        base_stats = {stat['stat']['name']: stat['base_stat'] for stat in pokemon_data['stats']}
+        return tuple(base_stats[name] for name in STAT_NAMES)
+
     @staticmethod
-    def format_battle_state(battle_state: Dict) -> str:
+    def pokemon_stats(pokemon: Pokemon, pokemon_data: Dict) -> Tuple[int, ...]:
+        """A caught Pokémon's battle stats, cached on its row until its level or EVs change.
+
+        A freshly computed value is left for the caller's transaction to commit.
+        """
+        stats = pokemon.get_stats()
+        if stats is None:
+            stats = calculate_stats(GameLogic.base_stats(pokemon_data), GameLogic.stat_values(pokemon.get_ivs()),
+                                    GameLogic.stat_values(pokemon.get_evs()), pokemon.level or 1, pokemon.nature)
+            pokemon.set_stats(stats)
+        return stats
+
+    @staticmethod
+    def stat_values(values: Dict[str, int]) -> Tuple[int, ...]:
+        """An IV or EV dict as a tuple in STAT_KEYS order"""
+        return tuple(values.get(key) or 0 for key in STAT_KEYS)
+
+    @staticmethod
+    def refresh_trainer_stats(trainer_id: int, force: bool = False) -> int:
+        """Compute the cached stats of a trainer's whole collection in one vectorized pass.
+
+        Only Pokémon without cached stats are recomputed unless force is set.
+        Returns how many were updated; the caller commits.
+        """
+        query = Pokemon.query.filter(Pokemon.trainer_id == trainer_id)
+        if not force:
+            query = query.filter(Pokemon.stat_hp.is_(None))
+        pokemon_list = query.all()
+        species_data = GameLogic.get_pokemon_data_many([p.pokemon_id for p in pokemon_list])
+        pokemon_list = [p for p in pokemon_list if species_data.get(p.pokemon_id)]
+        results = calculate_stats_bulk(
+            [GameLogic.base_stats(species_data[p.pokemon_id]) for p in pokemon_list],
+            [GameLogic.stat_values(p.get_ivs()) for p in pokemon_list],
+            [GameLogic.stat_values(p.get_evs()) for p in pokemon_list],
+            [p.level or 1 for p in pokemon_list],
+            [p.nature for p in pokemon_list],
+        )
+        for pokemon, stats in zip(pokemon_list, results):
+            pokemon.set_stats(stats)
+        return len(pokemon_list)
+
+    @staticmethod
+    def build_combatant(pokemon_data: Dict, level: int, move_keys: List[str],
+                        move_data: Dict[str, Optional[Dict]],
+                        stats: Optional[Tuple[int, ...]] = None) -> Combatant:
+        """Build one side of a battle from PokeAPI data and computed stats (base stats if none)"""
+        if stats is None:
+            stats = GameLogic.base_stats(pokemon_data)
+        type_ids = tuple(TYPE_IDS[t['type']['name']] for t in pokemon_data['types'])
+        moves = tuple(
+            Move.from_data(key, move_data[key.lower()]) if move_data.get(key.lower()) else None
+            for key in move_keys
+        )
+        return Combatant(pokemon_data.get('id', 0), pokemon_data['name'], level, type_ids, stats,
+                         stats[HP], stats[HP], tuple(move_keys), moves)
+
+    @staticmethod
+    def format_battle_state(battle_state: Battle) -> str:
         """Format current battle state for display"""
-        wild = battle_state['wild_pokemon']
-        trainer = battle_state['trainer_pokemon']
+        wild = battle_state.wild
+        trainer = battle_state.trainer
 
         # Make sure we're displaying current values
-        wild_hp_bar = GameLogic.format_hp_bar(wild['current_hp'], wild['max_hp'])
-        trainer_hp_bar = GameLogic.format_hp_bar(trainer['current_hp'], trainer['max_hp'])
+        wild_hp_bar = GameLogic.format_hp_bar(wild.current_hp, wild.max_hp)
+        trainer_hp_bar = GameLogic.format_hp_bar(trainer.current_hp, trainer.max_hp)
 
         # Check if catch is possible (HP below 50%)
-        catch_possible = wild['current_hp'] <= (wild['max_hp'] / 2)
+        catch_possible = wild.current_hp <= (wild.max_hp * rules.CATCH_HP_THRESHOLD)
         
         battle_text = [
-            f"Opponent's {wild['name'].capitalize()} [{' / '.join(t.capitalize() for t in wild['types'])}]",
-            f"Lv. {wild['level']}  •  HP {wild['current_hp']}/{wild['max_hp']}",
+            f"Opponent's {wild.name.capitalize()} [{' / '.join(t.capitalize() for t in wild.type_names)}]",
+            f"Lv. {wild.level}  •  HP {wild.current_hp}/{wild.max_hp}",
             wild_hp_bar
         ]
         
@@ -232,32 +377,59 @@ class GameLogic:
         
         battle_text.extend([
             "",
-            f"Your {trainer['name'].capitalize()} [{' / '.join(t.capitalize() for t in trainer['types'])}]",
-            f"Lv. {trainer['level']}  •  HP {trainer['current_hp']}/{trainer['max_hp']}",
+            f"Your {trainer.name.capitalize()} [{' / '.join(t.capitalize() for t in trainer.type_names)}]",
+            f"Lv. {trainer.level}  •  HP {trainer.current_hp}/{trainer.max_hp}",
             trainer_hp_bar,
             "",
             "Available Moves:"
         ])
 
         # Add moves
-        for i, move_name in enumerate(trainer['moves'], 1):
-            move_data = GameLogic.get_move_data(move_name)
-            if move_data:
+        for i, move in enumerate(trainer.moves, 1):
+            if move:
                 battle_text.append(
-                    f"{i}. {move_data['name']} [{move_data['type'].capitalize()}]"
-                    f"  Power: {move_data.get('power', '-')}  "
-                    f"Accuracy: {move_data.get('accuracy', '-')}"
+                    f"{i}. {move.name} [{move.type_name.capitalize()}]"
+                    f"  Power: {move.power}  "
+                    f"Accuracy: {move.accuracy}"
                 )
 
         return '\n'.join(battle_text)
 
+    @staticmethod
+    def get_moves_data(move_names: List[str]) -> Dict[str, Optional[Dict]]:
+        """Resolve several moves concurrently, keyed by lowercased move name"""
+        unique = list(dict.fromkeys(name.lower() for name in move_names))
+        return dict(zip(unique, fetch_pool.map(GameLogic.get_move_data, unique)))
+
+    @staticmethod
+    async def get_moves_data_async(move_names: List[str]) -> Dict[str, Optional[Dict]]:
+        """get_moves_data() for coroutines"""
+        unique = list(dict.fromkeys(name.lower() for name in move_names))
+        return dict(zip(unique, await asyncio.gather(*map(GameLogic.get_move_data_async, unique))))
+
     @staticmethod
     def get_move_data(move_name: str) -> Optional[Dict]:
-        """Fetch move data from PokeAPI"""
-        response = requests.get(f"https://pokeapi.co/api/v2/move/{move_name.lower()}")
-        if response.status_code == 200:
-            data = response.json()
+        """Fetch move data from the bundled dataset or PokeAPI"""
+        return blocking.run(GameLogic._get_move_data(move_name, BLOCKING))
+
+    @staticmethod
+    async def get_move_data_async(move_name: str) -> Optional[Dict]:
+        """get_move_data() for coroutines"""
+        return await GameLogic._get_move_data(move_name, ASYNCIO)
+
+    @staticmethod
+    async def _get_move_data(move_name: str, io) -> Optional[Dict]:
+        data = bundled_dataset.move(move_name) if bundled_dataset is not None else None
+        if data is None:
+            data = await GameLogic._fetch_api(f"move/{move_name.lower()}", io)
+        return GameLogic.move_record(data)
+
+    @staticmethod
+    def move_record(data: Optional[Dict]) -> Optional[Dict]:
+        """The fields of a PokeAPI move the battle code uses"""
+        if data:
             return {
+                'id': data.get('id'),
                 'name': data['name'].replace('-', ' ').title(),
                 'type': data['type']['name'],
                 'power': data.get('power'),
@@ -267,39 +439,35 @@ class GameLogic:
         return None
 
     @staticmethod
-    def execute_turn(battle_state: Dict, move_index: int) -> Dict:
+    def execute_turn(battle_state: Battle, move_index: int) -> Dict:
         """Execute a battle turn"""
         if not battle_state:
-            logging.error("No battle state provided")
+            logger.error("No battle state provided")
             return {'status': 'error', 'message': 'Invalid battle state!'}
 
         try:
-            trainer_pokemon = battle_state['trainer_pokemon']
-            wild_pokemon = battle_state['wild_pokemon']
+            trainer_pokemon = battle_state.trainer
+            wild_pokemon = battle_state.wild
 
             # Player's turn
-            if battle_state['turn'] == 'player':
-                if move_index >= len(trainer_pokemon['moves']):
+            if battle_state.turn == 'player':
+                if not 0 <= move_index < len(trainer_pokemon.moves):
                     return {'status': 'error', 'message': 'Invalid move!'}
 
                 # Get move data
-                move = GameLogic.get_move_data(trainer_pokemon['moves'][move_index])
+                move = trainer_pokemon.moves[move_index]
                 if not move:
                     return {'status': 'error', 'message': 'Move data not found!'}
 
                 # Calculate damage
-                damage, effectiveness = GameLogic.calculate_damage(
-                    move,
-                    {'level': trainer_pokemon['level'], 'stats': trainer_pokemon['stats']},
-                    {'stats': wild_pokemon['stats'], 'types': wild_pokemon['types']}
-                )
+                damage, effectiveness = GameLogic.calculate_battle_damage(move, trainer_pokemon, wild_pokemon)
 
                 # Apply damage
-                wild_pokemon['current_hp'] = max(0, wild_pokemon['current_hp'] - damage)
+                wild_pokemon.current_hp = max(0, wild_pokemon.current_hp - damage)
 
                 # Generate battle message (more concise)
                 message = [
-                    f"{trainer_pokemon['name'].capitalize()} used {move['name']}!"
+                    f"{trainer_pokemon.name.capitalize()} used {move.name}!"
                 ]
 
                 # Add effectiveness message
@@ -313,39 +481,35 @@ class GameLogic:
                 message.append(f"Dealt {damage} damage!")
 
                 # Check if wild Pokemon fainted
-                if wild_pokemon['current_hp'] <= 0:
+                if wild_pokemon.current_hp <= 0:
                     message.extend([
                         "",
-                        f"The wild {wild_pokemon['name'].capitalize()} fainted!",
+                        f"The wild {wild_pokemon.name.capitalize()} fainted!",
                         "You won the battle!"
                     ])
                     return {
                         'status': 'success',
                         'message': '\n'.join(message),
                         'battle_state': None,
-                        'battle_ended': True
+                        'battle_ended': True,
+                        'outcome': 'won'
                     }
 
                 # AI's turn
-                wild_move = random.choice(wild_pokemon['moves'])
-                move_data = GameLogic.get_move_data(wild_move)
-                if not move_data:
-                    move_data = {'name': 'Struggle', 'type': 'normal', 'power': 50, 'accuracy': 100}
+                wild_move = random.choice(wild_pokemon.moves) or STRUGGLE
 
                 # Calculate AI damage
-                ai_damage, ai_effectiveness = GameLogic.calculate_damage(
-                    move_data,
-                    {'level': wild_pokemon['level'], 'stats': wild_pokemon['stats']},
-                    {'stats': trainer_pokemon['stats'], 'types': trainer_pokemon['types']}
+                ai_damage, ai_effectiveness = GameLogic.calculate_battle_damage(
+                    wild_move, wild_pokemon, trainer_pokemon
                 )
 
                 # Apply AI damage
-                trainer_pokemon['current_hp'] = max(0, trainer_pokemon['current_hp'] - ai_damage)
+                trainer_pokemon.current_hp = max(0, trainer_pokemon.current_hp - ai_damage)
 
                 # Add AI turn messages (with consistent spacing)
                 message.extend([
                     "",
-                    f"Wild {wild_pokemon['name'].capitalize()} used {move_data['name']}!"
+                    f"Wild {wild_pokemon.name.capitalize()} used {wild_move.name}!"
                 ])
 
                 if ai_effectiveness > 1:
@@ -358,21 +522,22 @@ class GameLogic:
                 message.append(f"Dealt {ai_damage} damage!")
 
                 # Check if trainer Pokemon fainted
-                if trainer_pokemon['current_hp'] <= 0:
+                if trainer_pokemon.current_hp <= 0:
                     message.extend([
                         "",
-                        f"Your {trainer_pokemon['name'].capitalize()} fainted!",
+                        f"Your {trainer_pokemon.name.capitalize()} fainted!",
                         "You lost the battle!"
                     ])
                     return {
                         'status': 'success',
                         'message': '\n'.join(message),
                         'battle_state': None,
-                        'battle_ended': True
+                        'battle_ended': True,
+                        'outcome': 'lost'
                     }
 
                 # Continue battle
-                battle_state['turn'] = 'player'
+                battle_state.turn = 'player'
                 message.append("\nChoose your move (type /move <number>)")
 
                 return {
@@ -385,18 +550,23 @@ class GameLogic:
                 return {'status': 'error', 'message': 'Not your turn!'}
 
         except Exception as e:
-            logging.error(f"Error executing turn: {e}")
+            logger.exception("Error executing turn: %s", e)
             return {'status': 'error', 'message': 'Battle execution failed!'}
 
     @staticmethod
-    def create_new_pokemon(trainer_id, pokemon_id, level=1):
-        """Create a new Pokemon instance with random stats"""
-        pokemon_data = GameLogic.get_pokemon_data(pokemon_id)
-        if not pokemon_data:
-            return None
+    def create_new_pokemon(trainer_id, pokemon_id, level=1, moves: Optional[List[str]] = None):
+        """Create a new Pokemon instance with random stats.
+
+        Pass moves when they are already known (e.g. from a battle) to skip
+        looking the species up.
+        """
+        if moves is None:
+            pokemon_data = GameLogic.get_pokemon_data(pokemon_id)
+            if not pokemon_data:
+                return None
 
-        # Get first 4 moves or all if less than 4
-        moves = [move['move']['name'] for move in pokemon_data['moves'][:4]]
+            # Get first 4 moves or all if less than 4
+            moves = [move['move']['name'] for move in pokemon_data['moves'][:4]]
         if not moves:  # Ensure at least one move
             moves = ['tackle']  # Default move
 
@@ -419,17 +589,72 @@ class GameLogic:
             trainer_id=trainer_id,
             pokemon_id=pokemon_id,
             level=level,
-            nature=random.choice(natures),
-            ivs=json.dumps(ivs),
-            evs=json.dumps({
-                "hp": 0, "attack": 0, "defense": 0,
-                "sp_attack": 0, "sp_defense": 0, "speed": 0
-            }),
-            moves=json.dumps(moves)
+            nature=random.choice(natures)
         )
+        new_pokemon.set_ivs(ivs)
+        new_pokemon.set_evs({})
+        new_pokemon.set_moves(moves)
         return new_pokemon
 
+    # /mypokemon sort keys; every sort is tie-broken on Pokemon.id for a stable cursor
+    POKEMON_SORT_COLUMNS = {
+        'caught': None,
+        'level': Pokemon.level,
+        'species': Pokemon.pokemon_id,
+        'nature': func.lower(func.coalesce(Pokemon.nature, '')),
+    }
+
+    @staticmethod
+    def list_trainer_pokemon(trainer_id: int, sort: str = 'caught', descending: bool = False,
+                             limit: int = 20, cursor: Optional[str] = None,
+                             species_id: Optional[int] = None, nature: Optional[str] = None,
+                             min_level: Optional[int] = None,
+                             max_level: Optional[int] = None) -> Tuple[List[Pokemon], Optional[str]]:
+        """One page of a trainer's Pokémon and the cursor for the next page.
+
+        Pagination is keyset based: the cursor is the sort value and ID of the
+        last row returned, so each page is a bounded index range scan however
+        many Pokémon the trainer owns.
+        """
+        if sort not in GameLogic.POKEMON_SORT_COLUMNS:
+            raise ValueError(f"Unknown sort '{sort}'")
+        column = GameLogic.POKEMON_SORT_COLUMNS[sort]
+
+        query = Pokemon.query.filter(Pokemon.trainer_id == trainer_id)
+        if species_id is not None:
+            query = query.filter(Pokemon.pokemon_id == species_id)
+        if nature:
+            query = query.filter(func.lower(Pokemon.nature) == nature.lower())
+        if min_level is not None:
+            query = query.filter(Pokemon.level >= min_level)
+        if max_level is not None:
+            query = query.filter(Pokemon.level <= max_level)
+
+        if cursor:
+            value, _, last_id = cursor.rpartition('~')
+            last_id = int(last_id)
+            after = Pokemon.id < last_id if descending else Pokemon.id > last_id
+            if column is not None:
+                value = value if sort == 'nature' else int(value)
+                beyond = column < value if descending else column > value
+                after = or_(beyond, and_(column == value, after))
+            query = query.filter(after)
+
+        order = [Pokemon.id.desc() if descending else Pokemon.id]
+        if column is not None:
+            order.insert(0, column.desc() if descending else column)
+        rows = query.order_by(*order).limit(limit + 1).all()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            value = {'caught': '', 'level': last.level, 'species': last.pokemon_id,
+                     'nature': (last.nature or '').lower()}[sort]
+            next_cursor = f"{value}~{last.id}"
+        return rows, next_cursor
+
     @staticmethod
     def get_pokemon_sprite_url(pokemon_id: int) -> str:
-        """Get sprite URL for a Pokémon"""
-        return f"https://raw.githubusercontent.com/PokeAPI/sprites/master/sprites/pokemon/{pokemon_id}.png"
\ No newline at end of file
+        """Get sprite URL for a Pokémon, served from the local sprite cache"""
+        return f"/sprites/{pokemon_id}.png"
\ No newline at end of file
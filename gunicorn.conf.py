@@ -0,0 +1,55 @@
+"""Gunicorn settings:
+
+    gunicorn -c gunicorn.conf.py main:app
+
+The app is imported and warmed up once in the master, then frozen out of the
+garbage collector's reach so forked workers keep sharing those pages
+copy-on-write. Set WEB_PRELOAD=0 to load the app in each worker instead
+(needed for --reload), in which case workers warm up after booting. To
+serve /api/command/async on an event loop, run asgi.py under uvicorn instead.
+"""
+import gc
+import os
+
+bind = os.environ.get('BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+# /api/stream holds a thread for as long as the browser is connected; see
+# streaming.py for how many of them a worker accepts
+worker_class = 'gthread'
+threads = int(os.environ.get('WEB_THREADS', 8))
+preload_app = os.environ.get('WEB_PRELOAD', '1') != '0'
+
+
+def on_starting(server):
+    # Snapshots left by a previous run's workers would be summed into /metrics
+    metrics_dir = os.environ.get('METRICS_DIR')
+    if metrics_dir and os.path.isdir(metrics_dir):
+        for filename in os.listdir(metrics_dir):
+            if filename.endswith(('.json', '.tmp')):
+                os.remove(os.path.join(metrics_dir, filename))
+
+
+def when_ready(server):
+    if not server.cfg.preload_app:
+        return
+    import warmup
+
+    warmup.warm_up()
+    # Objects that survive from here on are never scanned by the collector,
+    # so it doesn't write to (and un-share) their pages in the workers
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # Database connections opened while loading the app belong to the master
+    from app import app, db
+
+    with app.app_context():
+        db.engine.dispose(close=False)
+
+
+def post_worker_init(worker):
+    import warmup
+
+    if not warmup.ready.is_set():
+        warmup.warm_up_in_background()
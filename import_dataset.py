@@ -0,0 +1,118 @@
+"""Build the bundled species/move dataset used by offline mode.
+
+Usage:
+    python import_dataset.py --source https://pokeapi.co/api/v2
+    python import_dataset.py --source http://localhost:8000/api/v2
+    python import_dataset.py --source /path/to/api-data/data/api/v2
+
+The source is either a PokeAPI-compatible base URL or the root of a PokeAPI
+JSON dump (the api-data repository layout, ``<kind>/<id>/index.json``).
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+import requests
+
+from dataset import DEFAULT_DATASET_PATH, MAX_SPECIES_ID, STAT_NAMES, write_dataset
+
+logger = logging.getLogger(__name__)
+
+# Fallback move used by the battle code when a Pokémon has no moves
+FALLBACK_MOVE_ID = 33
+
+
+class Source:
+    """Reads PokeAPI resources from a base URL or a local dump directory"""
+
+    def __init__(self, location: str):
+        self.location = location.rstrip('/')
+        self.remote = self.location.startswith(('http://', 'https://'))
+        self.session = requests.Session() if self.remote else None
+
+    def get(self, kind: str, key) -> Optional[Dict]:
+        if self.remote:
+            response = self.session.get(f"{self.location}/{kind}/{key}/", timeout=30)
+            return response.json() if response.status_code == 200 else None
+
+        path = os.path.join(self.location, kind, str(key), 'index.json')
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+
+
+def move_id_from_url(url: str) -> Optional[int]:
+    """Extract the numeric ID from a PokeAPI resource URL"""
+    tail = url.rstrip('/').rsplit('/', 1)[-1] if url else ''
+    return int(tail) if tail.isdigit() else None
+
+
+def trim_species(data: Dict) -> Dict:
+    """Keep only the species fields the game uses"""
+    stats = {s['stat']['name']: s for s in data['stats']}
+    moves = data['moves'][:4]
+    return {
+        'name': data['name'],
+        'types': [t['type']['name'] for t in sorted(data['types'], key=lambda t: t['slot'])],
+        'base_stats': [stats[name]['base_stat'] for name in STAT_NAMES],
+        'efforts': [stats[name]['effort'] for name in STAT_NAMES],
+        'moves': [m['move']['name'] for m in moves],
+        'move_ids': [move_id_from_url(m['move'].get('url')) or m['move']['name'] for m in moves],
+    }
+
+
+def trim_move(data: Dict) -> Dict:
+    """Keep only the move fields the game uses"""
+    return {
+        'id': data['id'],
+        'name': data['name'],
+        'type': data['type']['name'],
+        'power': data.get('power'),
+        'accuracy': data.get('accuracy'),
+        'pp': data.get('pp'),
+    }
+
+
+def build(source: Source, out_path: str, max_id: int = MAX_SPECIES_ID, workers: int = 8) -> None:
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        raw_species = list(pool.map(lambda i: source.get('pokemon', i), range(1, max_id + 1)))
+
+        missing = [i + 1 for i, data in enumerate(raw_species) if data is None]
+        if missing:
+            raise SystemExit(f"Source is missing species {missing[:10]}{'...' if len(missing) > 10 else ''}")
+        species = [trim_species(data) for data in raw_species]
+        logger.info("Fetched %d species", len(species))
+
+        move_keys = {FALLBACK_MOVE_ID}
+        for s in species:
+            move_keys.update(s.pop('move_ids'))
+        raw_moves = list(pool.map(lambda key: source.get('move', key), sorted(move_keys, key=str)))
+
+    moves = [trim_move(data) for data in raw_moves if data]
+    logger.info("Fetched %d moves", len(moves))
+
+    os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+    write_dataset(out_path, species, moves)
+    logger.info("Wrote %s (%d bytes)", out_path, os.path.getsize(out_path))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Build the offline species/move dataset")
+    parser.add_argument('--source', required=True, help="PokeAPI base URL or dump directory")
+    parser.add_argument('--out', default=DEFAULT_DATASET_PATH, help="dataset file to write")
+    parser.add_argument('--max-id', type=int, default=MAX_SPECIES_ID, help="highest species ID to import")
+    parser.add_argument('--workers', type=int, default=8, help="concurrent fetches")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    build(Source(args.source), args.out, args.max_id, args.workers)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
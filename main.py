@@ -2,4 +2,6 @@ from app import app
 from routes import *
 
 if __name__ == "__main__":
+    import warmup
+    warmup.warm_up()
     app.run(host="0.0.0.0", port=5000, debug=True)
@@ -0,0 +1,243 @@
+"""Lightweight request metrics rendered in the Prometheus text format.
+
+Recording is an in-process dict update under a lock, so it is cheap enough
+for every command. With several gunicorn workers, set METRICS_DIR to a
+directory shared by the workers (and emptied when the server starts): a
+daemon thread in each worker writes a snapshot of its own metrics there
+every flush_interval seconds, off the request threads, and /metrics sums
+the snapshots of every worker, whichever worker serves the scrape.
+"""
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from flask import g, has_request_context, request
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (128, 256, 512, 1024, 2048, 4096, 8192, 16384, 65536, 262144)
+
+# name -> (type, help, buckets for histograms)
+METRICS = {
+    'pterminal_command_duration_seconds': ('histogram', "Time to handle a command", LATENCY_BUCKETS),
+    'pterminal_command_results_total': ('counter', "Commands handled by response status", None),
+    'pterminal_response_bytes': ('histogram', "Response body size per command", SIZE_BUCKETS),
+    'pterminal_session_cookie_bytes': ('histogram', "Size of the session cookie sent with a command", SIZE_BUCKETS),
+    'pterminal_upstream_request_duration_seconds': ('histogram', "PokeAPI request time by endpoint", LATENCY_BUCKETS),
+    'pterminal_upstream_requests_total': ('counter', "PokeAPI requests by endpoint and result", None),
+    'pterminal_db_queries_total': ('counter', "Database queries issued per command", None),
+    'pterminal_db_query_seconds_total': ('counter', "Database time spent per command", None),
+    'pterminal_cache_lookups_total': ('counter', "PokeAPI response cache lookups by result", None),
+}
+
+# Labels are limited to these commands so a typo can't create a new series
+COMMANDS = ('/hunt', '/battle', '/move', '/catch', '/evyield', '/mypokemon', '/mystats')
+
+Key = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+class Metrics:
+    def __init__(self, directory: Optional[str] = None, flush_interval: float = 1.0):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self._counters: Dict[Key, float] = {}
+        # name+labels -> [count per bucket..., +Inf count, sum]
+        self._histograms: Dict[Key, List[float]] = {}
+        self._collectors: List[Callable[[], Dict[Key, float]]] = []
+        self._lock = threading.Lock()
+        # Process the flusher thread was started in; a forked worker needs its own
+        self._flusher_pid: Optional[int] = None
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def inc(self, name: str, value: float = 1, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        buckets = METRICS[name][2]
+        key = (name, tuple(sorted(labels.items())))
+        index = bisect.bisect_left(buckets, value)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [0] * (len(buckets) + 2)
+            histogram[index] += 1
+            histogram[-1] += value
+
+    def add_collector(self, collector: Callable[[], Dict[Key, float]]) -> None:
+        """Register a callable returning counter values that are read at snapshot time"""
+        self._collectors.append(collector)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: list(values) for key, values in self._histograms.items()}
+        for collector in self._collectors:
+            for key, value in collector().items():
+                counters[key] = counters.get(key, 0) + value
+        return {
+            'counters': [[name, labels, value] for (name, labels), value in counters.items()],
+            'histograms': [[name, labels, values] for (name, labels), values in histograms.items()],
+        }
+
+    def start_flusher(self) -> None:
+        """Start flushing this process's snapshot in the background, unless it already is"""
+        if not self.directory or self._flusher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+        threading.Thread(target=self._flush_forever, name='metrics-flush', daemon=True).start()
+
+    def _flush_forever(self) -> None:
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except OSError as e:
+                logger.warning("Failed to write metrics snapshot: %s", e)
+
+    def flush(self) -> None:
+        """Write this worker's snapshot for the other workers to aggregate"""
+        path = os.path.join(self.directory, f"{os.getpid()}.json")
+        with open(f"{path}.tmp", 'w') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(f"{path}.tmp", path)
+
+    def _snapshots(self) -> List[Dict]:
+        if not self.directory:
+            return [self.snapshot()]
+        self.flush()
+        snapshots = []
+        for filename in os.listdir(self.directory):
+            if filename.endswith('.json'):
+                try:
+                    with open(os.path.join(self.directory, filename)) as f:
+                        snapshots.append(json.load(f))
+                except (OSError, ValueError):
+                    continue
+        return snapshots
+
+    def render(self) -> str:
+        """All workers' metrics in the Prometheus text exposition format"""
+        counters: Dict[Key, float] = {}
+        histograms: Dict[Key, List[float]] = {}
+        for snapshot in self._snapshots():
+            for name, labels, value in snapshot['counters']:
+                key = (name, tuple(tuple(label) for label in labels))
+                counters[key] = counters.get(key, 0) + value
+            for name, labels, values in snapshot['histograms']:
+                key = (name, tuple(tuple(label) for label in labels))
+                total = histograms.setdefault(key, [0] * len(values))
+                for i, value in enumerate(values):
+                    total[i] += value
+
+        lines = []
+        for name, (kind, help_text, buckets) in METRICS.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == 'counter':
+                for (metric, labels), value in sorted(counters.items()):
+                    if metric == name:
+                        lines.append(f"{name}{format_labels(labels)} {value:g}")
+                continue
+            for (metric, labels), values in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(list(buckets) + ['+Inf'], values[:-1]):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{format_labels(labels + (('le', str(bound)),))} {cumulative:g}")
+                lines.append(f"{name}_sum{format_labels(labels)} {values[-1]:g}")
+                lines.append(f"{name}_count{format_labels(labels)} {cumulative:g}")
+        return '\n'.join(lines) + '\n'
+
+
+def format_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ''
+    escaped = (f'{k}="{escape(str(v))}"' for k, v in labels)
+    return '{' + ','.join(escaped) + '}'
+
+
+def escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def command_label() -> Optional[str]:
+    """Metric label for the current request, or None if it isn't instrumented"""
+    if request.endpoint == 'start_game':
+        return '/start-game'
+    if request.endpoint == 'handle_commands':
+        return 'batch'
+    if request.endpoint not in ('handle_command', 'handle_command_async', 'stream_command'):
+        return None
+    data = request.get_json(silent=True) or {}
+    return label_for(str(data.get('command', '')))
+
+
+def label_for(command: str) -> str:
+    """Metric label for a command's text"""
+    words = command.lower().split()
+    base = words[0] if words else ''
+    if base.startswith('/move'):
+        return '/move'
+    return base if base in COMMANDS else 'other'
+
+
+def init_app(app, engine) -> None:
+    """Record command, response, cookie and database metrics for the app"""
+    from sqlalchemy import event
+
+    @app.before_request
+    def start_timer():
+        g.metrics_started = time.perf_counter()
+        g.db_queries = 0
+        g.db_seconds = 0.0
+
+    @app.after_request
+    def record_request(response):
+        label = command_label()
+        if label is not None:
+            metrics.observe('pterminal_command_duration_seconds',
+                            time.perf_counter() - g.metrics_started, command=label)
+            length = response.calculate_content_length()
+            if length is not None:
+                metrics.observe('pterminal_response_bytes', length, command=label)
+            cookie = request.cookies.get(app.config['SESSION_COOKIE_NAME'])
+            if cookie:
+                metrics.observe('pterminal_session_cookie_bytes', len(cookie), command=label)
+            metrics.inc('pterminal_db_queries_total', g.db_queries, command=label)
+            metrics.inc('pterminal_db_query_seconds_total', g.db_seconds, command=label)
+        # Only a pid check once the thread runs; it must start after the fork
+        metrics.start_flusher()
+        return response
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def before_query(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('metrics_started', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def after_query(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info['metrics_started'].pop()
+        if has_request_context() and 'db_queries' in g:
+            g.db_queries += 1
+            g.db_seconds += time.perf_counter() - started
+
+    @event.listens_for(engine, 'handle_error')
+    def failed_query(context):
+        # after_cursor_execute doesn't run for a query that raised
+        conn = context.connection
+        if conn is not None and conn.info.get('metrics_started'):
+            conn.info['metrics_started'].pop()
+
+
+metrics = Metrics(os.environ.get('METRICS_DIR') or None)
@@ -0,0 +1,217 @@
+"""Online schema migrations.
+
+Schema changes are additive so old and new code can run side by side:
+
+1. ensure_schema() adds missing columns (nullable or with a server default)
+   and indexes to existing tables. It runs at app startup (db.create_all() only creates missing
+   tables) and is safe to run while the old code is still serving.
+2. migrate_pokemon() converts legacy rows in small batches, each in its own
+   transaction. Until a row is converted, the model accessors keep reading
+   its JSON columns.
+   Until then new rows are written to both (see models.WRITE_LEGACY_JSON),
+   so code that only knows the JSON columns keeps working.
+3. Once every instance runs the new code, clear_legacy_columns() drops the
+   JSON copies; set POKEMON_LEGACY_JSON=0 afterwards so new rows skip them.
+
+Cached battle stats are computed on demand, recompute_stats() fills them in
+ahead of time (or recomputes them all after a formula change).
+raise_starter_levels() brings starters created at level 1, before stats
+scaled with level, up to rules.STARTER_LEVEL. It runs by itself when
+ensure_schema() adds the stat columns, and can be run again by hand.
+
+    python migrate.py --batch-size 500 --pause 0.05
+    python migrate.py --clear-legacy
+    python migrate.py --schema-only --recompute-stats
+    python migrate.py --schema-only --raise-starters
+"""
+import logging
+import time
+from typing import List
+
+from sqlalchemy import func, inspect, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.schema import CreateColumn
+
+# app first: run as a script, this module is imported again by app itself
+from app import db
+import counters
+import rules
+from models import Pokedex, Pokemon, Trainer
+
+logger = logging.getLogger(__name__)
+
+
+def dedupe_pokedex() -> int:
+    """Merge duplicate (trainer_id, pokemon_id) rows into the oldest one"""
+    duplicates = (db.session.query(Pokedex.trainer_id, Pokedex.pokemon_id)
+                  .group_by(Pokedex.trainer_id, Pokedex.pokemon_id)
+                  .having(func.count(Pokedex.id) > 1)
+                  .all())
+    for trainer_id, pokemon_id in duplicates:
+        keep, *extra = Pokedex.query.filter_by(trainer_id=trainer_id, pokemon_id=pokemon_id) \
+            .order_by(Pokedex.id).all()
+        keep.seen = any(row.seen for row in [keep, *extra])
+        keep.caught = any(row.caught for row in [keep, *extra])
+        for row in extra:
+            db.session.delete(row)
+    db.session.commit()
+    return len(duplicates)
+
+
+def raise_starter_levels(level: int = rules.STARTER_LEVEL) -> int:
+    """Raise each trainer's starter (their first Pokémon) to at least level"""
+    first_ids = db.session.query(func.min(Pokemon.id)).group_by(Pokemon.trainer_id)
+    starters = Pokemon.query.filter(Pokemon.id.in_(first_ids), Pokemon.level < level).all()
+    for pokemon in starters:
+        # Going through the ORM clears the cached stats
+        pokemon.level = level
+    db.session.commit()
+    return len(starters)
+
+
+# Data fixes that must run before an index can be built on existing rows
+BEFORE_INDEX = {
+    'ix_pokedex_trainer_pokemon': dedupe_pokedex,
+}
+
+# Backfills to run once the named column has been added to an existing table
+AFTER_COLUMN = {
+    'trainer.pokemon_owned': counters.reconcile,
+    # Battle stats scale with level from here on, so level 1 starters would be hopeless
+    'pokemon.stat_hp': raise_starter_levels,
+}
+
+
+def ensure_schema() -> List[str]:
+    """Add the model columns and indexes that existing tables are missing"""
+    engine = db.engine
+    inspector = inspect(engine)
+    changes = []
+    backfills = []
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            ddl = f"ALTER TABLE {table.name} ADD COLUMN {CreateColumn(column).compile(dialect=engine.dialect)}"
+            try:
+                with engine.begin() as conn:
+                    conn.execute(text(ddl))
+            except DBAPIError as e:
+                # Another worker may have added it first
+                if column.name not in {c['name'] for c in inspect(engine).get_columns(table.name)}:
+                    raise
+                logger.debug("Column %s.%s added concurrently: %s", table.name, column.name, e)
+                continue
+            changes.append(ddl)
+            if f"{table.name}.{column.name}" in AFTER_COLUMN:
+                backfills.append(AFTER_COLUMN[f"{table.name}.{column.name}"])
+
+        indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in indexes:
+                continue
+            if index.name in BEFORE_INDEX:
+                BEFORE_INDEX[index.name]()
+            with engine.begin() as conn:
+                index.create(bind=conn, checkfirst=True)
+            changes.append(f"CREATE INDEX {index.name}")
+
+    for change in changes:
+        logger.info("Schema migration: %s", change)
+    for backfill in backfills:
+        backfill()
+    return changes
+
+
+def migrate_pokemon(batch_size: int = 500, pause: float = 0.0, clear_legacy: bool = False) -> int:
+    """Copy legacy JSON IVs, EVs and moves into the typed columns, one batch per transaction"""
+    converted = 0
+    last_id = 0
+    while True:
+        batch = (Pokemon.query
+                 .filter(Pokemon.id > last_id, Pokemon.iv_hp.is_(None))
+                 .order_by(Pokemon.id)
+                 .limit(batch_size)
+                 .all())
+        if not batch:
+            break
+        for pokemon in batch:
+            try:
+                ivs, evs, moves = pokemon.get_ivs(), pokemon.get_evs(), pokemon.get_moves()
+            except (TypeError, ValueError) as e:
+                logger.warning("Pokemon %s has unreadable legacy stats, resetting them: %s", pokemon.id, e)
+                ivs, evs, moves = {}, {}, []
+            pokemon.set_ivs(ivs)
+            pokemon.set_evs(evs)
+            pokemon.set_moves(moves or ['tackle'])
+            if clear_legacy:
+                pokemon.ivs = pokemon.evs = pokemon.moves = None
+        db.session.commit()
+        converted += len(batch)
+        last_id = batch[-1].id
+        logger.info("Migrated %d Pokémon (up to id %d)", converted, last_id)
+        if pause:
+            time.sleep(pause)
+    return converted
+
+
+def clear_legacy_columns(batch_size: int = 500) -> int:
+    """Null out the JSON columns of rows that have already been migrated"""
+    cleared = 0
+    while True:
+        ids = [row.id for row in db.session.query(Pokemon.id)
+               .filter(Pokemon.iv_hp.isnot(None), Pokemon.ivs.isnot(None))
+               .limit(batch_size)]
+        if not ids:
+            break
+        Pokemon.query.filter(Pokemon.id.in_(ids)).update(
+            {Pokemon.ivs: None, Pokemon.evs: None, Pokemon.moves: None}, synchronize_session=False
+        )
+        db.session.commit()
+        cleared += len(ids)
+    return cleared
+
+
+def recompute_stats(force: bool = False) -> int:
+    """Fill in cached battle stats one trainer (and transaction) at a time"""
+    from game_logic import GameLogic
+
+    updated = 0
+    for (trainer_id,) in db.session.query(Trainer.id).order_by(Trainer.id).all():
+        updated += GameLogic.refresh_trainer_stats(trainer_id, force)
+        db.session.commit()
+    return updated
+
+
+if __name__ == '__main__':
+    import argparse
+
+    from app import app
+
+    parser = argparse.ArgumentParser(description="Migrate the game database to the current schema")
+    parser.add_argument('--batch-size', type=int, default=500, help="rows converted per transaction")
+    parser.add_argument('--pause', type=float, default=0.0, help="seconds to sleep between batches")
+    parser.add_argument('--schema-only', action='store_true', help="only add missing columns and indexes")
+    parser.add_argument('--clear-legacy', action='store_true',
+                        help="drop the JSON copies once every instance runs the new code")
+    parser.add_argument('--recompute-stats', action='store_true',
+                        help="compute every Pokémon's cached battle stats, replacing existing ones")
+    parser.add_argument('--raise-starters', action='store_true',
+                        help=f"raise starters below level {rules.STARTER_LEVEL} to it")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    with app.app_context():
+        ensure_schema()
+        if not args.schema_only:
+            print(f"Converted {migrate_pokemon(args.batch_size, args.pause, args.clear_legacy)} Pokémon")
+            if args.clear_legacy:
+                print(f"Cleared legacy columns on {clear_legacy_columns(args.batch_size)} Pokémon")
+        if args.raise_starters:
+            print(f"Raised {raise_starter_levels()} starters to level {rules.STARTER_LEVEL}")
+        if args.recompute_stats:
+            print(f"Recomputed stats for {recompute_stats(force=True)} Pokémon")
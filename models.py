@@ -1,39 +1,184 @@
 from app import db
 import json
-from datetime import datetime
+import os
+from datetime import datetime, timezone
+from sqlalchemy import event
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+# Dialects with INSERT ... ON CONFLICT support
+UPSERT_INSERTS = {'postgresql': postgresql_insert, 'sqlite': sqlite_insert}
+
+def utc_now():
+    """The current UTC time, naive like the timestamps already stored"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
 
 class Trainer(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(64), unique=True, nullable=False)
     pokedollars = db.Column(db.Integer, default=1000)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=utc_now)
     pokemon = db.relationship('Pokemon', backref='trainer', lazy=True)
 
+    # Aggregates for /mystats, maintained by counters.increment
+    pokemon_owned = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    species_seen = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    species_caught = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    battles_won = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    battles_lost = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+# Keys of the IV/EV dicts, in the order of the iv_*/ev_* columns
+STAT_KEYS = ('hp', 'attack', 'defense', 'sp_attack', 'sp_defense', 'speed')
+MAX_MOVES = 4
+# Keep the legacy JSON columns up to date for code that predates the typed
+# columns. Turn off with POKEMON_LEGACY_JSON=0 once migrate.py --clear-legacy
+# has run.
+WRITE_LEGACY_JSON = os.environ.get('POKEMON_LEGACY_JSON', '1') != '0'
+
 class Pokemon(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    trainer_id = db.Column(db.Integer, db.ForeignKey('trainer.id'), nullable=False)
+    trainer_id = db.Column(db.Integer, db.ForeignKey('trainer.id'), nullable=False, index=True)
     pokemon_id = db.Column(db.Integer, nullable=False)
     nickname = db.Column(db.String(64))
     level = db.Column(db.Integer, default=1)
     nature = db.Column(db.String(20))
-    
-    # Stats stored as JSON
+
+    # Stats and moves as typed columns. They are nullable only so they can be
+    # added to an existing table; a NULL iv_hp marks a row that still has to
+    # be converted from the legacy JSON columns by migrate.py.
+    iv_hp = db.Column(db.SmallInteger)
+    iv_attack = db.Column(db.SmallInteger)
+    iv_defense = db.Column(db.SmallInteger)
+    iv_sp_attack = db.Column(db.SmallInteger)
+    iv_sp_defense = db.Column(db.SmallInteger)
+    iv_speed = db.Column(db.SmallInteger)
+    ev_hp = db.Column(db.SmallInteger)
+    ev_attack = db.Column(db.SmallInteger)
+    ev_defense = db.Column(db.SmallInteger)
+    ev_sp_attack = db.Column(db.SmallInteger)
+    ev_sp_defense = db.Column(db.SmallInteger)
+    ev_speed = db.Column(db.SmallInteger)
+    # Moves are kept as PokeAPI move names rather than move IDs. The name is
+    # what everything else keys on: the species data a caught Pokémon's moves
+    # come from, the move/<name> cache entries, battle state and /mypokemon.
+    # An ID would need each move resource fetched when catching (and for
+    # every legacy row when migrating) just to learn it, and fetched again
+    # to show the name. Names are stable slugs, so the columns stay as
+    # queryable as IDs would be.
+    move_1 = db.Column(db.String(64))
+    move_2 = db.Column(db.String(64))
+    move_3 = db.Column(db.String(64))
+    move_4 = db.Column(db.String(64))
+
+    # Battle stats computed by stats.calculate_stats, in STAT_KEYS order. They
+    # are cleared whenever the level or an EV changes and recomputed on demand.
+    stat_hp = db.Column(db.SmallInteger)
+    stat_attack = db.Column(db.SmallInteger)
+    stat_defense = db.Column(db.SmallInteger)
+    stat_sp_attack = db.Column(db.SmallInteger)
+    stat_sp_defense = db.Column(db.SmallInteger)
+    stat_speed = db.Column(db.SmallInteger)
+
+    # Legacy JSON columns, only read for rows not yet migrated but written
+    # alongside the typed columns while WRITE_LEGACY_JSON is set
     ivs = db.Column(db.String(512), default='{"hp": 0, "attack": 0, "defense": 0, "sp_attack": 0, "sp_defense": 0, "speed": 0}')
     evs = db.Column(db.String(512), default='{"hp": 0, "attack": 0, "defense": 0, "sp_attack": 0, "sp_defense": 0, "speed": 0}')
     moves = db.Column(db.String(512), default='[]')
 
+    @property
+    def is_migrated(self):
+        return self.iv_hp is not None
+
     def get_ivs(self):
-        return json.loads(self.ivs)
+        if not self.is_migrated:
+            return json.loads(self.ivs)
+        return {key: getattr(self, f'iv_{key}') for key in STAT_KEYS}
 
     def get_evs(self):
-        return json.loads(self.evs)
+        if not self.is_migrated:
+            return json.loads(self.evs)
+        return {key: getattr(self, f'ev_{key}') for key in STAT_KEYS}
 
     def get_moves(self):
-        return json.loads(self.moves)
+        if not self.is_migrated:
+            return json.loads(self.moves)
+        return [move for move in (self.move_1, self.move_2, self.move_3, self.move_4) if move]
+
+    def set_ivs(self, ivs):
+        for key in STAT_KEYS:
+            setattr(self, f'iv_{key}', ivs.get(key, 0))
+        self.ivs = json.dumps(self.get_ivs()) if WRITE_LEGACY_JSON else None
+
+    def set_evs(self, evs):
+        for key in STAT_KEYS:
+            setattr(self, f'ev_{key}', evs.get(key, 0))
+        self.evs = json.dumps(self.get_evs()) if WRITE_LEGACY_JSON else None
+
+    def set_moves(self, moves):
+        moves = list(moves[:MAX_MOVES]) + [None] * (MAX_MOVES - len(moves))
+        self.move_1, self.move_2, self.move_3, self.move_4 = moves
+        self.moves = json.dumps(self.get_moves()) if WRITE_LEGACY_JSON else None
+
+    def get_stats(self):
+        """Cached battle stats as a tuple, or None if they need computing"""
+        if self.stat_hp is None:
+            return None
+        return tuple(getattr(self, f'stat_{key}') for key in STAT_KEYS)
+
+    def set_stats(self, stats):
+        for key, value in zip(STAT_KEYS, stats):
+            setattr(self, f'stat_{key}', value)
+
+def _clear_cached_stats(target, value, oldvalue, initiator):
+    if value != oldvalue and target.stat_hp is not None:
+        target.set_stats((None,) * len(STAT_KEYS))
+
+for _attribute in [Pokemon.level] + [getattr(Pokemon, f'ev_{key}') for key in STAT_KEYS]:
+    event.listen(_attribute, 'set', _clear_cached_stats)
 
 class Pokedex(db.Model):
+    __table_args__ = (
+        db.Index('ix_pokedex_trainer_pokemon', 'trainer_id', 'pokemon_id', unique=True),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     trainer_id = db.Column(db.Integer, db.ForeignKey('trainer.id'), nullable=False)
     pokemon_id = db.Column(db.Integer, nullable=False)
     seen = db.Column(db.Boolean, default=True)
     caught = db.Column(db.Boolean, default=False)
+
+    @staticmethod
+    def mark_seen(trainer_id, pokemon_id):
+        """Record an encounter in the current transaction; True if the species wasn't seen before"""
+        insert = UPSERT_INSERTS.get(db.session.get_bind().dialect.name)
+        if insert is None:
+            entry = Pokedex.query.filter_by(trainer_id=trainer_id, pokemon_id=pokemon_id).first()
+            if not entry:
+                db.session.add(Pokedex(trainer_id=trainer_id, pokemon_id=pokemon_id, seen=True))
+                return True
+            newly_seen = not entry.seen
+            entry.seen = True
+            return newly_seen
+        statement = insert(Pokedex).values(trainer_id=trainer_id, pokemon_id=pokemon_id, seen=True)
+        # A row that is already seen is left alone, so only a change counts as a row
+        result = db.session.execute(statement.on_conflict_do_update(
+            index_elements=['trainer_id', 'pokemon_id'],
+            set_={'seen': True},
+            where=Pokedex.seen.isnot(True),
+        ))
+        return result.rowcount == 1
+
+    @staticmethod
+    def mark_caught(trainer_id, pokemon_id):
+        """Record a catch in the current transaction; whether the species is (newly seen, newly caught)"""
+        newly_seen = Pokedex.mark_seen(trainer_id, pokemon_id)
+        updated = Pokedex.query.filter(
+            Pokedex.trainer_id == trainer_id, Pokedex.pokemon_id == pokemon_id, Pokedex.caught.isnot(True)
+        ).update({Pokedex.caught: True}, synchronize_session=False)
+        return newly_seen, updated == 1
+
+class ActiveBattle(db.Model):
+    id = db.Column(db.String(32), primary_key=True)
+    trainer_id = db.Column(db.Integer, db.ForeignKey('trainer.id'), unique=True, nullable=False)
+    state = db.Column(db.Text, nullable=False)
+    updated_at = db.Column(db.DateTime, default=utc_now, index=True)
@@ -0,0 +1,42 @@
+"""Per-command response projections.
+
+Routes build their JSON from these functions rather than passing raw PokeAPI
+data or full battle state to jsonify, so each command returns a small schema
+that stays stable when the internal representation changes.
+"""
+from typing import Dict, Optional
+
+from battle import Battle, Combatant
+
+
+def pokemon_summary(pokemon_data: Dict) -> Dict:
+    """A wild encounter as shown to the client: identity and types only"""
+    return {
+        'id': pokemon_data.get('id'),
+        'name': pokemon_data['name'],
+        'types': [t['type']['name'] for t in pokemon_data.get('types', [])],
+    }
+
+
+def combatant_summary(combatant: Combatant) -> Dict:
+    return {
+        'name': combatant.name,
+        'level': combatant.level,
+        'types': combatant.type_names,
+        'current_hp': combatant.current_hp,
+        'max_hp': combatant.max_hp,
+    }
+
+
+def battle_summary(battle: Optional[Battle]) -> Optional[Dict]:
+    """What the terminal needs to render a battle turn"""
+    if battle is None:
+        return None
+    return {
+        'turn': battle.turn,
+        'wild_pokemon': combatant_summary(battle.wild),
+        'trainer_pokemon': dict(
+            combatant_summary(battle.trainer),
+            moves=[move.name if move else key for key, move in zip(battle.trainer.move_keys, battle.trainer.moves)],
+        ),
+    }
@@ -1,24 +1,71 @@
 import logging
 import random
-from flask import render_template, request, jsonify, session
+import time
+from flask import render_template, request, jsonify, session, Response, send_file
 from app import app, db
 from models import Trainer, Pokemon, Pokedex
 from game_logic import GameLogic
-import json
+import rules
+import counters
+from battle_store import battle_store
+from projections import battle_summary, pokemon_summary
+from metrics import label_for, metrics
+from structured_logging import summarize
+from streaming import channels
+from commands import error, registry
+from sprites import sprite_store
+from dataset import MAX_SPECIES_ID
+import warmup
 
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+MYPOKEMON_PAGE_SIZE = 20
+MYPOKEMON_MAX_PAGE_SIZE = 100
+MAX_BATCH_COMMANDS = 50
+SPRITE_MAX_AGE = 365 * 24 * 3600
+
 @app.route('/')
 def index():
     return render_template('index.html')
 
+@app.before_request
+def wait_for_warm_up():
+    # Outside gunicorn nothing else warms this process up, so the first
+    # request does; a gunicorn worker's background warm-up is not waited for
+    if warmup.ready.is_set() or warmup.warm_up_once():
+        return None
+    if request.path.startswith('/api/'):
+        return jsonify({'status': 'error', 'message': 'The server is starting up, try again shortly'}), \
+            503, {'Retry-After': '1'}
+
+@app.route('/readyz')
+def readiness():
+    if not warmup.ready.is_set():
+        return jsonify({'status': 'starting'}), 503
+    return jsonify({'status': 'ready'})
+
+@app.route('/metrics')
+def prometheus_metrics():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/sprites/<int:pokemon_id>.png')
+def sprite(pokemon_id):
+    stored = sprite_store.get(pokemon_id) if 1 <= pokemon_id <= MAX_SPECIES_ID else None
+    if stored is None:
+        return jsonify({'status': 'error', 'message': 'Sprite not found'}), 404
+
+    path, etag = stored
+    response = send_file(path, mimetype='image/png', etag=etag, max_age=SPRITE_MAX_AGE, conditional=True)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
 @app.route('/api/start-game', methods=['POST'])
 def start_game():
     data = request.json
     trainer_name = data.get('trainer_name')
     starter_choice = data.get('starter_choice')
-    logger.debug(f"Starting game for trainer: {trainer_name}, starter: {starter_choice}")
+    logger.debug("Starting game for trainer: %s, starter: %s", trainer_name, starter_choice)
 
     # Check if trainer name exists
     existing_trainer = Trainer.query.filter_by(name=trainer_name).first()
@@ -27,39 +74,35 @@ def start_game():
         if existing_trainer:
             # Log in existing trainer
             trainer = existing_trainer
-            logger.debug(f"Logging in existing trainer {trainer_name} with ID: {trainer.id}")
+            logger.debug("Logging in existing trainer %s with ID: %s", trainer_name, trainer.id)
             
             # Get the trainer's Pokémon
             trainer_pokemon = Pokemon.query.filter_by(trainer_id=trainer.id).first()
             if not trainer_pokemon:
-                logger.error(f"No Pokemon found for trainer {trainer_name}")
+                logger.error("No Pokemon found for trainer %s", trainer_name)
                 return jsonify({'status': 'error', 'message': 'No Pokémon found for this trainer'})
             
-            logger.debug(f"Loaded existing Pokémon ID: {trainer_pokemon.pokemon_id} for trainer {trainer_name}")
+            logger.debug("Loaded existing Pokémon ID: %s for trainer %s", trainer_pokemon.pokemon_id, trainer_name)
         else:
-            # Create new trainer
-            trainer = Trainer(name=trainer_name)
-            db.session.add(trainer)
-            db.session.commit()
-            logger.debug(f"Created new trainer with ID: {trainer.id}")
-
-            # Add starter Pokémon
+            # Build the starter before writing anything, so the trainer, its
+            # starter, Pokédex entry and counters are committed together
             starter_ids = {'charmander': 4, 'squirtle': 7, 'bulbasaur': 1}
-            starter = GameLogic.create_new_pokemon(trainer.id, starter_ids[starter_choice])
+            starter = GameLogic.create_new_pokemon(None, starter_ids[starter_choice], level=rules.STARTER_LEVEL)
             if not starter:
                 logger.error("Failed to create starter Pokemon")
                 return jsonify({'status': 'error', 'message': 'Failed to create starter Pokemon'})
 
-            db.session.add(starter)
-
-            # Initialize Pokédex entry
-            pokedex_entry = Pokedex(trainer_id=trainer.id, pokemon_id=starter_ids[starter_choice], caught=True)
-            db.session.add(pokedex_entry)
+            trainer = Trainer(name=trainer_name, pokemon_owned=1, species_seen=1, species_caught=1)
+            starter.trainer = trainer
+            db.session.add(trainer)
+            db.session.flush()
+            db.session.add(Pokedex(trainer_id=trainer.id, pokemon_id=starter_ids[starter_choice], caught=True))
             db.session.commit()
+            logger.debug("Created new trainer with ID: %s", trainer.id)
 
         session['trainer_id'] = trainer.id
-        session['current_battle'] = None
-        logger.debug(f"Session initialized with trainer_id: {trainer.id}")
+        battle_store.delete(session.pop('battle_id', None))
+        logger.debug("Session initialized with trainer_id: %s", trainer.id)
         
         if existing_trainer:
             return jsonify({
@@ -72,254 +115,334 @@ def start_game():
                 'message': f'Welcome, Trainer {trainer_name}! Type /hunt to start catching Pokémon!'
             })
     except Exception as e:
-        logger.error(f"Error in start_game: {str(e)}")
+        logger.exception("Error in start_game: %s", e)
         db.session.rollback()
         return jsonify({'status': 'error', 'message': str(e)})
 
 @app.route('/api/command', methods=['POST'])
 def handle_command():
-    if 'trainer_id' not in session:
-        logger.debug("No active session found")
-        return jsonify({'status': 'error', 'message': 'No active session'})
+    return jsonify(registry.dispatch(str(request.json.get('command', ''))))
 
-    data = request.json
-    command = data.get('command', '').lower().split()
-    base_command = command[0]
-    args = command[1:] if len(command) > 1 else []
-    trainer_id = session['trainer_id']
-
-    logger.debug(f"Handling command: {base_command} with args: {args}")
-    logger.debug(f"Current session state: {dict(session)}")
-
-    if base_command == '/hunt':
-        pokemon_id = GameLogic.generate_random_pokemon()
-        pokemon_data = GameLogic.get_pokemon_data(pokemon_id)
-        if pokemon_data:
-            # Store just the ID in session instead of full data
-            session['current_wild_pokemon_id'] = pokemon_id
-            session['current_battle'] = None  # Reset any existing battle
-            sprite_url = GameLogic.get_pokemon_sprite_url(pokemon_id)
-            ev_yields = GameLogic.get_pokemon_ev_yields(pokemon_id)
-            logger.debug(f"Wild Pokemon encountered: {pokemon_data['name']} (ID: {pokemon_id})")
-
-            response_text = [
-                f"A wild {pokemon_data['name'].capitalize()} appeared!",
-                "",
-                "Available commands:",
-                "/battle - Start battle",
-                "/evyield - Check EV yields"
-            ]
+@app.route('/api/commands', methods=['POST'])
+def handle_commands():
+    """Run an ordered list of commands for the current trainer in one request.
 
-            return jsonify({
-                'status': 'success',
-                'message': '\n'.join(response_text),
-                'sprite_url': sprite_url,
-                'pokemon': pokemon_data,
-                'ev_yields': ev_yields
-            })
-        return jsonify({'status': 'error', 'message': 'Failed to find a Pokémon'})
-
-    elif base_command == '/battle':
-        if 'current_wild_pokemon_id' not in session:
-            logger.debug("No wild Pokemon in session for battle")
-            return jsonify({'status': 'error', 'message': 'No wild Pokémon to battle! Use /hunt first.'})
-
-        # Fetch fresh data for the stored Pokemon ID
-        wild_pokemon_data = GameLogic.get_pokemon_data(session['current_wild_pokemon_id'])
-        if not wild_pokemon_data:
-            logger.error("Failed to fetch wild Pokemon data")
-            return jsonify({'status': 'error', 'message': 'Failed to start battle'})
-
-        battle_state = GameLogic.initialize_battle(trainer_id, wild_pokemon_data)
-        if not battle_state:
-            logger.error("Failed to initialize battle state")
-            return jsonify({'status': 'error', 'message': 'Failed to start battle'})
-
-        session['current_battle'] = battle_state
-        logger.debug("Battle initialized successfully")
-        logger.debug(f"Battle state: {battle_state}")
-
-        return jsonify({
-            'status': 'success',
-            'message': GameLogic.format_battle_state(battle_state),
-            'battle_state': battle_state
-        })
-
-    elif base_command.startswith('/move'):
-        logger.debug(f"Current battle state in session: {session.get('current_battle')}")
-        if not session.get('current_battle'):
-            return jsonify({'status': 'error', 'message': 'No active battle! Use /battle first.'})
-
-        try:
-            move_index = int(args[0]) - 1
-            logger.debug(f"Executing move {move_index + 1}")
-
-            current_battle = session['current_battle']
-            battle_result = GameLogic.execute_turn(current_battle, move_index)
-            logger.debug(f"Battle result: {battle_result}")
-
-            if battle_result['status'] == 'success':
-                session['current_battle'] = battle_result['battle_state']
-                if battle_result.get('battle_ended'):
-                    session['current_wild_pokemon_id'] = None
-                    session['current_battle'] = None
-                    logger.debug("Battle ended, cleared battle state")
-            else:
-                logger.error(f"Battle turn failed: {battle_result.get('message')}")
-
-            # Prepare basic response
-            response_data = {
-                'status': battle_result['status'],
-                'battle_state': battle_result.get('battle_state'),
-                'battle_ended': battle_result.get('battle_ended', False)
-            }
-            
-            # Set message content based on battle state
-            if battle_result['status'] == 'success':
-                if battle_result.get('battle_ended'):
-                    # If battle ended, show only outcome message
-                    response_data['message'] = battle_result['message']
-                else:
-                    # If battle continues, show only action results (first few lines) + current state
-                    # Extract just the action results from the message (typically first 3-5 lines)
-                    action_lines = battle_result['message'].split('\n')
-                    action_message = '\n'.join([line for line in action_lines if not line.startswith('Choose your move')])
-                    
-                    # Get updated battle state display
-                    updated_state = GameLogic.format_battle_state(battle_result['battle_state'])
-                    
-                    # Combine action message with current state
-                    response_data['message'] = f"{action_message}\n\n{updated_state}"
+    Every command sees the session and battle left by the previous one. With
+    stop_on_error the batch ends at the first command that fails.
+    """
+    data = request.json or {}
+    command_list = data.get('commands')
+    if not isinstance(command_list, list) or not command_list:
+        return jsonify({'status': 'error', 'message': 'Expected a list of commands'})
+    if len(command_list) > MAX_BATCH_COMMANDS:
+        return jsonify({'status': 'error', 'message': f'At most {MAX_BATCH_COMMANDS} commands per batch'})
+
+    results = []
+    for command in command_list:
+        started = time.perf_counter()
+        result = registry.dispatch(str(command))
+        # The request as a whole is recorded as 'batch'
+        metrics.observe('pterminal_command_duration_seconds', time.perf_counter() - started,
+                        command=label_for(str(command)))
+        results.append(result)
+        if data.get('stop_on_error') and result['status'] != 'success':
+            break
+    return jsonify({'status': 'success', 'results': results})
+
+@registry.requirement('wild_pokemon_id')
+def current_wild_pokemon_id(ctx):
+    return session.get('current_wild_pokemon_id')
+
+@registry.requirement('battle')
+def current_battle(ctx):
+    return battle_store.get(session.get('battle_id'), ctx.trainer_id)
+
+async def prefetch_hunt(ctx):
+    ctx.pokemon_id = GameLogic.generate_random_pokemon()
+    await GameLogic.get_pokemon_data_async(ctx.pokemon_id)
+
+@registry.command('/hunt', prefetch=prefetch_hunt)
+def hunt(ctx):
+    # The prefetch may already have picked the encounter
+    pokemon_id = getattr(ctx, 'pokemon_id', None) or GameLogic.generate_random_pokemon()
+    pokemon_data = GameLogic.get_pokemon_data(pokemon_id)
+    if not pokemon_data:
+        return error('Failed to find a Pokémon')
+
+    if Pokedex.mark_seen(ctx.trainer_id, pokemon_id):
+        counters.increment(ctx.trainer_id, species_seen=1)
+    db.session.commit()
+
+    # Store just the ID in session instead of full data
+    session['current_wild_pokemon_id'] = pokemon_id
+    battle_store.delete(session.pop('battle_id', None))  # Reset any existing battle
+    sprite_url = GameLogic.get_pokemon_sprite_url(pokemon_id)
+    ev_yields = GameLogic.get_pokemon_ev_yields(pokemon_id, pokemon_data)
+    logger.debug("Wild Pokemon encountered: %s (ID: %s)", pokemon_data['name'], pokemon_id)
+
+    response_text = [
+        f"A wild {pokemon_data['name'].capitalize()} appeared!",
+        "",
+        "Available commands:",
+        "/battle - Start battle",
+        "/evyield - Check EV yields"
+    ]
+
+    return {
+        'status': 'success',
+        'message': '\n'.join(response_text),
+        'sprite_url': sprite_url,
+        'pokemon': pokemon_summary(pokemon_data),
+        'ev_yields': ev_yields
+    }
+
+async def prefetch_battle(ctx):
+    wild_pokemon_id = session.get('current_wild_pokemon_id')
+    if wild_pokemon_id:
+        await GameLogic.prefetch_battle_async(ctx.trainer_id, wild_pokemon_id)
+
+@registry.command('/battle', requires={'wild_pokemon_id': 'No wild Pokémon to battle! Use /hunt first.'},
+                  prefetch=prefetch_battle)
+def battle(ctx):
+    # Fetch fresh data for the stored Pokemon ID
+    wild_pokemon_data = GameLogic.get_pokemon_data(ctx.wild_pokemon_id)
+    if not wild_pokemon_data:
+        logger.error("Failed to fetch wild Pokemon data")
+        return error('Failed to start battle')
+
+    battle_state = GameLogic.initialize_battle(ctx.trainer_id, wild_pokemon_data)
+    if not battle_state:
+        logger.error("Failed to initialize battle state")
+        return error('Failed to start battle')
+
+    # Keep any stats computed for the trainer's Pokémon cached on its row
+    db.session.commit()
+    session['battle_id'] = battle_store.create(ctx.trainer_id, battle_state)
+    logger.debug("Battle initialized: %s", summarize(battle_state))
+
+    return {
+        'status': 'success',
+        'message': GameLogic.format_battle_state(battle_state),
+        'battle_state': battle_summary(battle_state)
+    }
+
+@registry.command('/move', prefix=True, requires={'battle': 'No active battle! Use /battle first.'})
+def move(ctx):
+    current_battle = ctx.battle
+    logger.debug("Current battle state: %s", summarize(current_battle))
+
+    try:
+        move_index = int(ctx.args[0]) - 1
+        logger.debug("Executing move %d", move_index + 1)
+
+        battle_result = GameLogic.execute_turn(current_battle, move_index)
+        logger.debug("Battle result: %s ended=%s", battle_result['status'], battle_result.get('battle_ended', False))
+
+        if battle_result['status'] == 'success':
+            if battle_result.get('battle_ended'):
+                session['current_wild_pokemon_id'] = None
+                battle_store.delete(session.pop('battle_id', None))
+                counters.increment(ctx.trainer_id, **{f"battles_{battle_result['outcome']}": 1})
+                db.session.commit()
+                logger.debug("Battle ended, cleared battle state")
             else:
-                # For error messages, keep as is
-                response_data['message'] = battle_result['message']
-                
-            return jsonify(response_data)
-
-        except (IndexError, ValueError) as e:
-            logger.error(f"Invalid move number: {e}")
-            return jsonify({'status': 'error', 'message': 'Invalid move number!'})
-        except Exception as e:
-            logger.error(f"Unexpected error in move execution: {e}")
-            return jsonify({'status': 'error', 'message': 'Battle execution failed'})
-
-    elif base_command == '/catch':
-        if 'current_battle' not in session or not session['current_battle']:
-            return jsonify({'status': 'error', 'message': 'No active battle! Start a battle first with /battle.'})
-        
-        battle_state = session['current_battle']
-        wild_pokemon = battle_state['wild_pokemon']
-        
-        # Check if HP is below half
-        current_hp = wild_pokemon['current_hp']
-        max_hp = wild_pokemon['max_hp']
-        
-        if current_hp > max_hp / 2:
-            return jsonify({
-                'status': 'error', 
-                'message': f"Wild {wild_pokemon['name'].capitalize()}'s HP is too high ({current_hp}/{max_hp})! Weaken it further to catch."
-            })
-        
-        # Calculate catch factor based on remaining HP percentage
-        hp_percentage = current_hp / max_hp * 100
-        
-        if hp_percentage > 50:
-            catch_factor = 0  # Should not reach here due to above check
-        elif 40 <= hp_percentage <= 50:
-            catch_factor = 1.0
-        elif 30 <= hp_percentage < 40:
-            catch_factor = 1.2
-        elif 15 <= hp_percentage < 30:
-            catch_factor = 1.5
-        elif 5 <= hp_percentage < 15:
-            catch_factor = 1.8
+                battle_store.save(session['battle_id'], battle_result['battle_state'])
         else:
-            catch_factor = 2.0
-        
-        # Calculate catch probability (base 50%)
-        catch_probability = 50 * catch_factor
-        
-        # Random roll for catch success
-        roll = random.randint(1, 100)
-        
-        if roll <= catch_probability:
-            # Catch successful
-            pokemon_id = session['current_wild_pokemon_id']
-            trainer_id = session['trainer_id']
-            
-            try:
-                # Create captured Pokémon
-                new_pokemon = GameLogic.create_new_pokemon(trainer_id, pokemon_id, level=wild_pokemon['level'])
-                db.session.add(new_pokemon)
-                
-                # Add Pokédex entry if not already caught
-                pokedex_entry = Pokedex.query.filter_by(trainer_id=trainer_id, pokemon_id=pokemon_id).first()
-                if not pokedex_entry:
-                    pokedex_entry = Pokedex(trainer_id=trainer_id, pokemon_id=pokemon_id, caught=True)
-                    db.session.add(pokedex_entry)
-                else:
-                    pokedex_entry.caught = True
-                
-                db.session.commit()
-                
-                # Clear battle state
-                session['current_wild_pokemon_id'] = None
-                session['current_battle'] = None
-                
-                pokemon_data = GameLogic.get_pokemon_data(pokemon_id)
-                return jsonify({
-                    'status': 'success',
-                    'message': f"Gotcha! {pokemon_data['name'].capitalize()} was caught!",
-                    'battle_ended': True
-                })
-                
-            except Exception as e:
-                logger.error(f"Error catching Pokemon: {str(e)}")
-                db.session.rollback()
-                return jsonify({'status': 'error', 'message': 'Failed to catch Pokémon due to an error.'})
+            logger.error("Battle turn failed: %s", battle_result.get('message'))
+
+        # Prepare basic response
+        response_data = {
+            'status': battle_result['status'],
+            'battle_state': battle_summary(battle_result.get('battle_state')),
+            'battle_ended': battle_result.get('battle_ended', False)
+        }
+
+        # Set message content based on battle state
+        if battle_result['status'] == 'success':
+            if battle_result.get('battle_ended'):
+                # If battle ended, show only outcome message
+                response_data['message'] = battle_result['message']
+            else:
+                # If battle continues, show only action results (first few lines) + current state
+                # Extract just the action results from the message (typically first 3-5 lines)
+                action_lines = battle_result['message'].split('\n')
+                action_message = '\n'.join([line for line in action_lines if not line.startswith('Choose your move')])
+
+                # Get updated battle state display
+                updated_state = GameLogic.format_battle_state(battle_result['battle_state'])
+
+                # Combine action message with current state
+                response_data['message'] = f"{action_message}\n\n{updated_state}"
         else:
-            # Catch failed
-            return jsonify({
-                'status': 'error',
-                'message': f"Oh no! {wild_pokemon['name'].capitalize()} broke free! (Roll: {roll}, Needed: {catch_probability:.1f})"
+            # For error messages, keep as is
+            response_data['message'] = battle_result['message']
+
+        return response_data
+
+    except (IndexError, ValueError) as e:
+        logger.info("Invalid move number: %s", e)
+        return error('Invalid move number!')
+    except Exception as e:
+        logger.exception("Unexpected error in move execution: %s", e)
+        return error('Battle execution failed')
+
+@registry.command('/catch', requires={'battle': 'No active battle! Start a battle first with /battle.'})
+def catch(ctx):
+    wild_pokemon = ctx.battle.wild
+
+    # Check if HP is below half
+    current_hp = wild_pokemon.current_hp
+    max_hp = wild_pokemon.max_hp
+
+    if current_hp > max_hp * rules.CATCH_HP_THRESHOLD:
+        return error(f"Wild {wild_pokemon.name.capitalize()}'s HP is too high ({current_hp}/{max_hp})! "
+                     f"Weaken it further to catch.")
+
+    # Calculate catch probability from the remaining HP percentage
+    catch_probability = rules.catch_probability(current_hp, max_hp)
+
+    # Random roll for catch success
+    roll = random.randint(1, 100)
+
+    if roll > catch_probability:
+        return error(f"Oh no! {wild_pokemon.name.capitalize()} broke free! "
+                     f"(Roll: {roll}, Needed: {catch_probability:.1f})")
+
+    pokemon_id = wild_pokemon.species_id or session['current_wild_pokemon_id']
+    try:
+        # Everything about the catch is already in the battle state, so
+        # the whole write is one transaction with no upstream lookups
+        new_pokemon = GameLogic.create_new_pokemon(
+            ctx.trainer_id, pokemon_id, level=wild_pokemon.level, moves=list(wild_pokemon.move_keys)
+        )
+        db.session.add(new_pokemon)
+        newly_seen, newly_caught = Pokedex.mark_caught(ctx.trainer_id, pokemon_id)
+        counters.increment(ctx.trainer_id, pokemon_owned=1, species_seen=int(newly_seen),
+                           species_caught=int(newly_caught))
+        db.session.commit()
+    except Exception as e:
+        logger.exception("Error catching Pokemon: %s", e)
+        db.session.rollback()
+        return error('Failed to catch Pokémon due to an error.')
+
+    # Clear battle state
+    session['current_wild_pokemon_id'] = None
+    battle_store.delete(session.pop('battle_id', None))
+
+    return {
+        'status': 'success',
+        'message': f"Gotcha! {wild_pokemon.name.capitalize()} was caught!",
+        'battle_ended': True
+    }
+
+async def prefetch_evyield(ctx):
+    wild_pokemon_id = session.get('current_wild_pokemon_id')
+    if wild_pokemon_id:
+        await GameLogic.get_pokemon_data_async(wild_pokemon_id)
+
+@registry.command('/evyield', requires={'wild_pokemon_id': 'No wild Pokémon to check! Use /hunt first.'},
+                  prefetch=prefetch_evyield)
+def evyield(ctx):
+    ev_yields = GameLogic.get_pokemon_ev_yields(ctx.wild_pokemon_id)
+    return {
+        'status': 'success',
+        'message': GameLogic.format_ev_yields(ev_yields)
+    }
+
+@registry.command('/mypokemon')
+def mypokemon(ctx):
+    # Options are key=value pairs, e.g. /mypokemon sort=level order=desc nature=timid
+    options = dict(arg.split('=', 1) for arg in ctx.args if '=' in arg)
+    try:
+        species = options.get('species')
+        if species and not species.isdigit():
+            species_data = GameLogic.get_pokemon_data(species)
+            if not species_data:
+                return error(f"Unknown Pokémon '{species}'")
+            species = species_data['id']
+        pokemon_list, next_cursor = GameLogic.list_trainer_pokemon(
+            ctx.trainer_id,
+            sort=options.get('sort', 'caught'),
+            descending=options.get('order') == 'desc',
+            limit=max(1, min(int(options.get('limit', MYPOKEMON_PAGE_SIZE)), MYPOKEMON_MAX_PAGE_SIZE)),
+            cursor=options.get('cursor'),
+            species_id=int(species) if species else None,
+            nature=options.get('nature'),
+            min_level=int(options['min_level']) if 'min_level' in options else None,
+            max_level=int(options['max_level']) if 'max_level' in options else None,
+        )
+    except ValueError as e:
+        logger.debug("Invalid /mypokemon options %s: %s", options, e)
+        return error('Invalid options! Try /mypokemon sort=level order=desc')
+
+    species_data = GameLogic.get_pokemon_data_many([p.pokemon_id for p in pokemon_list])
+    pokemon_data = []
+    for pokemon in pokemon_list:
+        poke_info = species_data.get(pokemon.pokemon_id)
+        if poke_info:
+            pokemon_data.append({
+                'name': poke_info['name'],
+                'level': pokemon.level,
+                'nature': pokemon.nature,
+                'moves': pokemon.get_moves()
             })
-            
-    elif base_command == '/evyield':
-        if 'current_wild_pokemon_id' not in session:
-            return jsonify({'status': 'error', 'message': 'No wild Pokémon to check! Use /hunt first.'})
-
-        ev_yields = GameLogic.get_pokemon_ev_yields(session['current_wild_pokemon_id'])
-        return jsonify({
-            'status': 'success',
-            'message': GameLogic.format_ev_yields(ev_yields)
-        })
-
-    elif base_command == '/mypokemon':
-        pokemon_list = Pokemon.query.filter_by(trainer_id=trainer_id).all()
-        pokemon_data = []
-        for pokemon in pokemon_list:
-            poke_info = GameLogic.get_pokemon_data(pokemon.pokemon_id)
-            if poke_info:
-                pokemon_data.append({
-                    'name': poke_info['name'],
-                    'level': pokemon.level,
-                    'nature': pokemon.nature,
-                    'moves': pokemon.get_moves()
-                })
-        return jsonify({
-            'status': 'success',
-            'pokemon': pokemon_data
-        })
-
-    elif base_command == '/mystats':
-        trainer = Trainer.query.get(trainer_id)
-        return jsonify({
-            'status': 'success',
-            'stats': {
-                'name': trainer.name,
-                'pokedollars': trainer.pokedollars,
-                'pokemon_count': len(trainer.pokemon)
-            }
-        })
-
-    return jsonify({'status': 'error', 'message': 'Unknown command'})
\ No newline at end of file
+    return {
+        'status': 'success',
+        'pokemon': pokemon_data,
+        'next_cursor': next_cursor
+    }
+
+@registry.command('/mystats')
+def mystats(ctx):
+    trainer = db.session.get(Trainer, ctx.trainer_id)
+    return {
+        'status': 'success',
+        'stats': {
+            'name': trainer.name,
+            'pokedollars': trainer.pokedollars,
+            'pokemon_count': trainer.pokemon_owned,
+            'species_seen': trainer.species_seen,
+            'species_caught': trainer.species_caught,
+            'battles_won': trainer.battles_won,
+            'battles_lost': trainer.battles_lost
+        }
+    }
+
+@app.route('/api/stream')
+def command_stream():
+    """Server-Sent Events stream that /api/stream/command pushes output to"""
+    if 'trainer_id' not in session:
+        return jsonify({'status': 'error', 'message': 'No active session'}), 401
+
+    channel = channels.open(session['trainer_id'])
+    if channel is None:
+        # The browser falls back to /api/command when its stream can't open
+        return jsonify({'status': 'error', 'message': 'Too many open streams'}), 503
+    return Response(channels.stream(channel), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/stream/command', methods=['POST'])
+def stream_command():
+    """Run a command and push its output to the caller's stream.
+
+    If the stream is not open in this worker, or its queue is full, the
+    response is returned inline as from /api/command.
+    """
+    data = request.json
+    channel = channels.get(data.get('channel'), session.get('trainer_id'))
+    response = registry.dispatch(str(data.get('command', '')))
+    if channel is None or not channel.publish(data.get('seq'), response):
+        return jsonify(response)
+    return jsonify({'status': 'accepted', 'seq': data.get('seq')})
+
+@app.route('/api/command/async', methods=['POST'])
+async def handle_command_async():
+    """/api/command with each command's upstream lookups awaited before it runs.
+
+    The command is still dispatched through the registry and its middleware;
+    see CommandRegistry.dispatch_async. Under gunicorn Flask runs the view in
+    an event loop of its own, holding a worker thread until it returns, so
+    only lookups within one command overlap. Served by asgi.py, it runs on
+    the server's event loop and a worker keeps many commands in flight.
+    """
+    return jsonify(await registry.dispatch_async(str(request.json.get('command', ''))))
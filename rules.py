@@ -0,0 +1,61 @@
+"""Game balance constants and formulas.
+
+Kept free of Flask and database imports so offline tooling such as the
+battle simulator uses exactly the same numbers as the game.
+"""
+
+# Encounter weights: (first species ID, last species ID, weight)
+GENERATION_WEIGHTS = (
+    (1, 151, 0.4),     # Gen 1: 40%
+    (152, 251, 0.3),   # Gen 2: 30%
+    (252, 386, 0.15),  # Gen 3: 15%
+    (387, 493, 0.1),   # Gen 4: 10%
+    (494, 649, 0.05),  # Gen 5: 5%
+)
+
+# Wild Pokémon level: 80% chance for level 1-20, 20% chance for level 20-75
+WILD_LOW_LEVEL_CHANCE = 0.8
+WILD_LOW_LEVELS = (1, 20)
+WILD_HIGH_LEVELS = (20, 75)
+
+# New trainers' starters begin mid-way through the common wild levels, since
+# battle stats scale with level
+STARTER_LEVEL = 10
+
+# Catching is only possible at or below this fraction of max HP
+CATCH_HP_THRESHOLD = 0.5
+# Base catch chance in percent, scaled by the factor for the remaining HP
+CATCH_BASE_PROBABILITY = 50
+# (minimum remaining HP %, catch factor), checked in order
+CATCH_FACTORS = (
+    (40, 1.0),
+    (30, 1.2),
+    (15, 1.5),
+    (5, 1.8),
+    (0, 2.0),
+)
+
+
+def base_damage(level: int, power: int, attack: int, defense: int) -> float:
+    """Basic Pokémon damage formula, before type effectiveness"""
+    return (2 * level / 5 + 2) * power * attack / defense / 50 + 2
+
+
+def scaled_hp(base_hp: int, level: int) -> int:
+    """Wild Pokémon HP: (Base HP * 2 * Level / 100) + Level + 10"""
+    return int((base_hp * 2 * level / 100) + level + 10)
+
+
+def catch_factor(hp_percentage: float) -> float:
+    """Catch factor for the wild Pokémon's remaining HP percentage"""
+    if hp_percentage > CATCH_HP_THRESHOLD * 100:
+        return 0
+    for min_percentage, factor in CATCH_FACTORS:
+        if hp_percentage >= min_percentage:
+            return factor
+    return CATCH_FACTORS[-1][1]
+
+
+def catch_probability(current_hp: int, max_hp: int) -> float:
+    """Chance in percent that a catch attempt succeeds"""
+    return CATCH_BASE_PROBABILITY * catch_factor(current_hp / max_hp * 100)
@@ -0,0 +1,301 @@
+"""Headless battle simulator for balance and load analysis.
+
+Plays whole batches of battles in lockstep with NumPy, using the same rules
+as GameLogic.execute_turn and the /catch handler (see rules.py), and reports
+win rates, turns to faint and catch outcomes. Species and moves come from the
+bundled dataset built by import_dataset.py; no HTTP calls are made.
+
+Usage:
+    python simulate.py --battles 1000000 --trainer-species 4 --trainer-level 10
+    python simulate.py --battles 100000 --catch-attempts 3 --json
+
+Unlike the game, which only uses NumPy when it is installed, the simulator
+needs it: pip install numpy
+"""
+import argparse
+import json
+import sys
+import time
+from typing import Dict, List, Optional
+
+try:
+    import numpy as np
+except ImportError:  # the whole simulation is vectorized
+    sys.exit("simulate.py needs NumPy: pip install numpy")
+
+import rules
+from dataset import DEFAULT_DATASET_PATH, NO_MOVE, NO_TYPE, NO_VALUE_16, Dataset
+from encounters import EncounterTable, encounter_tables
+from stats import NEUTRAL_NATURE, stats_array
+from type_chart import DUAL_EFFECTIVENESS_ARRAY, NO_SECOND_TYPE
+
+ONGOING, WON, LOST, CAUGHT = range(4)
+LEVEL_BUCKETS = ((1, 20), (21, 40), (41, 60), (61, 75))
+
+
+class DatasetArrays:
+    """Species and move columns of a Dataset as NumPy arrays indexed by ID"""
+
+    def __init__(self, dataset: Dataset):
+        records = np.array(
+            [dataset.species_record(i) for i in range(1, dataset.species_count + 1)], dtype=np.int64)
+        # Row 0 is padding so arrays can be indexed by species ID directly
+        records = np.vstack([np.zeros((1, records.shape[1]), dtype=np.int64), records])
+        self.species_count = dataset.species_count
+
+        types = records[:, 0:2]
+        self.types = np.where(types == NO_TYPE, NO_SECOND_TYPE, types)
+        self.stats = records[:, 2:8]
+
+        moves = records[:, 14:18]
+        fallback = dataset.move_index('tackle')
+        if fallback is None:
+            raise SystemExit("Dataset has no 'tackle' move, rebuild it with import_dataset.py")
+        # Pack each species' moves to the front, falling back to tackle like GameLogic does
+        self.moves = np.full_like(moves, -1)
+        self.move_counts = np.zeros(len(moves), dtype=np.int64)
+        for i, row in enumerate(moves):
+            valid = [m for m in row if m != NO_MOVE] or [fallback]
+            self.moves[i, :len(valid)] = valid
+            self.move_counts[i] = len(valid)
+
+        move_records = [dataset.move_record(i) for i in range(dataset.move_count)]
+        self.move_types = np.array([r[1] for r in move_records], dtype=np.int64)
+        # Status moves have no power and deal the formula's flat minimum
+        self.move_powers = np.array(
+            [0 if r[2] == NO_VALUE_16 else r[2] for r in move_records], dtype=np.int64)
+
+
+def damage(level: np.ndarray, move: np.ndarray, attack: np.ndarray, defense: np.ndarray,
+           defender_types: np.ndarray, arrays: DatasetArrays) -> np.ndarray:
+    """Vectorized GameLogic.calculate_battle_damage"""
+    effectiveness = DUAL_EFFECTIVENESS_ARRAY[arrays.move_types[move], defender_types[:, 0], defender_types[:, 1]]
+    damage = rules.base_damage(level, arrays.move_powers[move], attack, defense) * effectiveness
+    return damage.astype(np.int64)
+
+
+def catch_probability(current_hp: np.ndarray, max_hp: np.ndarray) -> np.ndarray:
+    """Vectorized rules.catch_probability"""
+    percentage = current_hp / max_hp * 100
+    factor = np.zeros_like(percentage)
+    for min_percentage, value in reversed(rules.CATCH_FACTORS):
+        factor = np.where(percentage >= min_percentage, value, factor)
+    factor = np.where(percentage > rules.CATCH_HP_THRESHOLD * 100, 0, factor)
+    return rules.CATCH_BASE_PROBABILITY * factor
+
+
+def pick_moves(species: np.ndarray, arrays: DatasetArrays, rng: np.random.Generator) -> np.ndarray:
+    """Uniformly random move for each battler, like random.choice over its moves"""
+    slots = (rng.random(len(species)) * arrays.move_counts[species]).astype(np.int64)
+    return arrays.moves[species, slots]
+
+
+def simulate_chunk(arrays: DatasetArrays, table: EncounterTable, size: int, trainer_species: int,
+                   trainer_level: int, catch_attempts: int, max_turns: int,
+                   rng: np.random.Generator) -> Dict[str, np.ndarray]:
+    """Run size battles to completion and return per-battle outcome arrays"""
+    wild_species = table.sample_many(size, rng)
+    low = rng.random(size) < rules.WILD_LOW_LEVEL_CHANCE
+    wild_level = np.where(
+        low,
+        rng.integers(rules.WILD_LOW_LEVELS[0], rules.WILD_LOW_LEVELS[1] + 1, size),
+        rng.integers(rules.WILD_HIGH_LEVELS[0], rules.WILD_HIGH_LEVELS[1] + 1, size),
+    )
+    # Wild Pokémon have no IVs, EVs or nature
+    wild_stats = stats_array(arrays.stats[wild_species], 0, 0, wild_level, NEUTRAL_NATURE)
+    wild_types = arrays.types[wild_species]
+    wild_max_hp = wild_stats[:, 0]
+    wild_hp = wild_max_hp.copy()
+
+    # Each battle's trainer Pokémon has fresh random IVs like a newly created one, and no EVs
+    trainer_ivs = rng.integers(0, 32, (size, 6))
+    trainer_stats = stats_array(np.broadcast_to(arrays.stats[trainer_species], (size, 6)), trainer_ivs, 0,
+                                np.full(size, trainer_level), NEUTRAL_NATURE)
+    trainer_hp = trainer_stats[:, 0].copy()
+    trainer_species_column = np.full(size, trainer_species, dtype=np.int64)
+    trainer_types = np.broadcast_to(arrays.types[trainer_species], (size, 2))
+
+    outcome = np.full(size, ONGOING, dtype=np.int8)
+    turns = np.zeros(size, dtype=np.int64)
+    catch_chance = np.zeros(size)
+    catch_tries = np.zeros(size, dtype=np.int64)
+
+    active = np.arange(size)
+    for turn in range(1, max_turns + 1):
+        if active.size == 0:
+            break
+        turns[active] = turn
+
+        # Player's move
+        move = pick_moves(trainer_species_column[active], arrays, rng)
+        hit = damage(trainer_level, move, trainer_stats[active, 1], wild_stats[active, 2], wild_types[active], arrays)
+        wild_hp[active] = np.maximum(0, wild_hp[active] - hit)
+        fainted = wild_hp[active] <= 0
+        outcome[active[fainted]] = WON
+        active = active[~fainted]
+
+        # Wild Pokémon's move
+        move = pick_moves(wild_species[active], arrays, rng)
+        hit = damage(wild_level[active], move, wild_stats[active, 1], trainer_stats[active, 2],
+                     trainer_types[active], arrays)
+        trainer_hp[active] = np.maximum(0, trainer_hp[active] - hit)
+        fainted = trainer_hp[active] <= 0
+        outcome[active[fainted]] = LOST
+        active = active[~fainted]
+
+        # Catch attempts once the wild Pokémon is weak enough; a failed /catch costs no turn
+        if catch_attempts:
+            candidates = active[wild_hp[active] <= wild_max_hp[active] * rules.CATCH_HP_THRESHOLD]
+            chance = catch_probability(wild_hp[candidates], wild_max_hp[candidates])
+            for _ in range(catch_attempts):
+                if candidates.size == 0:
+                    break
+                catch_tries[candidates] += 1
+                caught = rng.integers(1, 101, candidates.size) <= chance
+                outcome[candidates[caught]] = CAUGHT
+                catch_chance[candidates[caught]] = chance[caught]
+                candidates, chance = candidates[~caught], chance[~caught]
+            active = active[outcome[active] == ONGOING]
+
+    return {
+        'outcome': outcome,
+        'turns': turns,
+        'wild_species': wild_species,
+        'wild_level': wild_level,
+        'catch_chance': catch_chance,
+        'catch_tries': catch_tries,
+    }
+
+
+def percentiles(histogram: np.ndarray) -> Dict[str, float]:
+    """p50/p90/p99 and mean of a value histogram indexed by value"""
+    total = histogram.sum()
+    if not total:
+        return {}
+    cumulative = np.cumsum(histogram)
+    values = np.arange(len(histogram))
+    result = {f"p{q}": int(np.searchsorted(cumulative, total * q / 100)) for q in (50, 90, 99)}
+    result['mean'] = float((values * histogram).sum() / total)
+    return result
+
+
+def run(arrays: DatasetArrays, table: EncounterTable, battles: int, trainer_species: int,
+        trainer_level: int, catch_attempts: int = 1, max_turns: int = 200, chunk_size: int = 250000,
+        seed: Optional[int] = None) -> Dict:
+    rng = np.random.default_rng(seed)
+    outcomes = np.zeros(4, dtype=np.int64)
+    turn_histograms = {WON: np.zeros(max_turns + 1, dtype=np.int64),
+                       LOST: np.zeros(max_turns + 1, dtype=np.int64)}
+    catch_chances: Dict[float, int] = {}
+    tries_histogram = np.zeros(max(catch_attempts, 1) * max_turns + 1, dtype=np.int64)
+    by_level = np.zeros((len(LEVEL_BUCKETS), 4), dtype=np.int64)
+    by_generation = np.zeros((len(rules.GENERATION_WEIGHTS), 4), dtype=np.int64)
+
+    started = time.perf_counter()
+    remaining = battles
+    while remaining:
+        size = min(chunk_size, remaining)
+        remaining -= size
+        chunk = simulate_chunk(arrays, table, size, trainer_species, trainer_level, catch_attempts,
+                               max_turns, rng)
+        outcome = chunk['outcome']
+
+        outcomes += np.bincount(outcome, minlength=4)
+        for result, histogram in turn_histograms.items():
+            histogram += np.bincount(chunk['turns'][outcome == result], minlength=max_turns + 1)
+        caught = outcome == CAUGHT
+        for chance, count in zip(*np.unique(chunk['catch_chance'][caught], return_counts=True)):
+            catch_chances[float(chance)] = catch_chances.get(float(chance), 0) + int(count)
+        tries_histogram += np.bincount(chunk['catch_tries'][chunk['catch_tries'] > 0],
+                                       minlength=len(tries_histogram))[:len(tries_histogram)]
+        for i, (low, high) in enumerate(LEVEL_BUCKETS):
+            in_bucket = (chunk['wild_level'] >= low) & (chunk['wild_level'] <= high)
+            by_level[i] += np.bincount(outcome[in_bucket], minlength=4)
+        for i, (first, last, _) in enumerate(rules.GENERATION_WEIGHTS):
+            in_generation = (chunk['wild_species'] >= first) & (chunk['wild_species'] <= last)
+            by_generation[i] += np.bincount(outcome[in_generation], minlength=4)
+    elapsed = time.perf_counter() - started
+
+    def rates(counts: np.ndarray) -> Dict[str, float]:
+        total = counts.sum()
+        return {
+            'battles': int(total),
+            'win_rate': float(counts[WON] / total) if total else 0.0,
+            'loss_rate': float(counts[LOST] / total) if total else 0.0,
+            'catch_rate': float(counts[CAUGHT] / total) if total else 0.0,
+            'timeout_rate': float(counts[ONGOING] / total) if total else 0.0,
+        }
+
+    return {
+        'config': {
+            'battles': battles, 'encounter_table': table.name, 'trainer_species': trainer_species, 'trainer_level': trainer_level,
+            'catch_attempts': catch_attempts, 'max_turns': max_turns, 'seed': seed,
+        },
+        'overall': rates(outcomes),
+        'turns_to_faint': {
+            'wild': percentiles(turn_histograms[WON]),
+            'trainer': percentiles(turn_histograms[LOST]),
+        },
+        'catch': {
+            'success_by_probability': {f"{k:g}%": v for k, v in sorted(catch_chances.items())},
+            'attempts': percentiles(tries_histogram),
+        },
+        'by_wild_level': {f"{low}-{high}": rates(by_level[i]) for i, (low, high) in enumerate(LEVEL_BUCKETS)},
+        'by_generation': {f"gen{i + 1}": rates(by_generation[i]) for i in range(len(rules.GENERATION_WEIGHTS))},
+        'elapsed_seconds': elapsed,
+        'battles_per_second': battles / elapsed if elapsed else 0.0,
+    }
+
+
+def format_report(report: Dict) -> str:
+    lines: List[str] = []
+    overall = report['overall']
+    lines.append(f"{overall['battles']} battles in {report['elapsed_seconds']:.2f}s "
+                 f"({report['battles_per_second']:,.0f}/s)")
+    lines.append(f"  won {overall['win_rate']:.1%}  lost {overall['loss_rate']:.1%}  "
+                 f"caught {overall['catch_rate']:.1%}  timed out {overall['timeout_rate']:.1%}")
+    for side, stats in report['turns_to_faint'].items():
+        if stats:
+            lines.append(f"  turns until {side} faints: p50 {stats['p50']}  p90 {stats['p90']}  "
+                         f"p99 {stats['p99']}  mean {stats['mean']:.2f}")
+    if report['catch']['success_by_probability']:
+        lines.append("  catches by catch chance: " + ', '.join(
+            f"{k}: {v}" for k, v in report['catch']['success_by_probability'].items()))
+    for title, key in (("wild level", 'by_wild_level'), ("generation", 'by_generation')):
+        lines.append(f"  by {title}:")
+        for bucket, stats in report[key].items():
+            lines.append(f"    {bucket:>6}  n={stats['battles']:<9} won {stats['win_rate']:.1%}  "
+                         f"lost {stats['loss_rate']:.1%}  caught {stats['catch_rate']:.1%}")
+    return '\n'.join(lines)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Simulate battles offline against the bundled dataset")
+    parser.add_argument('--dataset', default=DEFAULT_DATASET_PATH, help="dataset file from import_dataset.py")
+    parser.add_argument('--battles', type=int, default=100000)
+    parser.add_argument('--encounter-table', choices=sorted(encounter_tables.tables),
+                        help="encounter table to draw wild Pokémon from")
+    parser.add_argument('--trainer-species', type=int, default=4, help="species ID of the trainer's Pokémon")
+    parser.add_argument('--trainer-level', type=int, default=rules.STARTER_LEVEL)
+    parser.add_argument('--catch-attempts', type=int, default=1,
+                        help="/catch attempts per turn once catching is possible, 0 to never catch")
+    parser.add_argument('--max-turns', type=int, default=200)
+    parser.add_argument('--chunk-size', type=int, default=250000, help="battles simulated per batch")
+    parser.add_argument('--seed', type=int, help="RNG seed for reproducible runs")
+    parser.add_argument('--json', action='store_true', help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    arrays = DatasetArrays(Dataset(args.dataset))
+    if not 1 <= args.trainer_species <= arrays.species_count:
+        parser.error(f"--trainer-species must be between 1 and {arrays.species_count}")
+    table = encounter_tables.get(args.encounter_table)
+    if max(table.weights) > arrays.species_count:
+        parser.error(f"encounter table {table.name!r} uses species outside the dataset")
+    report = run(arrays, table, args.battles, args.trainer_species, args.trainer_level, args.catch_attempts,
+                 args.max_turns, args.chunk_size, args.seed)
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,169 @@
+"""Local sprite cache served by the /sprites route.
+
+Sprites are stored as <id>.png in POKEAPI_SPRITE_DIR. A sprite that is not
+on disk yet is fetched from POKEAPI_SPRITE_URL the first time it is asked
+for (unless POKEAPI_OFFLINE is set); the importer fills the directory ahead
+of time so the game needs no outbound network at all:
+
+    python sprites.py --source https://raw.githubusercontent.com/PokeAPI/sprites/master/sprites/pokemon
+    python sprites.py --source /path/to/sprites/sprites/pokemon
+
+Downloads go through an upstream client of their own, with its own rate
+limit and circuit breaker, short timeouts and no retries, so a slow or
+failing sprite host neither holds a request for long nor trips the breaker
+in front of PokeAPI. A sprite the source doesn't have is not asked for
+again for MISSING_TTL seconds. A sprite never changes once
+stored, so responses carry a content-hash ETag and an immutable
+Cache-Control header.
+"""
+import argparse
+import hashlib
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+
+from dataset import MAX_SPECIES_ID, OFFLINE
+from upstream import UpstreamClient, UpstreamUnavailable
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SPRITE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'sprites')
+DEFAULT_SPRITE_SOURCE = 'https://raw.githubusercontent.com/PokeAPI/sprites/master/sprites/pokemon'
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+MISSING_TTL = 3600.0
+
+
+def sprite_client(source: str) -> UpstreamClient:
+    """A client for the sprite host configured from SPRITE_* environment variables"""
+    env = os.environ.get
+    return UpstreamClient(
+        base_url=source,
+        pool_size=int(env('SPRITE_POOL_SIZE', 4)),
+        connect_timeout=float(env('SPRITE_CONNECT_TIMEOUT', 1.0)),
+        read_timeout=float(env('SPRITE_READ_TIMEOUT', 2.0)),
+        retries=int(env('SPRITE_RETRIES', 0)),
+        rate=float(env('SPRITE_RATE', 10)),
+        burst=float(env('SPRITE_BURST', 10)),
+        max_queue_wait=float(env('SPRITE_MAX_QUEUE_WAIT', 1.0)),
+        breaker_threshold=int(env('SPRITE_BREAKER_THRESHOLD', 5)),
+        breaker_reset=float(env('SPRITE_BREAKER_RESET', 30)),
+        name='Sprite host',
+    )
+
+
+class SpriteStore:
+    """Directory of sprite PNGs with their ETags, and sprites the source lacks, memoized in memory"""
+
+    def __init__(self, directory: str = DEFAULT_SPRITE_DIR, source: Optional[str] = DEFAULT_SPRITE_SOURCE,
+                 client: Optional[UpstreamClient] = None):
+        self.directory = directory
+        self.source = source.rstrip('/') if source else None
+        self.client = client or sprite_client(self.source or '')
+        self._etags: Dict[int, str] = {}
+        # pokemon_id -> when to ask the source for it again
+        self._missing: Dict[int, float] = {}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    @classmethod
+    def from_env(cls) -> 'SpriteStore':
+        """Build a store configured from POKEAPI_SPRITE_* environment variables"""
+        source = os.environ.get('POKEAPI_SPRITE_URL', DEFAULT_SPRITE_SOURCE)
+        return cls(
+            directory=os.environ.get('POKEAPI_SPRITE_DIR', DEFAULT_SPRITE_DIR),
+            source=None if OFFLINE else source or None,
+        )
+
+    def path(self, pokemon_id: int) -> str:
+        return os.path.join(self.directory, f"{pokemon_id}.png")
+
+    def get(self, pokemon_id: int) -> Optional[Tuple[str, str]]:
+        """(path, etag) of a stored sprite, fetching it first if it's missing"""
+        path = self.path(pokemon_id)
+        etag = self._etags.get(pokemon_id)
+        if etag is not None:
+            return path, etag
+
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            if self._missing.get(pokemon_id, 0) > time.monotonic():
+                return None
+            try:
+                data = self.fetch(pokemon_id)
+            except UpstreamUnavailable as e:
+                logger.warning("Failed to fetch sprite %s: %s", pokemon_id, e)
+                return None
+            if data is None:
+                with self._lock:
+                    self._missing[pokemon_id] = time.monotonic() + MISSING_TTL
+                return None
+            self.put(pokemon_id, data)
+
+        etag = hashlib.sha1(data).hexdigest()
+        with self._lock:
+            self._etags[pokemon_id] = etag
+        return path, etag
+
+    def put(self, pokemon_id: int, data: bytes) -> None:
+        """Store a sprite; the rename makes it appear whole to concurrent readers"""
+        path = self.path(pokemon_id)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def fetch(self, pokemon_id: int) -> Optional[bytes]:
+        """Download one sprite from the source, None if it has none.
+
+        Raises UpstreamUnavailable when an HTTP source can't be reached.
+        """
+        if not self.source:
+            return None
+        if self.source.startswith(('http://', 'https://')):
+            response = self.client.get(f"{self.source}/{pokemon_id}.png")
+            data = response.content if response is not None else None
+        else:
+            try:
+                with open(os.path.join(self.source, f"{pokemon_id}.png"), 'rb') as f:
+                    data = f.read()
+            except OSError:
+                data = None
+        if not data or not data.startswith(PNG_SIGNATURE):
+            logger.info("No sprite for Pokémon %s at %s", pokemon_id, self.source)
+            return None
+        return data
+
+
+sprite_store = SpriteStore.from_env()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Fill the local sprite cache")
+    parser.add_argument('--source', default=DEFAULT_SPRITE_SOURCE,
+                        help="base URL or directory holding <id>.png sprites")
+    parser.add_argument('--out', default=os.environ.get('POKEAPI_SPRITE_DIR', DEFAULT_SPRITE_DIR),
+                        help="sprite cache directory")
+    parser.add_argument('--max-id', type=int, default=MAX_SPECIES_ID, help="highest species ID to import")
+    parser.add_argument('--workers', type=int, default=8, help="concurrent fetches")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    # A bulk import can afford to wait out slow responses and retry
+    client = UpstreamClient(args.source, pool_size=args.workers, name='Sprite source')
+    store = SpriteStore(args.out, args.source, client)
+    missing = [i for i in range(1, args.max_id + 1) if not os.path.exists(store.path(i))]
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        fetched = sum(1 for found in pool.map(store.get, missing) if found)
+    logger.info("Imported %d sprites into %s (%d unavailable)", fetched, args.out, len(missing) - fetched)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
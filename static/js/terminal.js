@@ -1,13 +1,51 @@
+// Height reserved for a sprite in the scrollback, in pixels
+const SPRITE_HEIGHT = 112;
+
+// Fixed-capacity ring buffer of scrollback rows; once full, each push drops the oldest row
+class Scrollback {
+    constructor(capacity) {
+        this.capacity = capacity;
+        this.rows = new Array(capacity);
+        this.start = 0;
+        this.length = 0;
+    }
+
+    // Returns true if the push evicted a row
+    push(row) {
+        if (this.length < this.capacity) {
+            this.rows[(this.start + this.length++) % this.capacity] = row;
+            return false;
+        }
+        this.rows[this.start] = row;
+        this.start = (this.start + 1) % this.capacity;
+        return true;
+    }
+
+    get(index) {
+        return this.rows[(this.start + index) % this.capacity];
+    }
+}
+
 class Terminal {
-    constructor(containerId) {
+    // options.maxLines caps the scrollback; older output is discarded
+    constructor(containerId, options = {}) {
         this.container = document.getElementById(containerId);
         this.history = [];
+        this.scrollback = new Scrollback(options.maxLines || 5000);
+        this.outputQueue = [];
+        this.frame = null;
         this.initializeTerminal();
     }
 
     initializeTerminal() {
+        // Only the rows in view are in the DOM: the spacer gives the scrollbar
+        // the full height and the viewport is moved to the scroll position
         this.terminal = document.createElement('div');
         this.terminal.className = 'terminal-content';
+        this.spacer = document.createElement('div');
+        this.viewport = document.createElement('div');
+        this.viewport.className = 'terminal-viewport';
+        this.terminal.append(this.spacer, this.viewport);
         this.container.appendChild(this.terminal);
 
         this.input = document.createElement('input');
@@ -22,100 +60,272 @@ class Terminal {
                 this.input.value = '';
             }
         });
+
+        this.measure();
+        this.terminal.addEventListener('scroll', () => this.scheduleUpdate());
+        if (window.ResizeObserver) {
+            new ResizeObserver(() => {
+                this.measure();
+                this.scheduleUpdate();
+            }).observe(this.terminal);
+        }
     }
 
+    // Row height and columns per row, from a hidden probe line
+    measure() {
+        const probe = document.createElement('div');
+        probe.className = 'terminal-line';
+        probe.style.position = 'absolute';
+        probe.style.visibility = 'hidden';
+        probe.textContent = 'M'.repeat(10);
+        this.terminal.appendChild(probe);
+        const rect = probe.getBoundingClientRect();
+        this.terminal.removeChild(probe);
+
+        const style = getComputedStyle(this.terminal);
+        const width = this.terminal.clientWidth - parseFloat(style.paddingLeft) - parseFloat(style.paddingRight);
+        this.rowHeight = rect.height || 20;
+        this.columns = rect.width ? Math.max(20, Math.floor(width / (rect.width / 10))) : 80;
+        this.spriteRows = Math.ceil(SPRITE_HEIGHT / this.rowHeight);
+        this.spacer.style.height = `${this.scrollback.length * this.rowHeight}px`;
+    }
+
+    // Output is queued and added to the scrollback once per animation frame
     print(message, className = '') {
-        const lines = message.split('\n');
-        lines.forEach(line => {
-            const lineElement = document.createElement('div');
-            lineElement.className = `terminal-line ${className}`;
-            lineElement.textContent = line;
-            this.terminal.appendChild(lineElement);
-        });
-        this.scrollToBottom();
+        this.outputQueue.push({ text: message, className: className });
+        this.scheduleUpdate();
     }
 
     displaySprite(url) {
-        const imgContainer = document.createElement('div');
-        imgContainer.className = 'terminal-line pokemon-sprite';
-        const img = document.createElement('img');
-        img.src = url;
-        img.alt = 'Pokemon Sprite';
-        img.onerror = () => {
-            console.error('Failed to load sprite:', url);
-            this.print('Failed to load Pokemon sprite', 'error');
-        };
-        imgContainer.appendChild(img);
-        this.terminal.appendChild(imgContainer);
-        this.scrollToBottom();
+        this.outputQueue.push({ sprite: url });
+        this.scheduleUpdate();
+    }
+
+    scheduleUpdate() {
+        if (this.frame === null) {
+            this.frame = requestAnimationFrame(() => {
+                this.frame = null;
+                this.flush();
+                this.renderWindow();
+            });
+        }
     }
 
     scrollToBottom() {
         requestAnimationFrame(() => {
             this.terminal.scrollTop = this.terminal.scrollHeight;
+            this.scheduleUpdate();
         });
     }
 
-    async handleCommand(command) {
-        this.print(`> ${command}`, 'command');
+    // Move queued output into the scrollback, hard-wrapped to the terminal width
+    flush() {
+        if (this.outputQueue.length === 0) {
+            return;
+        }
+        const terminal = this.terminal;
+        const atBottom = terminal.scrollTop + terminal.clientHeight >= terminal.scrollHeight - this.rowHeight;
+        let evicted = 0;
+        const push = (row) => {
+            if (this.scrollback.push(row)) {
+                evicted++;
+            }
+        };
 
-        try {
-            const response = await fetch('/api/command', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                },
-                body: JSON.stringify({ command: command })
+        this.outputQueue.forEach(entry => {
+            if (entry.sprite) {
+                // The image overflows its first row into blank rows reserved below it
+                push({ sprite: entry.sprite, className: 'pokemon-sprite' });
+                for (let i = 1; i < this.spriteRows; i++) {
+                    push({ text: '', className: '' });
+                }
+                return;
+            }
+            entry.text.split('\n').forEach(line => {
+                for (let i = 0; i < Math.max(line.length, 1); i += this.columns) {
+                    push({ text: line.slice(i, i + this.columns), className: entry.className });
+                }
             });
+        });
+        this.outputQueue = [];
 
-            // Check if the response is valid JSON
-            const text = await response.text();
-            let data;
-            try {
-                data = JSON.parse(text);
-            } catch (e) {
-                console.error("Invalid JSON response:", text);
-                this.print("Error: Server returned an invalid response. Please try again.", "error");
-                return;
+        this.spacer.style.height = `${this.scrollback.length * this.rowHeight}px`;
+        if (atBottom) {
+            terminal.scrollTop = terminal.scrollHeight;
+        } else if (evicted) {
+            // Keep the rows the reader is looking at in place
+            terminal.scrollTop -= evicted * this.rowHeight;
+        }
+    }
+
+    // Build DOM nodes for the rows in view, plus enough above for a sprite to overflow into it
+    renderWindow() {
+        const scrollTop = this.terminal.scrollTop;
+        const first = Math.max(0, Math.floor(scrollTop / this.rowHeight) - this.spriteRows);
+        const last = Math.min(this.scrollback.length,
+            Math.ceil((scrollTop + this.terminal.clientHeight) / this.rowHeight) + 1);
+
+        const nodes = [];
+        for (let i = first; i < last; i++) {
+            nodes.push(this.renderRow(this.scrollback.get(i)));
+        }
+        this.viewport.style.transform = `translateY(${first * this.rowHeight}px)`;
+        this.viewport.replaceChildren(...nodes);
+    }
+
+    renderRow(row) {
+        const lineElement = document.createElement('div');
+        lineElement.className = `terminal-line ${row.className}`;
+        lineElement.style.height = `${this.rowHeight}px`;
+        if (row.sprite) {
+            // Kept on the row so the image loads (or fails) only once
+            if (!row.image) {
+                row.image = document.createElement('img');
+                row.image.src = row.sprite;
+                row.image.alt = 'Pokemon Sprite';
+                row.image.onerror = () => {
+                    console.error('Failed to load sprite:', row.sprite);
+                    this.print('Failed to load Pokemon sprite', 'error');
+                };
             }
+            lineElement.appendChild(row.image);
+        } else {
+            lineElement.textContent = row.text;
+        }
+        return lineElement;
+    }
 
-            if (data.status === 'success') {
-                if (data.sprite_url) {
-                    this.displaySprite(data.sprite_url);
-                }
+    // Open the Server-Sent Events stream that command output is pushed to.
+    // Until it is ready (or if it can't be opened) commands go over plain HTTP.
+    connectStream() {
+        if (!window.EventSource || this.stream) {
+            return;
+        }
+        this.seq = 0;
+        this.inflight = new Map();
+        this.stream = new EventSource('/api/stream');
+
+        this.stream.addEventListener('ready', (e) => {
+            this.channel = JSON.parse(e.data).channel;
+        });
+        this.stream.addEventListener('sprite', (e) => {
+            this.displaySprite(JSON.parse(e.data).url);
+        });
+        this.stream.addEventListener('line', (e) => {
+            const line = JSON.parse(e.data);
+            this.print(line.text, line.error ? 'error' : '');
+        });
+        this.stream.addEventListener('result', (e) => {
+            const data = JSON.parse(e.data);
+            const command = this.inflight.get(data.seq);
+            this.inflight.delete(data.seq);
+            if (command !== undefined) {
+                this.render(command, data);
+            }
+        });
+        this.stream.onerror = () => {
+            // EventSource reconnects by itself and sends a new 'ready' event
+            this.channel = null;
+            if (this.stream.readyState === EventSource.CLOSED) {
+                this.stream = null;
+            }
+        };
+    }
+
+    async post(url, body) {
+        const response = await fetch(url, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify(body)
+        });
+
+        // Check if the response is valid JSON
+        const text = await response.text();
+        try {
+            return JSON.parse(text);
+        } catch (e) {
+            console.error("Invalid JSON response:", text);
+            this.print("Error: Server returned an invalid response. Please try again.", "error");
+            return null;
+        }
+    }
+
+    async handleCommand(command) {
+        this.print(`> ${command}`, 'command');
 
-                if (command === '/mypokemon' && data.pokemon) {
-                    data.pokemon.forEach(pokemon => {
-                        const movesList = pokemon.moves ? `\n  Moves: ${pokemon.moves.join(', ')}` : '';
-                        this.print(`${pokemon.name.toUpperCase()} (Lv. ${pokemon.level}) - ${pokemon.nature}${movesList}`);
-                    });
-                } else if (command === '/mystats' && data.stats) {
-                    this.print(`Trainer: ${data.stats.name}`);
-                    this.print(`PokéDollars: ${data.stats.pokedollars}`);
-                    this.print(`Pokémon: ${data.stats.pokemon_count}`);
-                } else if (command === '/hunt' && data.pokemon) {
-                    this.print(data.message);
-                } else if (command === '/battle' && data.battle_state) {
-                    this.print(data.message);
-                    if (data.battle_state.turn === 'player') {
-                        this.print('\nChoose your move (type /move <number>)');
-                    }
-                } else if (command.startsWith('/move') && data.battle_state) {
-                    this.print(data.message);
-                    if (!data.battle_ended && data.battle_state.turn === 'player') {
-                        this.print('\nChoose your move (type /move <number>)');
-                    }
-                } else {
-                    this.print(data.message);
+        try {
+            let data;
+            if (this.channel) {
+                const seq = ++this.seq;
+                this.inflight.set(seq, command);
+                data = await this.post('/api/stream/command', { command: command, channel: this.channel, seq: seq });
+                if (data && data.status === 'accepted') {
+                    return;  // Output arrives on the stream
                 }
+                // The stream lives in another server process; the answer came back inline
+                this.inflight.delete(seq);
             } else {
-                this.print(`Error: ${data.message}`, 'error');
+                data = await this.post('/api/command', { command: command });
+            }
+            if (data) {
+                this.render(command, data);
             }
         } catch (error) {
             console.error('Error:', error);
             this.print('An error occurred while processing the command', 'error');
         }
     }
+
+    // Print a command response. Responses delivered over the stream have no
+    // message or sprite_url here because those were already shown as they arrived.
+    render(command, data) {
+        const printMessage = () => {
+            if (data.message !== undefined) {
+                this.print(data.message);
+            }
+        };
+
+        if (data.status === 'success') {
+            if (data.sprite_url) {
+                this.displaySprite(data.sprite_url);
+            }
+
+            if (command.split(' ')[0] === '/mypokemon' && data.pokemon) {
+                data.pokemon.forEach(pokemon => {
+                    const movesList = pokemon.moves ? `\n  Moves: ${pokemon.moves.join(', ')}` : '';
+                    this.print(`${pokemon.name.toUpperCase()} (Lv. ${pokemon.level}) - ${pokemon.nature}${movesList}`);
+                });
+                if (data.next_cursor) {
+                    const options = command.split(' ').filter(arg => !arg.startsWith('cursor='));
+                    this.print(`\nMore Pokémon: ${options.join(' ')} cursor=${data.next_cursor}`);
+                }
+            } else if (command === '/mystats' && data.stats) {
+                this.print(`Trainer: ${data.stats.name}`);
+                this.print(`PokéDollars: ${data.stats.pokedollars}`);
+                this.print(`Pokémon: ${data.stats.pokemon_count}`);
+                this.print(`Pokédex: ${data.stats.species_caught} caught / ${data.stats.species_seen} seen`);
+                this.print(`Battles: ${data.stats.battles_won} won / ${data.stats.battles_lost} lost`);
+            } else if (command === '/hunt' && data.pokemon) {
+                printMessage();
+            } else if (command === '/battle' && data.battle_state) {
+                printMessage();
+                if (data.battle_state.turn === 'player') {
+                    this.print('\nChoose your move (type /move <number>)');
+                }
+            } else if (command.startsWith('/move') && data.battle_state) {
+                printMessage();
+                if (!data.battle_ended && data.battle_state.turn === 'player') {
+                    this.print('\nChoose your move (type /move <number>)');
+                }
+            } else {
+                printMessage();
+            }
+        } else if (data.message !== undefined) {
+            this.print(`Error: ${data.message}`, 'error');
+        }
+    }
 }
 
 // Initialize game
@@ -148,6 +358,7 @@ document.addEventListener('DOMContentLoaded', () => {
             if (data.status === 'success') {
                 // Check if it's a welcome back message
                 terminal.print(data.message);
+                terminal.connectStream();
                 document.getElementById('setup-form').style.display = 'none';
                 terminal.scrollToBottom();
             } else {
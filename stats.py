@@ -0,0 +1,79 @@
+"""Battle stat calculation from base stats, IVs, EVs, level and nature.
+
+Uses the main-series formulas (generation III onwards):
+
+    HP    = (2 * Base + IV + EV // 4) * Level // 100 + Level + 10
+    Other = ((2 * Base + IV + EV // 4) * Level // 100 + 5) * Nature // 10
+
+where Nature is 11 for the stat a nature raises, 9 for the one it lowers
+and 10 otherwise. Everything is integer arithmetic, so the scalar and bulk
+paths agree exactly. Stat sequences are in STAT_NAMES order. Like rules.py
+this module has no Flask or database imports.
+"""
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from battle import ATTACK, DEFENSE, HP, SP_ATTACK, SP_DEFENSE, SPEED
+
+try:
+    import numpy as np
+except ImportError:  # bulk calculation falls back to plain Python
+    np = None
+
+# Nature -> (raised stat, lowered stat); the five neutral natures are absent
+NATURE_EFFECTS: Dict[str, Tuple[int, int]] = {
+    'lonely': (ATTACK, DEFENSE), 'brave': (ATTACK, SPEED),
+    'adamant': (ATTACK, SP_ATTACK), 'naughty': (ATTACK, SP_DEFENSE),
+    'bold': (DEFENSE, ATTACK), 'relaxed': (DEFENSE, SPEED),
+    'impish': (DEFENSE, SP_ATTACK), 'lax': (DEFENSE, SP_DEFENSE),
+    'timid': (SPEED, ATTACK), 'hasty': (SPEED, DEFENSE),
+    'jolly': (SPEED, SP_ATTACK), 'naive': (SPEED, SP_DEFENSE),
+    'modest': (SP_ATTACK, ATTACK), 'mild': (SP_ATTACK, DEFENSE),
+    'quiet': (SP_ATTACK, SPEED), 'rash': (SP_ATTACK, SP_DEFENSE),
+    'calm': (SP_DEFENSE, ATTACK), 'gentle': (SP_DEFENSE, DEFENSE),
+    'sassy': (SP_DEFENSE, SPEED), 'careful': (SP_DEFENSE, SP_ATTACK),
+}
+NEUTRAL_NATURE = (10,) * 6
+NO_IVS = NO_EVS = (0,) * 6
+
+
+def nature_factors(nature: Optional[str]) -> Tuple[int, ...]:
+    """Per-stat nature multipliers in tenths; unknown natures are neutral"""
+    effect = NATURE_EFFECTS.get((nature or '').lower())
+    if effect is None:
+        return NEUTRAL_NATURE
+    factors = [10] * 6
+    factors[effect[0]] = 11
+    factors[effect[1]] = 9
+    return tuple(factors)
+
+
+def calculate_stats(base_stats: Sequence[int], ivs: Sequence[int], evs: Sequence[int], level: int,
+                    nature: Optional[str] = None) -> Tuple[int, ...]:
+    """One Pokémon's stats"""
+    factors = nature_factors(nature)
+    stats = []
+    for i in range(6):
+        scaled = (2 * base_stats[i] + ivs[i] + evs[i] // 4) * level // 100
+        stats.append(scaled + level + 10 if i == HP else (scaled + 5) * factors[i] // 10)
+    return tuple(stats)
+
+
+def calculate_stats_bulk(base_stats: Sequence[Sequence[int]], ivs: Sequence[Sequence[int]],
+                         evs: Sequence[Sequence[int]], levels: Sequence[int],
+                         natures: Sequence[Optional[str]]) -> List[Tuple[int, ...]]:
+    """calculate_stats() for many Pokémon at once, vectorized when NumPy is available"""
+    if np is None or not len(levels):
+        return [calculate_stats(*args) for args in zip(base_stats, ivs, evs, levels, natures)]
+
+    factors = [nature_factors(nature) for nature in natures]
+    return [tuple(row) for row in stats_array(base_stats, ivs, evs, levels, factors).tolist()]
+
+
+def stats_array(base_stats, ivs, evs, levels, factors) -> 'np.ndarray':
+    """The stat formulas over NumPy arrays: n x 6 stat inputs, n levels, n x 6 nature factors"""
+    level = np.asarray(levels, dtype=np.int64).reshape(-1, 1)
+    scaled = ((2 * np.asarray(base_stats, dtype=np.int64) + np.asarray(ivs, dtype=np.int64)
+               + np.asarray(evs, dtype=np.int64) // 4) * level // 100)
+    stats = (scaled + 5) * np.asarray(factors, dtype=np.int64) // 10
+    stats[:, HP] = scaled[:, HP] + level[:, 0] + 10
+    return stats
@@ -0,0 +1,118 @@
+"""In-process Server-Sent Events channels for the terminal.
+
+A browser opens one long-lived GET /api/stream and posts commands to
+/api/stream/command. Output is pushed to the stream as soon as a command
+finishes: a "sprite" event if it shows one, its message line by line, then a
+"result" event with the rest of the response. Channels live in the worker that opened the stream; a command
+posted to a different worker is answered inline instead, exactly like
+/api/command. Each stream holds a worker thread for as long as it is open,
+so a worker accepts at most STREAM_MAX_CHANNELS of them (by default half its
+WEB_THREADS) and turns further ones away; those browsers stay on plain HTTP.
+"""
+import json
+import os
+import queue
+import threading
+from typing import Dict, Iterator, Optional
+
+HEARTBEAT_INTERVAL = 15.0
+
+
+class Channel:
+    """One browser's stream: a bounded queue of pending events"""
+
+    def __init__(self, trainer_id: int, max_pending: int = 256):
+        self.id = os.urandom(12).hex()
+        self.trainer_id = trainer_id
+        self._events: 'queue.Queue[Optional[str]]' = queue.Queue(max_pending)
+
+    @staticmethod
+    def format(event: str, data: Dict) -> str:
+        return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+    def send(self, event: str, data: Dict) -> bool:
+        """Queue an event; False if the client has stopped reading"""
+        return self._put(self.format(event, data))
+
+    def publish(self, seq, response: Dict) -> bool:
+        """Push a command response: its sprite, its message line by line, then everything else.
+
+        The events are queued as one, so either the whole response is sent or,
+        returning False, none of it.
+        """
+        events = []
+        rest = {k: v for k, v in response.items() if k != 'message'}
+        # Printed above the message, as the inline response renders it
+        if response.get('status') == 'success' and response.get('sprite_url'):
+            events.append(self.format('sprite', {'seq': seq, 'url': rest.pop('sprite_url')}))
+        message = response.get('message')
+        if message is not None:
+            error = response.get('status') != 'success'
+            for line in (f"Error: {message}" if error else message).split('\n'):
+                events.append(self.format('line', {'seq': seq, 'text': line, 'error': error}))
+        events.append(self.format('result', dict(rest, seq=seq)))
+        return self._put(''.join(events))
+
+    def _put(self, text: str) -> bool:
+        try:
+            self._events.put_nowait(text)
+            return True
+        except queue.Full:
+            return False
+
+    def close(self) -> None:
+        try:
+            self._events.put_nowait(None)
+        except queue.Full:
+            pass
+
+    def events(self, heartbeat: float = HEARTBEAT_INTERVAL) -> Iterator[str]:
+        """The text/event-stream body; ends when the channel is closed"""
+        yield f"event: ready\ndata: {json.dumps({'channel': self.id})}\n\n"
+        while True:
+            try:
+                event = self._events.get(timeout=heartbeat)
+            except queue.Empty:
+                # Comment lines keep proxies from timing out an idle stream
+                yield ": keep-alive\n\n"
+                continue
+            if event is None:
+                return
+            yield event
+
+
+class ChannelRegistry:
+    """This worker's open channels"""
+
+    def __init__(self, max_channels: int = 4):
+        self.max_channels = max_channels
+        self._channels: Dict[str, Channel] = {}
+        self._lock = threading.Lock()
+
+    def open(self, trainer_id: int) -> Optional[Channel]:
+        """A new channel, or None if this worker already has as many as it allows"""
+        with self._lock:
+            if len(self._channels) >= self.max_channels:
+                return None
+            channel = Channel(trainer_id)
+            self._channels[channel.id] = channel
+        return channel
+
+    def get(self, channel_id: Optional[str], trainer_id: Optional[int]) -> Optional[Channel]:
+        """The channel if it belongs to this worker and to this trainer"""
+        with self._lock:
+            channel = self._channels.get(channel_id) if channel_id else None
+        return channel if channel is not None and channel.trainer_id == trainer_id else None
+
+    def stream(self, channel: Channel) -> Iterator[str]:
+        """channel.events() that unregisters the channel when the client goes away"""
+        try:
+            yield from channel.events()
+        finally:
+            with self._lock:
+                self._channels.pop(channel.id, None)
+
+
+# Leave at least half of gunicorn's threads (see gunicorn.conf.py) for other requests
+channels = ChannelRegistry(int(os.environ.get('STREAM_MAX_CHANNELS',
+                                              max(1, int(os.environ.get('WEB_THREADS', 8)) // 2))))
@@ -0,0 +1,125 @@
+"""JSON-lines logging with request context, per-module levels and sampling.
+
+Configured from the environment by configure():
+
+    LOG_LEVEL=INFO                        root level
+    LOG_LEVELS=routes=DEBUG,upstream=WARNING
+    LOG_SAMPLE=routes=0.1                 keep 10% of routes' DEBUG/INFO records
+    LOG_FORMAT=json                       or "text" for local development
+
+Every record carries the request ID and trainer ID of the request that
+emitted it. Messages use %-style arguments so nothing is formatted for
+records that are filtered out; wrap large objects in summarize() to log
+their size and identity instead of their contents.
+"""
+import json
+import logging
+import os
+import random
+import sys
+from typing import Any, Dict
+
+from flask import g, has_request_context, request, session
+
+# Attributes every LogRecord has; anything else was passed through extra=
+RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'request_id', 'trainer_id'}
+
+
+class RequestContextFilter(logging.Filter):
+    """Attach the current request and trainer IDs to every record"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if has_request_context():
+            record.request_id = g.get('request_id')
+            record.trainer_id = session.get('trainer_id')
+        else:
+            record.request_id = record.trainer_id = None
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keep a fraction of a logger's records below WARNING"""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno >= logging.WARNING or random.random() < self.rate
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': round(record.created, 3),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+            'request_id': getattr(record, 'request_id', None),
+            'trainer_id': getattr(record, 'trainer_id', None),
+        }
+        for key, value in vars(record).items():
+            if key not in RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class summarize:
+    """Deferred one-line summary of a large object, computed only if the record is emitted"""
+
+    __slots__ = ('obj',)
+
+    def __init__(self, obj: Any):
+        self.obj = obj
+
+    def __str__(self) -> str:
+        obj = self.obj
+        if hasattr(obj, 'wild') and hasattr(obj, 'trainer'):
+            return (f"<Battle turn={obj.turn} wild={obj.wild.species_id}@{obj.wild.current_hp}/{obj.wild.max_hp} "
+                    f"trainer={obj.trainer.species_id}@{obj.trainer.current_hp}/{obj.trainer.max_hp}>")
+        if isinstance(obj, dict):
+            ids = {key: obj[key] for key in ('id', 'name', 'status') if isinstance(obj.get(key), (str, int))}
+            return f"<dict keys={len(obj)} bytes={len(json.dumps(obj, default=str))} {ids}>"
+        if isinstance(obj, (list, tuple)):
+            return f"<{type(obj).__name__} len={len(obj)}>"
+        return repr(obj)
+
+
+def parse_pairs(value: str) -> Dict[str, str]:
+    """'a=1,b=2' -> {'a': '1', 'b': '2'}"""
+    return dict(pair.split('=', 1) for pair in value.split(',') if '=' in pair)
+
+
+def configure() -> None:
+    """Install the handler, levels and sampling filters described by the environment"""
+    handler = logging.StreamHandler(sys.stderr)
+    handler.addFilter(RequestContextFilter())
+    if os.environ.get('LOG_FORMAT', 'json') == 'json':
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s'))
+
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(os.environ.get('LOG_LEVEL', 'INFO').upper())
+    for name, level in parse_pairs(os.environ.get('LOG_LEVELS', '')).items():
+        logging.getLogger(name).setLevel(level.upper())
+    for name, rate in parse_pairs(os.environ.get('LOG_SAMPLE', '')).items():
+        logging.getLogger(name).addFilter(SamplingFilter(float(rate)))
+
+
+def init_app(app) -> None:
+    """Give every request an ID, taken from X-Request-ID when the proxy sets one"""
+
+    @app.before_request
+    def assign_request_id():
+        header = request.headers.get('X-Request-ID', '')
+        g.request_id = header[:64] if header and header.isprintable() else os.urandom(8).hex()
+
+    @app.after_request
+    def echo_request_id(response):
+        if 'request_id' in g:
+            response.headers['X-Request-ID'] = g.request_id
+        return response
@@ -0,0 +1,9 @@
+import os
+import sys
+import tempfile
+
+# Importing cache builds the module-level cache; keep it off the real instance/ file
+os.environ.setdefault('POKEAPI_CACHE_PATH', '')
+# Importing app creates its tables; keep them off the real database too
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{tempfile.mkdtemp()}/test.db")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,62 @@
+from datetime import timedelta
+
+from app import app, db
+from battle import Battle, Combatant
+from battle_store import DatabaseBattleStore
+from models import ActiveBattle, Trainer, utc_now
+
+
+def make_battle() -> Battle:
+    def combatant(species_id):
+        return Combatant(species_id, 'bulbasaur', 5, (12,), (20, 9, 9, 10, 10, 9), 20, 20, ('tackle',), (None,))
+    return Battle(combatant(1), combatant(4))
+
+
+def make_trainers(count):
+    trainers = [Trainer(name=f'battle-store-{utc_now().timestamp()}-{i}') for i in range(count)]
+    db.session.add_all(trainers)
+    db.session.commit()
+    return [trainer.id for trainer in trainers]
+
+
+def test_create_replaces_the_trainers_battle_without_sweeping():
+    with app.app_context():
+        store = DatabaseBattleStore(idle_ttl=60, max_battles=1, sweep_interval=3600)
+        first, second = make_trainers(2)
+        old_id = store.create(first, make_battle())
+        new_id = store.create(first, make_battle())
+        other_id = store.create(second, make_battle())
+
+        assert store.get(old_id, first) is None
+        assert store.get(new_id, first).trainer.species_id == 4
+        assert store.get(new_id, second) is None
+        # Over max_battles, but the sweep isn't due yet
+        assert store.get(other_id, second) is not None
+
+
+def test_sweep_drops_idle_then_least_recently_used():
+    with app.app_context():
+        ActiveBattle.query.delete()
+        store = DatabaseBattleStore(idle_ttl=60, max_battles=2, sweep_interval=3600)
+        trainer_ids = make_trainers(4)
+        battle_ids = [store.create(trainer_id, make_battle()) for trainer_id in trainer_ids]
+        now = utc_now()
+        for age, battle_id in zip((120, 30, 20, 10), battle_ids):
+            db.session.get(ActiveBattle, battle_id).updated_at = now - timedelta(seconds=age)
+        db.session.commit()
+
+        assert store.sweep() == 2
+        assert {b.id for b in ActiveBattle.query} == set(battle_ids[2:])
+        assert store.sweep() == 0
+
+
+def test_create_sweeps_once_the_interval_has_passed():
+    with app.app_context():
+        store = DatabaseBattleStore(idle_ttl=60, max_battles=10000, sweep_interval=0)
+        idle, active = make_trainers(2)
+        idle_id = store.create(idle, make_battle())
+        db.session.get(ActiveBattle, idle_id).updated_at = utc_now() - timedelta(seconds=120)
+        db.session.commit()
+
+        store.create(active, make_battle())
+        assert db.session.get(ActiveBattle, idle_id) is None
@@ -0,0 +1,162 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from cache import PokeAPICache
+
+WAITERS = 8
+
+
+def make_cache(tmp_path, **kwargs):
+    kwargs.setdefault('poll_interval', 0.01)
+    return PokeAPICache(str(tmp_path / 'cache.db'), **kwargs)
+
+
+class SlowLoader:
+    """Counts its calls and holds each one until released"""
+
+    def __init__(self, result=None, error=None):
+        self.result = result
+        self.error = error
+        self.calls = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            self.calls += 1
+        self.started.set()
+        self.release.wait(5)
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+def run_concurrently(caches, key, loader):
+    """get_or_load key from WAITERS threads spread over caches; (results, errors)"""
+    results, errors = [], []
+    barrier = threading.Barrier(WAITERS)
+
+    def worker(cache):
+        barrier.wait()
+        try:
+            results.append(cache.get_or_load(key, loader))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(caches[i % len(caches)],)) for i in range(WAITERS)]
+    for thread in threads:
+        thread.start()
+    assert loader.started.wait(5)
+    time.sleep(0.1)  # let the others pile up behind the load
+    loader.release.set()
+    for thread in threads:
+        thread.join(5)
+    return results, errors
+
+
+def test_concurrent_misses_call_the_loader_once(tmp_path):
+    cache = make_cache(tmp_path)
+    loader = SlowLoader(result={'id': 1})
+
+    results, errors = run_concurrently([cache], 'pokemon/1', loader)
+
+    assert loader.calls == 1
+    assert errors == []
+    assert results == [{'id': 1}] * WAITERS
+    assert cache.stats()['coalesced'] == WAITERS - 1
+
+
+def test_concurrent_misses_across_processes_call_the_loader_once(tmp_path):
+    # Two caches on one file stand in for two workers sharing it through the lease
+    caches = [make_cache(tmp_path), make_cache(tmp_path)]
+    loader = SlowLoader(result={'id': 1})
+
+    results, errors = run_concurrently(caches, 'pokemon/1', loader)
+
+    assert loader.calls == 1
+    assert errors == []
+    assert results == [{'id': 1}] * WAITERS
+
+
+def test_concurrent_async_misses_call_the_loader_once(tmp_path):
+    cache = make_cache(tmp_path)
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return {'id': 1}
+
+    async def main():
+        return await asyncio.gather(*(cache.get_or_load_async('pokemon/1', loader) for _ in range(WAITERS)))
+
+    assert asyncio.run(main()) == [{'id': 1}] * WAITERS
+    assert calls == 1
+
+
+def test_expired_lease_is_taken_over_from_a_slow_holder(tmp_path):
+    holder = make_cache(tmp_path, lease_ttl=0.2)
+    waiter = make_cache(tmp_path, lease_ttl=0.2)
+    # The holder took the lease and is still loading
+    assert holder._acquire_lease('pokemon/1')
+
+    started = time.monotonic()
+    assert waiter.get_or_load('pokemon/1', lambda: {'id': 1}) == {'id': 1}
+    assert time.monotonic() - started >= 0.2
+
+
+def test_live_lease_holder_result_is_used(tmp_path):
+    holder = make_cache(tmp_path)
+    waiter = make_cache(tmp_path)
+    assert holder._acquire_lease('pokemon/1')
+    timer = threading.Timer(0.1, holder.set, ('pokemon/1', {'id': 1}))
+    timer.start()
+
+    assert waiter.get_or_load('pokemon/1', pytest.fail) == {'id': 1}
+    timer.join()
+
+
+def test_negative_result_is_served_to_waiters(tmp_path):
+    cache = make_cache(tmp_path)
+    loader = SlowLoader(result=None)
+
+    results, errors = run_concurrently([cache], 'pokemon/0', loader)
+
+    assert loader.calls == 1
+    assert errors == []
+    assert results == [None] * WAITERS
+    # Until it expires the negative entry answers without loading, in every worker
+    assert cache.get_or_load('pokemon/0', pytest.fail) is None
+    assert make_cache(tmp_path).get_or_load('pokemon/0', pytest.fail) is None
+
+
+def test_failed_load_is_raised_to_waiters_and_cached_as_negative(tmp_path):
+    cache = make_cache(tmp_path)
+    loader = SlowLoader(error=ConnectionError("upstream down"))
+
+    results, errors = run_concurrently([cache], 'pokemon/1', loader)
+
+    assert loader.calls == 1
+    assert results == []
+    assert len(errors) == WAITERS
+    assert all(isinstance(e, ConnectionError) for e in errors)
+    assert cache.get_or_load('pokemon/1', pytest.fail) is None
+
+
+def test_negative_entry_expires(tmp_path):
+    cache = make_cache(tmp_path, negative_ttl=0.05)
+    assert cache.get_or_load('pokemon/1', lambda: None) is None
+    time.sleep(0.1)
+    assert cache.get_or_load('pokemon/1', lambda: {'id': 1}) == {'id': 1}
+
+
+def test_negative_entry_keeps_the_stale_value(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.set('pokemon/1', {'id': 1}, ttl=-1)
+    assert cache.get_or_load('pokemon/1', lambda: None) is None
+    assert cache.get_stale('pokemon/1') == {'id': 1}
@@ -0,0 +1,39 @@
+import counters
+from app import app, db
+from models import Pokedex, Trainer
+
+
+def test_pokedex_counters_only_move_when_a_species_is_new():
+    with app.app_context():
+        trainer = Trainer(name='counters')
+        db.session.add(trainer)
+        db.session.commit()
+
+        assert Pokedex.mark_seen(trainer.id, 1) is True
+        assert Pokedex.mark_seen(trainer.id, 1) is False
+        assert Pokedex.mark_caught(trainer.id, 1) == (False, True)
+        assert Pokedex.mark_caught(trainer.id, 1) == (False, False)
+        # Caught without an encounter first, e.g. a row that was lost
+        assert Pokedex.mark_caught(trainer.id, 4) == (True, True)
+        db.session.commit()
+
+        entries = {(p.pokemon_id, p.seen, p.caught) for p in Pokedex.query.filter_by(trainer_id=trainer.id)}
+        assert entries == {(1, True, True), (4, True, True)}
+
+
+def test_incremental_counters_match_a_reconcile():
+    with app.app_context():
+        trainer = Trainer(name='counters-reconcile')
+        db.session.add(trainer)
+        db.session.commit()
+        for pokemon_id in (7, 7, 8, 9):
+            if Pokedex.mark_seen(trainer.id, pokemon_id):
+                counters.increment(trainer.id, species_seen=1)
+        for pokemon_id in (8, 8, 10):
+            newly_seen, newly_caught = Pokedex.mark_caught(trainer.id, pokemon_id)
+            counters.increment(trainer.id, species_seen=int(newly_seen), species_caught=int(newly_caught))
+        db.session.commit()
+
+        db.session.refresh(trainer)
+        assert (trainer.species_seen, trainer.species_caught) == (4, 2)
+        assert counters.reconcile(trainer.id) == 0
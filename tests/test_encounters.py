@@ -0,0 +1,84 @@
+import json
+import os
+import random
+from collections import Counter
+
+import pytest
+
+from dataset import MAX_SPECIES_ID
+from encounters import AliasSampler, EncounterTable, EncounterTables, np
+
+DRAWS = 40000
+
+
+def assert_matches_weights(draws, values, weights):
+    counts = Counter(int(value) for value in draws)
+    assert set(counts) <= {v for v, w in zip(values, weights) if w > 0}
+    total = sum(weights)
+    for value, weight in zip(values, weights):
+        assert counts[value] / len(draws) == pytest.approx(weight / total, abs=0.01)
+
+
+def test_alias_sampler_follows_weights():
+    values, weights = [1, 4, 7, 25, 150], [0.5, 0.2, 0.0, 0.25, 0.05]
+    sampler = AliasSampler(values, weights)
+    rng = random.Random(10)
+    assert_matches_weights([sampler.sample(rng) for _ in range(DRAWS)], values, weights)
+    assert_matches_weights(sampler.sample_many(DRAWS, rng), values, weights)
+
+
+@pytest.mark.skipif(np is None, reason="NumPy is not installed")
+def test_alias_sampler_batch_draws_with_numpy():
+    values, weights = [3, 6, 9], [1, 2, 7]
+    draws = AliasSampler(values, weights).sample_many(DRAWS, np.random.default_rng(10))
+    assert len(draws) == DRAWS
+    assert_matches_weights(draws, values, weights)
+
+
+def test_alias_sampler_edge_cases():
+    assert AliasSampler([42], [3.0]).sample_many(10) == [42] * 10
+    with pytest.raises(ValueError):
+        AliasSampler([1, 2], [0, 0])
+    with pytest.raises(ValueError):
+        AliasSampler([], [])
+
+
+@pytest.mark.parametrize('config', [
+    {'groups': [{'first': 1, 'last': MAX_SPECIES_ID + 1, 'weight': 1}]},
+    {'species': {'0': 1}},
+    {'species': {'25': -1, '1': 1}},
+    {'species': {'25': 'nan'}},
+    {'groups': [{'first': 10, 'last': 1, 'weight': 1}]},
+])
+def test_from_config_rejects_invalid_tables(config):
+    with pytest.raises(ValueError):
+        EncounterTable.from_config('bad', config)
+
+
+def write_tables(path, tables, mtime):
+    path.write_text(json.dumps({'tables': tables}))
+    os.utime(path, (mtime, mtime))
+
+
+def test_reload_keeps_the_previous_tables_when_the_file_is_invalid(tmp_path):
+    path = tmp_path / 'encounters.json'
+    write_tables(path, {'cave': {'species': {'41': 1}}}, 1000)
+    tables = EncounterTables(str(path), check_interval=0)
+    assert tables.default == 'cave'
+    assert tables.sample() == 41
+
+    write_tables(path, {'cave': {'species': {'41': 1, '9999': 1}}}, 2000)
+    assert tables.sample() == 41
+    assert tables.reload() is False
+    assert set(tables.tables['cave'].weights) == {41}
+
+    write_tables(path, {'sea': {'species': {'129': 1}}}, 3000)
+    assert tables.sample() == 129
+    assert list(tables.tables) == ['sea']
+
+
+def test_invalid_file_at_startup_falls_back_to_the_rules(tmp_path):
+    path = tmp_path / 'encounters.json'
+    write_tables(path, {'wild': {'groups': [{'first': 600, 'last': 700, 'weight': 1}]}}, 1000)
+    tables = EncounterTables(str(path))
+    assert max(tables.get().weights) == MAX_SPECIES_ID
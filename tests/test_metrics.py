@@ -0,0 +1,27 @@
+import json
+import os
+import time
+
+from metrics import Metrics
+
+
+def test_flusher_writes_snapshots_in_the_background(tmp_path):
+    metrics = Metrics(str(tmp_path), flush_interval=0.05)
+    metrics.inc('pterminal_command_results_total', command='/hunt', status='success')
+    path = tmp_path / f"{os.getpid()}.json"
+    assert not path.exists()
+
+    metrics.start_flusher()
+    metrics.start_flusher()
+    deadline = time.monotonic() + 5
+    while not path.exists() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    counters = json.loads(path.read_text())['counters']
+    assert counters == [['pterminal_command_results_total', [['command', '/hunt'], ['status', 'success']], 1]]
+    assert 'pterminal_command_results_total{command="/hunt",status="success"} 1' in metrics.render()
+
+
+def test_no_directory_means_no_flusher():
+    metrics = Metrics()
+    metrics.start_flusher()
+    assert metrics._flusher_pid is None
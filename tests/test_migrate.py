@@ -0,0 +1,34 @@
+from sqlalchemy import inspect, text
+
+from app import app, db
+import migrate
+import rules
+from models import Pokemon, Trainer
+
+STAT_COLUMNS = [f'stat_{key}' for key in ('hp', 'attack', 'defense', 'sp_attack', 'sp_defense', 'speed')]
+
+
+def test_adding_stat_columns_raises_starters():
+    with app.app_context():
+        trainer = Trainer(name='old-save')
+        db.session.add(trainer)
+        db.session.flush()
+        starter = Pokemon(trainer_id=trainer.id, pokemon_id=1, level=1)
+        caught = Pokemon(trainer_id=trainer.id, pokemon_id=16, level=3)
+        db.session.add_all([starter, caught])
+        db.session.commit()
+        starter_id, caught_id = starter.id, caught.id
+        db.session.close()
+
+        # The table as it was before stats were cached
+        with db.engine.begin() as conn:
+            for column in STAT_COLUMNS:
+                conn.execute(text(f"ALTER TABLE pokemon DROP COLUMN {column}"))
+
+        changes = migrate.ensure_schema()
+
+        assert len(changes) == len(STAT_COLUMNS)
+        assert set(STAT_COLUMNS) <= {c['name'] for c in inspect(db.engine).get_columns('pokemon')}
+        assert db.session.get(Pokemon, starter_id).level == rules.STARTER_LEVEL
+        assert db.session.get(Pokemon, caught_id).level == 3
+        assert migrate.ensure_schema() == []
@@ -0,0 +1,124 @@
+import itertools
+import random
+
+import pytest
+
+import main
+from app import app, db
+from game_logic import GameLogic
+from models import Pokemon, Trainer
+
+NATURES = ['Timid', 'adamant', 'Bold', None]
+SORT_KEYS = {
+    'caught': lambda p: (),
+    'level': lambda p: (p.level,),
+    'species': lambda p: (p.pokemon_id,),
+    'nature': lambda p: ((p.nature or '').lower(),),
+}
+FILTERS = [
+    {},
+    {'species_id': 25},
+    {'nature': 'TIMID'},
+    {'min_level': 5, 'max_level': 8},
+]
+
+
+@pytest.fixture(scope='module')
+def trainer_id():
+    """A trainer owning 60 Pokémon with many duplicate levels, species and natures"""
+    rng = random.Random(12)
+    with app.app_context():
+        trainer = Trainer(name='keyset')
+        other = Trainer(name='keyset-other')
+        db.session.add_all([trainer, other])
+        db.session.flush()
+        for owner in (trainer, other, trainer):
+            db.session.add_all(
+                Pokemon(trainer_id=owner.id, pokemon_id=rng.choice([1, 4, 25]), level=rng.randint(3, 10),
+                        nature=rng.choice(NATURES))
+                for _ in range(30)
+            )
+        db.session.commit()
+        return trainer.id
+
+
+def expected(trainer_id, sort, descending, filters):
+    rows = [p for p in Pokemon.query.filter_by(trainer_id=trainer_id)
+            if filters.get('species_id') in (None, p.pokemon_id)
+            and (filters.get('nature') is None or (p.nature or '').lower() == filters['nature'].lower())
+            and p.level >= filters.get('min_level', 0) and p.level <= filters.get('max_level', 100)]
+    return sorted(rows, key=lambda p: SORT_KEYS[sort](p) + (p.id,), reverse=descending)
+
+
+def all_pages(trainer_id, limit, **options):
+    ids, cursor, pages = [], None, 0
+    while True:
+        rows, cursor = GameLogic.list_trainer_pokemon(trainer_id, limit=limit, cursor=cursor, **options)
+        assert len(rows) <= limit
+        ids += [p.id for p in rows]
+        pages += 1
+        if cursor is None:
+            return ids, pages
+        assert len(rows) == limit
+
+
+@pytest.mark.parametrize('sort, descending, filters',
+                         list(itertools.product(SORT_KEYS, [False, True], FILTERS)))
+def test_pages_cover_every_row_once_in_order(trainer_id, sort, descending, filters):
+    with app.app_context():
+        want = [p.id for p in expected(trainer_id, sort, descending, filters)]
+        assert want
+        for limit in (1, 7, len(want), len(want) + 1):
+            ids, pages = all_pages(trainer_id, limit, sort=sort, descending=descending, **filters)
+            assert ids == want
+            # An exact multiple of the page size doesn't leave an empty page behind
+            assert pages == max(1, -(-len(want) // limit))
+
+
+def test_page_boundary_inside_a_run_of_equal_sort_values(trainer_id):
+    with app.app_context():
+        rows = expected(trainer_id, 'level', False, {})
+        level = rows[0].level
+        run = [p.id for p in rows if p.level == level]
+        assert len(run) > 2
+        first, cursor = GameLogic.list_trainer_pokemon(trainer_id, sort='level', limit=2)
+        assert cursor == f"{level}~{run[1]}"
+        second, _ = GameLogic.list_trainer_pokemon(trainer_id, sort='level', limit=2, cursor=cursor)
+        assert [p.id for p in first + second] == [p.id for p in rows[:4]]
+
+
+@pytest.mark.parametrize('sort, cursor', [
+    ('caught', 'abc'),
+    ('caught', '5~'),
+    ('level', '~5'),
+    ('level', 'high~5'),
+    ('species', '25'),
+])
+def test_bad_cursors_are_rejected(trainer_id, sort, cursor):
+    with app.app_context(), pytest.raises(ValueError):
+        GameLogic.list_trainer_pokemon(trainer_id, sort=sort, cursor=cursor)
+
+
+def test_unknown_sort_is_rejected(trainer_id):
+    with app.app_context(), pytest.raises(ValueError):
+        GameLogic.list_trainer_pokemon(trainer_id, sort='speed')
+
+
+def test_command_pages_with_the_cursor_it_returns(trainer_id, monkeypatch):
+    # Species names would come from PokeAPI
+    monkeypatch.setattr(GameLogic, 'get_pokemon_data_many',
+                        lambda ids: {i: {'name': f"species-{i}"} for i in ids})
+    client = main.app.test_client()
+    with client.session_transaction() as session:
+        session['trainer_id'] = trainer_id
+
+    def mypokemon(options):
+        return client.post('/api/command', json={'command': f"/mypokemon {options}"}).get_json()
+
+    assert mypokemon('sort=level cursor=nope') == {
+        'status': 'error', 'message': 'Invalid options! Try /mypokemon sort=level order=desc'}
+    first = mypokemon('sort=level order=desc limit=5')
+    second = mypokemon(f"sort=level order=desc limit=5 cursor={first['next_cursor']}")
+    with app.app_context():
+        levels = [p.level for p in expected(trainer_id, 'level', True, {})[:10]]
+    assert [p['level'] for p in first['pokemon'] + second['pokemon']] == levels
@@ -0,0 +1,32 @@
+import socket
+
+from sprites import PNG_SIGNATURE, SpriteStore
+from upstream import upstream_client
+
+
+def closed_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def test_sprite_host_failures_leave_pokeapi_breaker_closed(tmp_path):
+    store = SpriteStore(str(tmp_path), f"http://127.0.0.1:{closed_port()}")
+    assert store.client is not upstream_client
+    for pokemon_id in range(1, store.client.breaker.failure_threshold + 2):
+        assert store.get(pokemon_id) is None
+    assert store.client.breaker.is_open
+    assert not upstream_client.breaker.is_open
+
+
+def test_sprites_from_a_directory_are_stored_with_an_etag(tmp_path):
+    source = tmp_path / 'source'
+    source.mkdir()
+    (source / '25.png').write_bytes(PNG_SIGNATURE + b'pikachu')
+    (source / '26.png').write_bytes(b'not a png')
+    store = SpriteStore(str(tmp_path / 'sprites'), str(source))
+
+    path, etag = store.get(25)
+    assert open(path, 'rb').read() == PNG_SIGNATURE + b'pikachu'
+    assert store.get(25) == (path, etag)
+    assert store.get(26) is None
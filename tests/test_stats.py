@@ -0,0 +1,53 @@
+import random
+
+import pytest
+
+import rules
+import stats
+from battle import ATTACK, HP, SP_ATTACK
+from stats import NO_EVS, NO_IVS, calculate_stats, calculate_stats_bulk, nature_factors
+
+# Bulbapedia's worked example: a level 78 Adamant Garchomp
+GARCHOMP = ((108, 130, 95, 80, 85, 102), (24, 12, 30, 16, 23, 5), (74, 190, 91, 48, 84, 23), 78, 'adamant')
+BULBASAUR = (45, 49, 49, 65, 65, 45)
+
+
+def test_reference_values():
+    assert calculate_stats(*GARCHOMP) == (289, 278, 193, 135, 171, 171)
+    assert calculate_stats(BULBASAUR, NO_IVS, NO_EVS, 10) == (29, 14, 14, 18, 18, 14)
+    # The smallest possible stats still leave HP at level + 10
+    assert calculate_stats((1, 1, 1, 1, 1, 1), NO_IVS, NO_EVS, 1)[HP] == 11
+
+
+def test_hp_without_ivs_matches_scaled_hp():
+    for base_hp in (1, 45, 108, 255):
+        for level in (1, 20, 50, 100):
+            assert calculate_stats((base_hp,) * 6, NO_IVS, NO_EVS, level)[HP] == rules.scaled_hp(base_hp, level)
+
+
+def test_natures():
+    assert nature_factors('adamant')[ATTACK] == 11
+    assert nature_factors('Adamant')[SP_ATTACK] == 9
+    assert nature_factors('hardy') == nature_factors(None) == nature_factors('unknown') == (10,) * 6
+
+
+def random_inputs(rng, n):
+    natures = list(stats.NATURE_EFFECTS) + ['hardy', None]
+    return (
+        [tuple(rng.randint(1, 255) for _ in range(6)) for _ in range(n)],
+        [tuple(rng.randint(0, 31) for _ in range(6)) for _ in range(n)],
+        [tuple(rng.randint(0, 252) for _ in range(6)) for _ in range(n)],
+        [rng.randint(1, 100) for _ in range(n)],
+        [rng.choice(natures) for _ in range(n)],
+    )
+
+
+@pytest.mark.parametrize('numpy', [True, False])
+def test_bulk_matches_scalar(monkeypatch, numpy):
+    if numpy and stats.np is None:
+        pytest.skip("NumPy is not installed")
+    if not numpy:
+        monkeypatch.setattr(stats, 'np', None)
+    inputs = random_inputs(random.Random(25), 500)
+    assert calculate_stats_bulk(*inputs) == [calculate_stats(*args) for args in zip(*inputs)]
+    assert calculate_stats_bulk([], [], [], [], []) == []
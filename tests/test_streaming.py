@@ -0,0 +1,29 @@
+import json
+
+from streaming import Channel
+
+
+def published(response):
+    channel = Channel(trainer_id=1)
+    assert channel.publish(7, response)
+    text = channel._events.get_nowait()
+    return [(block.split('\n')[0][len('event: '):], json.loads(block.split('\n')[1][len('data: '):]))
+            for block in text.strip().split('\n\n')]
+
+
+def test_sprite_comes_before_the_message_and_is_left_out_of_the_result():
+    events = published({'status': 'success', 'message': 'A wild Pikachu appeared!\n\n/battle',
+                        'sprite_url': '/sprites/25.png', 'pokemon': {'id': 25}})
+    assert events == [
+        ('sprite', {'seq': 7, 'url': '/sprites/25.png'}),
+        ('line', {'seq': 7, 'text': 'A wild Pikachu appeared!', 'error': False}),
+        ('line', {'seq': 7, 'text': '', 'error': False}),
+        ('line', {'seq': 7, 'text': '/battle', 'error': False}),
+        ('result', {'status': 'success', 'pokemon': {'id': 25}, 'seq': 7}),
+    ]
+
+
+def test_errors_have_no_sprite():
+    events = published({'status': 'error', 'message': 'No active session', 'sprite_url': '/sprites/25.png'})
+    assert [event for event, _ in events] == ['line', 'result']
+    assert events[0][1]['text'] == 'Error: No active session'
@@ -0,0 +1,101 @@
+from typing import Iterable, List, Optional, Sequence
+
+from dataset import TYPE_IDS, TYPE_NAMES
+
+try:
+    import numpy as np
+except ImportError:  # vectorized lookups fall back to plain Python
+    np = None
+
+# Attacking type -> defending type -> multiplier, anything missing is 1x
+TYPE_CHART = {
+    'normal': {'ghost': 0, 'rock': 0.5, 'steel': 0.5},
+    'fire': {'fire': 0.5, 'water': 0.5, 'grass': 2, 'ice': 2, 'bug': 2, 'rock': 0.5, 'dragon': 0.5, 'steel': 2},
+    'water': {'fire': 2, 'water': 0.5, 'grass': 0.5, 'ground': 2, 'rock': 2, 'dragon': 0.5},
+    'electric': {'water': 2, 'electric': 0.5, 'grass': 0.5, 'ground': 0, 'flying': 2, 'dragon': 0.5},
+    'grass': {'fire': 0.5, 'water': 2, 'grass': 0.5, 'poison': 0.5, 'ground': 2, 'flying': 0.5, 'bug': 0.5, 'rock': 2, 'dragon': 0.5, 'steel': 0.5},
+    'ice': {'fire': 0.5, 'water': 0.5, 'grass': 2, 'ice': 0.5, 'ground': 2, 'flying': 2, 'dragon': 2, 'steel': 0.5},
+    'fighting': {'normal': 2, 'ice': 2, 'poison': 0.5, 'flying': 0.5, 'psychic': 0.5, 'bug': 0.5, 'rock': 2, 'ghost': 0, 'dark': 2, 'steel': 2, 'fairy': 0.5},
+    'poison': {'grass': 2, 'poison': 0.5, 'ground': 0.5, 'rock': 0.5, 'ghost': 0.5, 'steel': 0, 'fairy': 2},
+    'ground': {'fire': 2, 'electric': 2, 'grass': 0.5, 'poison': 2, 'flying': 0, 'bug': 0.5, 'rock': 2, 'steel': 2},
+    'flying': {'electric': 0.5, 'grass': 2, 'fighting': 2, 'bug': 2, 'rock': 0.5, 'steel': 0.5},
+    'psychic': {'fighting': 2, 'poison': 2, 'psychic': 0.5, 'dark': 0, 'steel': 0.5},
+    'bug': {'fire': 0.5, 'grass': 2, 'fighting': 0.5, 'poison': 0.5, 'flying': 0.5, 'psychic': 2, 'ghost': 0.5, 'dark': 2, 'steel': 0.5, 'fairy': 0.5},
+    'rock': {'fire': 2, 'ice': 2, 'fighting': 0.5, 'ground': 0.5, 'flying': 2, 'bug': 2, 'steel': 0.5},
+    'ghost': {'normal': 0, 'psychic': 2, 'ghost': 2, 'dark': 0.5},
+    'dragon': {'dragon': 2, 'steel': 0.5, 'fairy': 0},
+    'dark': {'fighting': 0.5, 'psychic': 2, 'ghost': 2, 'dark': 0.5, 'fairy': 0.5},
+    'steel': {'fire': 0.5, 'water': 0.5, 'electric': 0.5, 'ice': 2, 'rock': 2, 'steel': 0.5, 'fairy': 2},
+    'fairy': {'fire': 0.5, 'fighting': 2, 'poison': 0.5, 'dragon': 2, 'dark': 2, 'steel': 0.5}
+}
+TYPE_COUNT = len(TYPE_NAMES)
+# Column used for the second defender type of single-typed Pokémon
+NO_SECOND_TYPE = TYPE_COUNT
+_DUAL_WIDTH = TYPE_COUNT + 1
+
+
+def _compile_matrix() -> tuple:
+    return tuple(
+        tuple(float(TYPE_CHART[attacker].get(defender, 1)) for defender in TYPE_NAMES)
+        for attacker in TYPE_NAMES
+    )
+
+
+def _compile_dual_table(matrix: tuple) -> tuple:
+    table = []
+    for attacker in range(TYPE_COUNT):
+        for first in range(_DUAL_WIDTH):
+            for second in range(_DUAL_WIDTH):
+                multiplier = 1.0
+                for defender in (first, second):
+                    if defender != NO_SECOND_TYPE:
+                        multiplier *= matrix[attacker][defender]
+                table.append(multiplier)
+    return tuple(table)
+
+
+# EFFECTIVENESS[attacker][defender] for a single defending type
+EFFECTIVENESS = _compile_matrix()
+# Flat attacker x (defender type 1) x (defender type 2) table, see dual_index()
+DUAL_EFFECTIVENESS = _compile_dual_table(EFFECTIVENESS)
+
+if np is not None:
+    EFFECTIVENESS_ARRAY = np.array(EFFECTIVENESS, dtype=np.float32)
+    DUAL_EFFECTIVENESS_ARRAY = np.array(DUAL_EFFECTIVENESS, dtype=np.float32).reshape(
+        TYPE_COUNT, _DUAL_WIDTH, _DUAL_WIDTH)
+
+
+def dual_index(attacker: int, first: int, second: int = NO_SECOND_TYPE) -> int:
+    """Position of a matchup in DUAL_EFFECTIVENESS"""
+    return (attacker * _DUAL_WIDTH + first) * _DUAL_WIDTH + second
+
+
+def type_effectiveness(attacker: Optional[int], defender_type_ids: Sequence[int]) -> float:
+    """Multiplier for a move type ID against one or two defender type IDs.
+
+    Moves of a type outside the chart (attacker None) and defenders without
+    types are always neutral.
+    """
+    if attacker is None or not defender_type_ids:
+        return 1.0
+    if len(defender_type_ids) == 1:
+        return DUAL_EFFECTIVENESS[dual_index(attacker, defender_type_ids[0])]
+    return DUAL_EFFECTIVENESS[dual_index(attacker, defender_type_ids[0], defender_type_ids[1])]
+
+
+def type_effectiveness_by_name(move_type: str, defender_types: Iterable[str]) -> float:
+    """Same as type_effectiveness() but for type names; unknown defender types are ignored"""
+    return type_effectiveness(TYPE_IDS.get(move_type), [TYPE_IDS[t] for t in defender_types if t in TYPE_IDS])
+
+
+def type_effectiveness_many(attackers: Sequence[int], firsts: Sequence[int],
+                            seconds: Sequence[int]) -> 'np.ndarray | List[float]':
+    """Look up many matchups at once.
+
+    Takes parallel sequences of attacker, first and second defender type IDs
+    (NO_SECOND_TYPE for single-typed defenders). Returns a float32 array when
+    NumPy is installed, otherwise a list.
+    """
+    if np is not None:
+        return DUAL_EFFECTIVENESS_ARRAY[np.asarray(attackers), np.asarray(firsts), np.asarray(seconds)]
+    return [DUAL_EFFECTIVENESS[dual_index(a, f, s)] for a, f, s in zip(attackers, firsts, seconds)]
@@ -0,0 +1,251 @@
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Awaitable, Callable, Optional, Type
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+import blocking
+from blocking import ASYNCIO, BLOCKING
+
+logger = logging.getLogger(__name__)
+
+
+class UpstreamUnavailable(Exception):
+    """Raised when PokeAPI can't be reached and the caller should degrade"""
+
+
+class TokenBucket:
+    """Token-bucket rate limiter that makes callers wait for a free token"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _take(self) -> float:
+        """Take a token if one is free (returning 0), else return seconds until one is"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self, max_wait: float) -> bool:
+        """Take one token, waiting up to max_wait seconds; False if none came free"""
+        return blocking.run(self.wait(max_wait, BLOCKING))
+
+    async def wait(self, max_wait: float, io) -> bool:
+        """acquire() waiting through io, so coroutines can take a token without blocking their loop"""
+        deadline = time.monotonic() + max_wait
+        while True:
+            wait = self._take()
+            if not wait:
+                return True
+            if time.monotonic() + wait > deadline:
+                return False
+            await io.sleep(wait)
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures and lets one trial call through after a cool-down"""
+
+    def __init__(self, failure_threshold: int, reset_timeout: float, name: str = 'PokeAPI'):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._trial_in_flight or time.monotonic() - self._opened_at < self.reset_timeout:
+                return False
+            # Half-open: let a single request probe upstream
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def cancel_trial(self) -> None:
+        """Give up a half-open probe slot without counting a success or failure"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    logger.warning("%s circuit opened after %d failures", self.name, self._failures)
+                self._opened_at = time.monotonic()
+
+
+class UpstreamClient:
+    """Pooled, rate-limited PokeAPI client with timeouts, retries and a circuit breaker"""
+
+    RETRY_STATUSES = frozenset({500, 502, 503, 504})
+
+    def __init__(self, base_url: str, pool_size: int = 10, connect_timeout: float = 3.05,
+                 read_timeout: float = 10.0, retries: int = 2, backoff: float = 0.25,
+                 rate: float = 20.0, burst: float = 20.0, max_queue_wait: float = 10.0,
+                 breaker_threshold: int = 5, breaker_reset: float = 30.0, name: str = 'PokeAPI'):
+        self.base_url = base_url.rstrip('/')
+        self.pool_size = pool_size
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.max_queue_wait = max_queue_wait
+        self.limiter = TokenBucket(rate, burst)
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_reset, name)
+
+        self.session = requests.Session()
+        # Retries are handled below so they can be jittered and fed to the breaker
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0, pool_block=True)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    @classmethod
+    def from_env(cls) -> 'UpstreamClient':
+        """Build a client configured from POKEAPI_BASE_URL and UPSTREAM_* environment variables"""
+        env = os.environ.get
+        return cls(
+            base_url=env('POKEAPI_BASE_URL', 'https://pokeapi.co/api/v2'),
+            pool_size=int(env('UPSTREAM_POOL_SIZE', 10)),
+            connect_timeout=float(env('UPSTREAM_CONNECT_TIMEOUT', 3.05)),
+            read_timeout=float(env('UPSTREAM_READ_TIMEOUT', 10)),
+            retries=int(env('UPSTREAM_RETRIES', 2)),
+            rate=float(env('UPSTREAM_RATE', 20)),
+            burst=float(env('UPSTREAM_BURST', 20)),
+            breaker_threshold=int(env('UPSTREAM_BREAKER_THRESHOLD', 5)),
+            breaker_reset=float(env('UPSTREAM_BREAKER_RESET', 30)),
+        )
+
+    def get_json(self, path: str) -> Optional[Any]:
+        """GET base_url/path and decode it.
+
+        Returns None when upstream answers with a non-retryable error such as
+        404, and raises UpstreamUnavailable when the circuit is open, the rate
+        limiter queue times out or every retry failed.
+        """
+        response = self.get(f"{self.base_url}/{path}")
+        return response.json() if response is not None else None
+
+    def get(self, url: str) -> Optional[requests.Response]:
+        """GET any URL under the same pool, limits and breaker; the response if it was a 200.
+
+        Errors are handled as in get_json().
+        """
+        return blocking.run(self._get(url, self._send, requests.RequestException, BLOCKING))
+
+    async def _send(self, url: str) -> requests.Response:
+        return self.session.get(url, timeout=self.timeout)
+
+    async def _get(self, url: str, send: Callable[[str], Awaitable[Any]],
+                   errors: Type[Exception], io) -> Optional[Any]:
+        """The breaker, rate limit and retry policy of one GET, shared with AsyncUpstreamClient.
+
+        send(url) makes one attempt, raising errors when the request
+        itself fails; every wait goes through io (see blocking.py).
+        """
+        if not self.breaker.allow():
+            raise UpstreamUnavailable(f"circuit open, skipped {url}")
+
+        try:
+            for attempt in range(self.retries + 1):
+                if attempt:
+                    # Full jitter keeps retrying workers from stampeding together
+                    await io.sleep(random.uniform(0, self.backoff * 2 ** attempt))
+                if not await self.limiter.wait(self.max_queue_wait, io):
+                    raise UpstreamUnavailable(f"rate limit queue timed out for {url}")
+
+                try:
+                    response = await send(url)
+                except errors as e:
+                    logger.warning("Upstream request for %s failed (attempt %d): %s", url, attempt + 1, e)
+                    continue
+                if response.status_code in self.RETRY_STATUSES:
+                    logger.warning("Upstream returned %d for %s (attempt %d)", response.status_code, url, attempt + 1)
+                    continue
+
+                self.breaker.record_success()
+                return response if response.status_code == 200 else None
+        except BaseException:
+            # Whatever escapes, including cancellation, a half-open probe
+            # must not keep its slot forever
+            self.breaker.cancel_trial()
+            raise
+
+        self.breaker.record_failure()
+        raise UpstreamUnavailable(f"upstream unavailable for {url}")
+
+
+class AsyncUpstreamClient:
+    """asyncio counterpart of UpstreamClient, sharing its settings, rate limiter and breaker.
+
+    An httpx connection pool belongs to the event loop that created it, so all
+    requests run on one long-lived background loop owned by this client. Any
+    coroutine, whatever loop it runs on, can await get_json(), and the pool is
+    reused across requests instead of being rebuilt per request. Retries and
+    the breaker are UpstreamClient's own, run under ASYNCIO.
+    """
+
+    def __init__(self, client: UpstreamClient):
+        self.client = client
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._http: Optional[httpx.AsyncClient] = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _background_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            # A forked worker inherits the attributes but not the loop's thread
+            if self._loop is None or self._pid != os.getpid():
+                self._loop = asyncio.new_event_loop()
+                self._http = None
+                self._pid = os.getpid()
+                threading.Thread(target=self._loop.run_forever, name='pokeapi-async', daemon=True).start()
+            return self._loop
+
+    async def get_json(self, path: str) -> Optional[Any]:
+        """Same contract as UpstreamClient.get_json"""
+        future = asyncio.run_coroutine_threadsafe(self._get_json(path), self._background_loop())
+        return await asyncio.wrap_future(future)
+
+    async def _get_json(self, path: str) -> Optional[Any]:
+        client = self.client
+        if self._http is None:
+            connect_timeout, read_timeout = client.timeout
+            self._http = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=client.pool_size, max_keepalive_connections=client.pool_size),
+                timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            )
+        response = await client._get(f"{client.base_url}/{path}", self._http.get, httpx.HTTPError, ASYNCIO)
+        return response.json() if response is not None else None
+
+
+upstream_client = UpstreamClient.from_env()
+async_upstream_client = AsyncUpstreamClient(upstream_client)
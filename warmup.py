@@ -0,0 +1,99 @@
+"""Start-up warm-up for the species/move/type data every worker reads.
+
+Under gunicorn with preload_app (see gunicorn.conf.py) warm_up() runs once
+in the master before any worker is forked, so every worker starts with the
+dataset unpacked and the PokeAPI cache's memory tier filled, sharing those
+pages copy-on-write. Without preload_app each worker warms up in a
+background thread after it boots, and /readyz answers 503 (and /api/
+requests are turned away) until it has finished. asgi.py warms each
+worker up during lifespan startup. Anywhere else (flask run,
+test clients, bench/run.py) nothing has started a warm-up, so the first
+request runs it before it is served.
+
+    python warmup.py        # run the warm-up and print its report
+"""
+import gc
+import logging
+import os
+import resource
+import threading
+import time
+from typing import Dict, Optional
+
+from cache import pokeapi_cache
+from dataset import bundled_dataset
+from encounters import encounter_tables
+from type_chart import TYPE_CHART
+
+logger = logging.getLogger(__name__)
+
+started = threading.Event()
+ready = threading.Event()
+_start_lock = threading.Lock()
+
+
+def rss_bytes() -> Optional[int]:
+    """Current resident set size, or the peak where /proc isn't available"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak * 1024 if peak else None
+
+
+def warm_up() -> Dict:
+    """Load the shared data structures, returning a report of what it cost"""
+    started.set()
+    began = time.perf_counter()
+    rss_before = rss_bytes()
+    report = {}
+
+    if bundled_dataset is not None:
+        report['dataset_bytes'] = bundled_dataset.preload()
+        report['species'] = bundled_dataset.species_count
+        report['moves'] = bundled_dataset.move_count
+    report['cache_entries'] = pokeapi_cache.preload()
+    # The connection must not be inherited by forked workers
+    pokeapi_cache.close()
+    # The type chart and encounter samplers are compiled when imported
+    report['types'] = len(TYPE_CHART)
+    report['encounter_tables'] = len(encounter_tables.tables)
+    gc.collect()
+
+    rss_after = rss_bytes()
+    report['seconds'] = round(time.perf_counter() - began, 3)
+    if rss_before is not None and rss_after is not None:
+        report['rss_bytes'] = rss_after
+        report['rss_growth_bytes'] = rss_after - rss_before
+    logger.info("Warm-up finished in %.2fs, RSS %.1f MiB", report['seconds'],
+                (rss_after or 0) / 2 ** 20, extra={'warmup': report})
+    ready.set()
+    return report
+
+
+def warm_up_in_background() -> Optional[threading.Thread]:
+    """Start warm_up() in a thread, unless a warm-up has already been started"""
+    with _start_lock:
+        if started.is_set():
+            return None
+        started.set()
+        thread = threading.Thread(target=warm_up, name='warmup', daemon=True)
+        thread.start()
+    return thread
+
+
+def warm_up_once() -> bool:
+    """Run warm_up() here unless one has been started; True once it has finished"""
+    with _start_lock:
+        if not started.is_set():
+            warm_up()
+    return ready.is_set()
+
+
+if __name__ == '__main__':
+    import json
+
+    import main  # noqa: F401 -- load the app the way a worker would
+
+    print(json.dumps(warm_up(), indent=2))